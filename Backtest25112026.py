@@ -1,10 +1,18 @@
-import requests
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 from datetime import datetime
-import time
 import warnings
+import kline_cache
+import klines_async
+import feature_store
+import indicadores as ind
+import painel as pn
+import reamostragem as rs
+from curva_capital import EquityTracker
+import monte_carlo as mc
+import covariancia as cv
+import resultado
+import perfil
 
 warnings.filterwarnings('ignore')
 
@@ -13,6 +21,7 @@ DATA_INICIO = "2020-01-01"
 DATA_FIM    = "2026-02-19"
 BANCA_INICIAL = 60.00
 TIMEFRAME = "1h"
+URLS_KLINES = klines_async.URLS # fapi -> api -> data-api
 
 # ⚙️ GESTÃO QUANTITATIVA INSTITUCIONAL
 ALAVANCAGEM = 3.0      
@@ -23,8 +32,16 @@ MAX_ACCOUNT_MARGIN = 0.35
 SLIPPAGE = 0.0005      
 TAXA_CORRETORA = 0.0004 
 
+# MONTE CARLO (motor vetorizado: 100k simulações rodam em segundos)
+MC_SIMS = 2000
+MC_SEED = None # Inteiro = mesmo sorteio a cada execução
+
 COINS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "ADAUSDT"]
 
+# Campos que o Matching Engine lê do painel alinhado (posição = índice no array)
+CAMPOS_PAINEL = ['open', 'high', 'low', 'close', 'atr', 'market_phase', 'long_signal', 'short_signal']
+P_OPEN, P_HIGH, P_LOW, P_CLOSE, P_ATR, P_PHASE, P_LONG, P_SHORT = range(len(CAMPOS_PAINEL))
+
 print(f"⏳ Iniciando Motor V1800 (The Institutional Apex) | Alavancagem: {ALAVANCAGEM}x")
 
 # --- MÓDULOS DE MATEMÁTICA INSTITUCIONAL ---
@@ -39,163 +56,76 @@ def safe_risk_fraction(winrate, rr, max_dd_allowed=0.35):
     if edge_adj <= 0: return 0.005 
     return np.clip(risk * edge_adj, 0.005, 0.05)
 
-def equity_volatility(equity_curve, window=40):
-    if len(equity_curve) < window + 1: return None
-    eq = np.array(equity_curve[-window:])
-    returns = np.diff(eq) / (eq[:-1] + 1e-9)
-    return np.std(returns)
-
 def equity_vol_scalar(eq_vol, target_vol=0.015):
     if eq_vol is None or eq_vol == 0: return 1.0
     return np.clip(target_vol / eq_vol, 0.5, 1.5) 
 
 # --- ☢️ MONTE CARLO BLOCK BOOTSTRAP ---
-def monte_carlo_block_bootstrap(trades_pct, initial_capital, sims=2000, block_size=5):
-    trades_pct = np.array(trades_pct)
-    n_trades = len(trades_pct)
-    results = []
-    
-    if n_trades < block_size:
-        return {"median_final": initial_capital, "worst_final": initial_capital, "ruin_prob": 0, "median_dd": 0, "worst_dd": 0}
-        
-    for _ in range(sims):
-        equity = initial_capital
-        peak = equity
-        max_dd = 0
-        
-        sampled_trades = []
-        while len(sampled_trades) < n_trades:
-            idx = np.random.randint(0, n_trades - block_size + 1)
-            sampled_trades.extend(trades_pct[idx:idx + block_size])
-            
-        sampled_trades = sampled_trades[:n_trades] 
-        
-        for pnl_pct in sampled_trades:
-            if np.random.rand() < 0.005:
-                pnl_pct = pnl_pct * np.random.uniform(3.0, 6.0) if pnl_pct < 0 else pnl_pct * 0.1
-                
-            equity *= (1 + pnl_pct)
-            
-            peak = max(peak, equity)
-            if peak > 0:
-                dd = (peak - equity) / peak
-                max_dd = max(max_dd, dd)
-            
-            if equity <= initial_capital * 0.05: 
-                equity = 0
-                break
-                
-        results.append((equity, max_dd))
-
-    finals = [r[0] for r in results]
-    dds = [r[1] for r in results]
-    
-    return {
-        "median_final": np.median(finals),
-        "worst_final": np.min(finals),
-        "ruin_prob": np.mean(np.array(finals) <= initial_capital * 0.10), 
-        "median_dd": np.median(dds),
-        "worst_dd": np.max(dds)
-    }
+def monte_carlo_block_bootstrap(trades_pct, initial_capital, sims=2000, block_size=5, seed=None):
+    # Motor vetorizado em monte_carlo.py (mesmo experimento, em lotes de matrizes)
+    return mc.block_bootstrap(trades_pct, initial_capital, sims=sims, block_sizes=(block_size,),
+                              min_trades=block_size, seed=seed)
 
 # --- 1. DATA LAYER (ANTI-BAN & BYPASS) ---
 def fetch_binance_data(symbol, start_date_str, end_date_str):
-    interval = TIMEFRAME
-    limit = 1000
-    urls = [
-        "https://fapi.binance.com/fapi/v1/klines",
-        "https://api.binance.com/api/v3/klines",
-        "https://data-api.binance.vision/api/v3/klines"
-    ]
-    
     start_ts = int(datetime.strptime(start_date_str, "%Y-%m-%d").timestamp() * 1000)
     end_ts = int(datetime.strptime(end_date_str, "%Y-%m-%d").timestamp() * 1000)
     
-    print(f"📥 Baixando {symbol}...", end="\n")
-    all_klines = []
-    current_start = start_ts
-    headers = {"User-Agent": "Mozilla/5.0"}
-    
-    for base_url in urls:
-        success = False
-        while True:
-            params = {"symbol": symbol, "interval": interval, "startTime": current_start, "limit": limit}
-            try:
-                r = requests.get(base_url, params=params, headers=headers, timeout=(5, 15))
-                if r.status_code in [429, 451]: break 
-                elif r.status_code != 200: break 
-                d = r.json()
-                if not d: 
-                    success = True
-                    break
-                chunk = [x for x in d if x[0] <= end_ts]
-                if not chunk: 
-                    success = True
-                    break
-                all_klines.extend(chunk)
-                current_start = chunk[-1][0] + 1
-                if current_start > end_ts: 
-                    success = True
-                    break
-                time.sleep(0.05) 
-            except Exception:
-                break 
-        if success and len(all_klines) > 0:
-            break 
-            
-    if not all_klines: return None
+    print(f"📥 Carregando {symbol} ({TIMEFRAME})...", end="\n")
+    # Cache local primeiro; a Binance só é consultada para as faixas que faltam
+    df = kline_cache.carregar_klines(symbol, TIMEFRAME, start_ts, end_ts,
+                                     lambda ini, fim: klines_async.baixar_faixa(symbol, TIMEFRAME, ini, fim, URLS_KLINES), col_volume="v")
+    if df is None: return None
         
-    print(f"✅ {symbol} concluído: {len(all_klines)} velas de {TIMEFRAME}.")
-    df = pd.DataFrame(all_klines, columns=["open_time", "open", "high", "low", "close", "v", "ct", "qv", "tr", "tb", "tq", "ig"])
-    df["date"] = pd.to_datetime(df["open_time"], unit="ms")
-    for c in ["open", "high", "low", "close", "v"]: df[c] = pd.to_numeric(df[c], errors='coerce')
-    df.set_index("date", inplace=True)
+    print(f"✅ {symbol} concluído: {len(df)} velas de {TIMEFRAME} ({kline_cache.memoria_bytes(df) / 1024 ** 2:.1f} MB).")
     return df
 
 # --- 2. MULTI-TIMEFRAME ENGINE (ALPHA GENERATION) ---
-def calcular_features(df):
-    df = df.copy()
-    
-    # --- MACRO ENGINE (4 HORAS) ---
-    df_4h = df.resample('4h').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'v': 'sum'}).dropna()
-    c_4h = df_4h['close']; h_4h = df_4h['high']; l_4h = df_4h['low']
-    
-    df_4h['ema200_4h'] = ta.ema(c_4h, length=200)
-    adx_df = ta.adx(h_4h, l_4h, c_4h, length=14)
-    df_4h['adx_4h'] = adx_df.iloc[:, 0] if adx_df is not None else 0
-    df_4h['adx_slope_4h'] = df_4h['adx_4h'].diff(2)
-    
-    bb = ta.bbands(c_4h, length=20, std=2.0)
-    if bb is not None: df_4h['bb_width_4h'] = (bb.iloc[:, 2] - bb.iloc[:, 0]) / c_4h
-    else: df_4h['bb_width_4h'] = 0
-        
-    df_4h['bb_percentile_4h'] = df_4h['bb_width_4h'].rolling(100).quantile(0.3)
-    df_4h['is_compressed_4h'] = (df_4h['bb_width_4h'] < df_4h['bb_percentile_4h'])
-    df_4h['recent_compression_4h'] = df_4h['is_compressed_4h'].rolling(3).max() == 1 
+CAMPOS_4H = ['ema200_4h', 'adx_4h', 'adx_slope_4h', 'recent_compression_4h', 'market_phase', 'range_expansion_4h']
+
+def macro_4h(st, barra):
+    # Indicadores de uma vela de 4H recém-fechada (estado incremental em st)
+    _, o_4h, h_4h, l_4h, c_4h, v_4h = barra
+    ema200 = rs.ema(st, "ema200", c_4h, 200)
+    adx = rs.adx(st, "adx", h_4h, l_4h, c_4h, 14)
+    adx_hist = rs.janela(st, "adx_hist", adx, 3)
+    adx_slope = adx - adx_hist[0] if len(adx_hist) == 3 else np.nan
+
+    closes = rs.janela(st, "closes", c_4h, 20)
+    bb_width = 4.0 * rs.desvio(closes) / c_4h if len(closes) == 20 else np.nan # (BB sup - BB inf) / close, 2 desvios
+    larguras = rs.janela(st, "bb_width", bb_width, 100)
+    bb_percentile = rs.quantil(larguras, 0.3) if len(larguras) == 100 else np.nan
+    is_compressed = bb_width < bb_percentile
+    compressoes = rs.janela(st, "compressed", is_compressed, 3)
+    recent_compression = len(compressoes) == 3 and any(compressoes)
     
     # 🚀 AJUSTE 4 (Macro Sync): Expansão de Range no 4H
-    df_4h['candle_range_4h'] = h_4h - l_4h
-    df_4h['range_ma_4h'] = df_4h['candle_range_4h'].rolling(20).mean()
-    df_4h['range_expansion_4h'] = df_4h['candle_range_4h'] > (df_4h['range_ma_4h'] * 1.4)
-    
-    df_4h['ema_slope_4h'] = df_4h['ema200_4h'].diff(6) 
+    ranges = rs.janela(st, "range", h_4h - l_4h, 20)
+    range_expansion = len(ranges) == 20 and (h_4h - l_4h) > (sum(ranges) / 20 * 1.4)
     
-    trend_condition = (df_4h['adx_4h'] > 14) & (df_4h['adx_slope_4h'] > 0) & (df_4h['ema_slope_4h'] > 0)
-    chop_condition = (df_4h['adx_4h'] < 14) & df_4h['is_compressed_4h']
+    ema_hist = rs.janela(st, "ema_hist", ema200, 7)
+    ema_slope = ema200 - ema_hist[0] if len(ema_hist) == 7 else np.nan
     
-    df_4h['market_phase'] = 0
-    df_4h.loc[trend_condition, 'market_phase'] = 1
-    df_4h.loc[chop_condition, 'market_phase'] = 2
-    
-    df_4h_shifted = df_4h.shift(1)
+    market_phase = 0
+    if adx > 14 and adx_slope > 0 and ema_slope > 0: market_phase = 1
+    elif adx < 14 and is_compressed: market_phase = 2
+    return {'ema200_4h': ema200, 'adx_4h': adx, 'adx_slope_4h': adx_slope, 'recent_compression_4h': recent_compression,
+            'market_phase': market_phase, 'range_expansion_4h': range_expansion}
+
+def calcular_features(df):
+    df = df.copy()
     
-    cols_to_join = ['ema200_4h', 'adx_4h', 'adx_slope_4h', 'recent_compression_4h', 'market_phase', 'range_expansion_4h']
-    df = df.join(df_4h_shifted[cols_to_join], how='left').ffill()
+    # --- MACRO ENGINE (4 HORAS) ---
+    # Velas de 4H agregadas em streaming sobre as de 1H: cada linha recebe os indicadores
+    # da última vela de 4H já fechada (antes: resample + shift(1) + join + ffill)
+    ag = rs.novo_agregador(4 * 3_600_000, 3_600_000, CAMPOS_4H)
+    macro = rs.processar(ag, rs.ts_ms(df.index), df['open'], df['high'], df['low'], df['close'], df['v'], macro_4h)
+    for campo in CAMPOS_4H: df[campo] = macro[campo]
     
     # --- MICRO ENGINE (1 HORA) ---
     c = df['close']; h = df['high']; l = df['low']
-    df['ema20'] = ta.ema(c, length=20)
-    df['atr'] = ta.atr(h, l, c, length=14)
+    df['ema20'] = ind.ema(c, 20, sma_seed=True)
+    df['atr'] = ind.atr(h, l, c, 14, pandas_ta=True)
     
     df['momentum_prebreak_long'] = c > df['ema20']
     df['momentum_prebreak_short'] = c < df['ema20']
@@ -229,40 +159,81 @@ def calcular_features(df):
     return df
 
 # --- 3. EXECUTION ENGINE ---
-def run_backtest():
+def candidatos_entrada(painel):
+    # Máscara (T, S): a moeda s tem sinal na vela fechada i-1 (fora da fase 2) e pode
+    # entrar na abertura da vela i. Mesmas regras do scanner, de uma vez no painel.
+    v = painel["valores"]; valido = painel["valido"]
+    sinal = (v[:-1, :, P_PHASE] != 2) & ((v[:-1, :, P_LONG] != 0) | (v[:-1, :, P_SHORT] != 0))
+    candidato = np.zeros(valido.shape, dtype=bool)
+    candidato[1:] = valido[:-1] & valido[1:] & sinal
+    return candidato
+
+def proxima_saida(painel, s, pos, ini, fim):
+    # Primeira vela em [ini, fim) em que a posição pode piramidar, fechar (stop/liquidação)
+    # ou mexer no trailing, com a mesma aritmética do laço; nas outras ela fica intocada
+    v = painel["valores"][:, s]
+    entry = pos['entry']; current_sl = pos.get('trail_sl', pos['sl'])
+    liq_distance = 0.90 / (pos['size_usd'] / pos['margem_usd'])
+    compra = pos['side'] == 'buy'
+    stop_nivel = max(current_sl, entry * (1 - liq_distance)) if compra else min(current_sl, entry * (1 + liq_distance))
+    def condicao(a, b):
+        o = v[a:b, P_OPEN]; c = v[a:b, P_CLOSE]; atr = v[a:b, P_ATR]
+        if compra: evento = (v[a:b, P_LOW] <= stop_nivel) | (o <= stop_nivel)
+        else: evento = (v[a:b, P_HIGH] >= stop_nivel) | (o >= stop_nivel)
+        profit_move = (c - entry) / entry if compra else (entry - c) / entry
+        with np.errstate(divide='ignore', invalid='ignore'):
+            evento |= profit_move / (atr / entry) >= 3.0
+        if pos.get('pyramid_count', 0) < 1: evento |= profit_move > (atr * 4.0) / entry
+        return evento
+    return pn.proximo_verdadeiro(condicao, ini, fim)
+
+def config_backtest():
+    # Tudo que muda o resultado da rodada (entra no config_hash do resultado.py)
+    return {"DATA_INICIO": DATA_INICIO, "DATA_FIM": DATA_FIM, "BANCA_INICIAL": BANCA_INICIAL, "TIMEFRAME": TIMEFRAME,
+            "ALAVANCAGEM": ALAVANCAGEM, "MAX_POSICOES": MAX_POSICOES, "MAX_ACCOUNT_MARGIN": MAX_ACCOUNT_MARGIN,
+            "SLIPPAGE": SLIPPAGE, "TAXA_CORRETORA": TAXA_CORRETORA, "COINS": COINS}
+
+def gravar_resultado(historico_global, banca, annual_stats):
+    with perfil.etapa("resultado"):
+        pasta = resultado.gravar("V1800", historico_global, BANCA_INICIAL, banca, config_backtest(), run_backtest,
+                                 annual_stats=annual_stats)
+    if pasta: print(f"💾 Resultado salvo em {pasta}")
+    return pasta
+
+def run_backtest(denso=False):
+    # denso=True visita todas as velas (conferência da pré-triagem do painel.py)
     raw_datasets = {}
+    perfil.iniciar("V1800")
+    with perfil.etapa("download"): klines_async.aquecer_cache(COINS, TIMEFRAME, DATA_INICIO, DATA_FIM, URLS_KLINES)
     for coin in COINS:
-        df = fetch_binance_data(coin, DATA_INICIO, DATA_FIM)
-        if df is not None: raw_datasets[coin] = calcular_features(df)
+        with perfil.etapa("download"): df = fetch_binance_data(coin, DATA_INICIO, DATA_FIM)
+        # Features já calculadas para essas velas/código vêm mapeadas do disco
+        if df is None: continue
+        with perfil.etapa("features"): raw_datasets[coin] = feature_store.features(coin, TIMEFRAME, df, calcular_features)
         
     if not raw_datasets: 
         print("\n❌ FALHA CRÍTICA: Dados não encontrados.")
         return
+    kline_cache.relatorio_memoria(raw_datasets)
+
+    with perfil.etapa("painel"):
+        painel = pn.montar_painel({coin: raw_datasets[coin] for coin in COINS if coin in raw_datasets}, CAMPOS_PAINEL)
+    timestamps = painel["tempos"]; anos = painel["anos"]
+    col = {coin: s for s, coin in enumerate(painel["moedas"])}
 
     print("🧠 Calculando Matriz Macro (Beta Exposure)...")
-    master_closes = pd.DataFrame({coin: raw_datasets[coin]['close'] for coin in COINS if coin in raw_datasets}).ffill()
-    master_returns = master_closes.pct_change().fillna(0)
-    
-    btc_returns = master_returns.get('BTCUSDT')
-    if btc_returns is not None:
-        btc_var = btc_returns.rolling(120).var()
-        portfolio_beta = pd.DataFrame(index=master_returns.index)
-        for coin in COINS:
-            if coin in master_returns:
-                cov = master_returns[coin].rolling(120).cov(btc_returns)
-                portfolio_beta[coin] = cov / btc_var.replace(0, np.nan)
-        market_beta_series = portfolio_beta.abs().mean(axis=1)
-    else:
-        market_beta_series = pd.Series(0.5, index=master_closes.index)
-
-    datasets = {coin: raw_datasets[coin].to_dict('index') for coin in COINS if coin in raw_datasets}
-    all_ts = set()
-    for coin in datasets: all_ts.update(datasets[coin].keys())
-    timestamps = sorted(list(all_ts))
+    # Covariância N x N da janela de 120 velas atualizada vela a vela (covariancia.py) e
+    # consultada só nas velas em que o scanner roda; sem BTC o beta fica fixo em 0.5
+    with perfil.etapa("matriz_beta"):
+        master_returns = pd.DataFrame(painel["valores"][:, :, P_CLOSE], index=timestamps).ffill().pct_change().fillna(0)
+        retornos = master_returns.to_numpy()
+    matriz_beta = cv.nova(painel["moedas"], 120, col['BTCUSDT']) if 'BTCUSDT' in col else None
+    velas_na_matriz = 0
+    print(f"🧱 Painel alinhado: {len(timestamps)} velas x {len(col)} moedas ({pn.tamanho_mb(painel):.1f} MB)")
     
     banca = BANCA_INICIAL
     historico_global = []
-    equity_curve = [BANCA_INICIAL]
+    curva = EquityTracker(BANCA_INICIAL)
     annual_stats = {year: {'start': 0, 'end': 0, 'pnl': 0, 'trades': 0, 'wins': 0} for year in range(2020, 2027)}
     posicoes_abertas = {} 
 
@@ -271,15 +242,27 @@ def run_backtest():
     consecutive_losses = 0
     BASE_RISK = 0.025 
 
-    for i in range(1, len(timestamps)-1):
-        ts_prev = timestamps[i-1]; ts_atual = timestamps[i]  
-        current_year = ts_atual.year
+    # Pré-triagem: só as velas com candidato a entrada, virada de ano ou saída possível
+    candidatos = candidatos_entrada(painel)
+    eventos = np.ones(len(timestamps), dtype=bool) if denso else candidatos.any(axis=1) | pn.viradas_de_ano(painel)
+    saidas = {} # símbolo -> próxima vela em que a posição pode mudar
+    # Velas do laço (no painel e por moeda), velas visitadas e posições abertas (perfil.py)
+    contadores = {"barras": len(timestamps) - 2, "barras_moeda": (len(timestamps) - 2) * len(col), "visitadas": 0, "aberturas": 0}
+
+    perfil.comecar("simulacao")
+    i_anterior = None
+    for i in pn.saltos(eventos, 1, len(timestamps)-1, lambda: min(saidas.values(), default=len(timestamps)-1)):
+        if i - 1 == i_anterior: linhas_prev, valido_prev = linhas_atual, valido_atual
+        else: linhas_prev, valido_prev = pn.linha(painel, i - 1)
+        linhas_atual, valido_atual = pn.linha(painel, i)
+        i_anterior = i
+        contadores["visitadas"] += 1
+        current_year = anos[i]
         if annual_stats[current_year]['start'] == 0: annual_stats[current_year]['start'] = banca
-        if ts_prev.year != ts_atual.year: annual_stats[ts_prev.year]['end'] = banca
+        if anos[i-1] != current_year: annual_stats[anos[i-1]]['end'] = banca
 
-        peak_equity = max(equity_curve)
-        dd = (peak_equity - banca) / peak_equity
-        evt_scalar = equity_vol_scalar(equity_volatility(equity_curve))
+        dd = curva.drawdown(banca)
+        evt_scalar = equity_vol_scalar(curva.volatilidade())
         
         dd_scalar = 1.0; hard_risk_off = False
         if dd > 0.35: hard_risk_off = True  
@@ -289,9 +272,9 @@ def run_backtest():
         combined_scalar = max(0.5, evt_scalar * dd_scalar)
         
         for symb in list(posicoes_abertas.keys()):
-            if ts_atual not in datasets[symb]: continue
-            row_atual = datasets[symb][ts_atual]
-            c_open = row_atual['open']; c_high = row_atual['high']; c_low = row_atual['low']; c_close = row_atual['close']
+            if not valido_atual[col[symb]]: continue
+            row_atual = linhas_atual[col[symb]]
+            c_open = row_atual[P_OPEN]; c_high = row_atual[P_HIGH]; c_low = row_atual[P_LOW]; c_close = row_atual[P_CLOSE]
             pos = posicoes_abertas[symb]
             fechou = False; motivo = ""; exit_price_raw = 0.0
             
@@ -304,10 +287,10 @@ def run_backtest():
             liq_price_short = pos['entry'] * (1 + liq_distance)
 
             profit_move = (c_close - pos['entry']) / pos['entry'] if pos['side'] == 'buy' else (pos['entry'] - c_close) / pos['entry']
-            profit_move_atr = profit_move / (row_atual['atr'] / pos['entry'])
+            profit_move_atr = profit_move / (row_atual[P_ATR] / pos['entry'])
 
             # 🚀 AJUSTE 3: LEVE PYRAMIDING CTA (Explora a confirmação direcional sem destruir o trade)
-            trigger_pyramid = (row_atual['atr'] * 4.0) / pos['entry']
+            trigger_pyramid = (row_atual[P_ATR] * 4.0) / pos['entry']
             if not fechou and pos.get('pyramid_count', 0) < 1 and profit_move > trigger_pyramid:
                 add_size = pos['size_usd'] * 0.50 
                 add_margem = add_size / ALAVANCAGEM
@@ -316,7 +299,7 @@ def run_backtest():
                     old_size = pos['size_usd']; old_entry = pos['entry']
                     new_size = old_size + add_size
                     
-                    vol_pyr = row_atual['atr'] / c_close
+                    vol_pyr = row_atual[P_ATR] / c_close
                     dyn_slip_pyr = SLIPPAGE + (vol_pyr * 0.25)
                     c_close_slip = c_close * (1 + dyn_slip_pyr) if pos['side'] == 'buy' else c_close * (1 - dyn_slip_pyr)
                     
@@ -352,12 +335,15 @@ def run_backtest():
                         dynamic_mult = 2.5   # Início saudável: deixa respirar
                     
                     if pos['side'] == 'buy':
-                        novo_trail = c_close - (row_atual['atr'] * dynamic_mult)
+                        novo_trail = c_close - (row_atual[P_ATR] * dynamic_mult)
                         pos['trail_sl'] = max(current_sl, novo_trail)
                     else:
-                        novo_trail = c_close + (row_atual['atr'] * dynamic_mult)
+                        novo_trail = c_close + (row_atual[P_ATR] * dynamic_mult)
                         pos['trail_sl'] = min(current_sl, novo_trail)
 
+            if not fechou and saidas[symb] <= i:
+                saidas[symb] = proxima_saida(painel, col[symb], pos, i + 1, len(timestamps)-1)
+
             if fechou:
                 exit_price = exit_price_raw * (1 - SLIPPAGE) if pos['side'] == 'buy' else exit_price_raw * (1 + SLIPPAGE)
                 pnl_bruto = (exit_price - pos['entry']) / pos['entry'] * pos['size_usd'] if pos['side'] == 'buy' else (pos['entry'] - exit_price) / pos['entry'] * pos['size_usd']
@@ -368,61 +354,71 @@ def run_backtest():
                 if "LIQUIDATION" in motivo: pnl_final = -pos['margem_usd'] 
                 
                 banca += pos['margem_usd'] + pnl_final
-                equity_curve.append(banca)
+                curva.registrar(banca)
                 
                 pnl_pct = pnl_final / banca_pre_trade
-                historico_global.append({'data': ts_atual, 'strat': pos['strat'], 'lucro': pnl_final, 'pnl_pct': pnl_pct})
+                historico_global.append({'data': timestamps[i], 'symbol': symb, 'side': pos['side'], 'strat': pos['strat'],
+                                         'motivo': motivo, 'lucro': pnl_final, 'pnl_pct': pnl_pct})
                 
-                annual_stats[ts_atual.year]['pnl'] += pnl_final
-                annual_stats[ts_atual.year]['trades'] += 1
+                annual_stats[current_year]['pnl'] += pnl_final
+                annual_stats[current_year]['trades'] += 1
                 
                 if pnl_final < 0:
                     consecutive_losses += 1
                 else:
-                    annual_stats[ts_atual.year]['wins'] += 1
+                    annual_stats[current_year]['wins'] += 1
                     consecutive_losses = 0 
                 
-                del posicoes_abertas[symb]
+                del posicoes_abertas[symb]; del saidas[symb]
                 
                 if banca <= 0.10: 
-                    print(f"\n💀 BANCA ZERO EM {ts_atual}!")
+                    print(f"\n💀 BANCA ZERO EM {timestamps[i]}!")
+                    perfil.terminar("simulacao"); perfil.contar(**contadores, fechamentos=len(historico_global))
+                    perfil.finalizar(gravar_resultado(historico_global, banca, annual_stats))
                     return
 
         if hard_risk_off or len(posicoes_abertas) >= MAX_POSICOES: continue
 
-        market_beta = market_beta_series.get(ts_prev, 0.5)
-        if pd.isna(market_beta): market_beta = 0.5
+        market_beta = 0.5
+        if matriz_beta is not None:
+            # Alcança a vela fechada i-1 (as velas puladas pela pré-triagem entram aqui de uma vez)
+            while velas_na_matriz < i:
+                cv.atualizar(matriz_beta, retornos[velas_na_matriz]); velas_na_matriz += 1
+            market_beta = cv.beta_medio(matriz_beta)
+            if pd.isna(market_beta): market_beta = 0.5
         net_exposure = sum((1 if p['side'] == 'buy' else -1) * p['size_usd'] for p in posicoes_abertas.values())
         effective_exposure = abs(net_exposure) * (1 + market_beta)
         max_portfolio_exposure = banca * ALAVANCAGEM * 0.8
+        candidato = candidatos[i].tolist()
         
         for symb in COINS:
             if symb in posicoes_abertas: continue
-            if ts_prev not in datasets[symb] or ts_atual not in datasets[symb]: continue
+            s = col.get(symb)
+            if s is None or not candidato[s]: continue
             
-            row_closed = datasets[symb][ts_prev]
-            atual_open = datasets[symb][ts_atual]['open'] 
+            row_closed = linhas_prev[s]
+            atual_open = linhas_atual[s][P_OPEN] 
             
-            phase = row_closed.get('market_phase', 0)
+            phase = row_closed[P_PHASE]
             if phase == 2: continue 
             
             signal = False; side = ""; strat = "CTA_APEX_ENGINE"
             
-            if bool(row_closed.get('long_signal', False)): signal = True; side = "buy"
-            elif bool(row_closed.get('short_signal', False)): signal = True; side = "sell"
+            if bool(row_closed[P_LONG]): signal = True; side = "buy"
+            elif bool(row_closed[P_SHORT]): signal = True; side = "sell"
 
             if signal:
                 entry_price = atual_open * (1 + SLIPPAGE) if side == "buy" else atual_open * (1 - SLIPPAGE)
                 
                 # Stop original relaxado para 2.2 ATR
-                sl_dist_base = row_closed['atr'] * 2.2
+                sl_dist_base = row_closed[P_ATR] * 2.2
                 dist_pct = abs(sl_dist_base) / entry_price
-                min_dist = (row_closed['atr'] * 1.0) / entry_price
+                min_dist = (row_closed[P_ATR] * 1.0) / entry_price
                 dist_pct = max(dist_pct, min_dist) 
                 
                 sl_price = entry_price - sl_dist_base if side == "buy" else entry_price + sl_dist_base
                 
-                asset_vol = row_closed['atr'] / entry_price
+                asset_vol = row_closed[P_ATR] / entry_price
                 vol_adjust = np.clip(0.02 / (asset_vol + 1e-9), 0.5, 1.5)
                 
                 risk_usd = banca * BASE_RISK * combined_scalar * vol_adjust
@@ -446,9 +442,13 @@ def run_backtest():
                     "sl": sl_price, "trail_sl": sl_price, "tp_price": 0, 
                     "size_usd": pos_size, "margem_usd": margem_alocada, "pyramid_count": 0
                 }
+                contadores["aberturas"] += 1
+                saidas[symb] = proxima_saida(painel, s, posicoes_abertas[symb], i + 1, len(timestamps)-1)
                 if len(posicoes_abertas) >= MAX_POSICOES: break
 
     annual_stats[timestamps[-1].year]['end'] = banca
+    perfil.terminar("simulacao"); perfil.contar(**contadores, fechamentos=len(historico_global))
+    pasta = gravar_resultado(historico_global, banca, annual_stats)
 
     print("\n" + "="*65)
     print(f"📊 RELATÓRIO V1800 (THE INSTITUTIONAL APEX)")
@@ -468,9 +468,10 @@ def run_backtest():
     print("="*65)
 
     if len(historico_global) > 10:
-        print("\n☢️ INICIANDO BLOCK BOOTSTRAP MONTE CARLO (2.000 SIMULAÇÕES) ☢️")
+        print(f"\n☢️ INICIANDO BLOCK BOOTSTRAP MONTE CARLO ({MC_SIMS:,} SIMULAÇÕES) ☢️".replace(",", "."))
         trade_returns_pct = [t['pnl_pct'] for t in historico_global]
-        mc_stress = monte_carlo_block_bootstrap(trade_returns_pct, BANCA_INICIAL, sims=2000, block_size=5)
+        with perfil.etapa("monte_carlo"):
+            mc_stress = monte_carlo_block_bootstrap(trade_returns_pct, BANCA_INICIAL, sims=MC_SIMS, block_size=5, seed=MC_SEED)
         
         print("\n" + "="*65)
         print("🎯 RESULTADO DO TESTE DE STRESS INSTITUCIONAL (BLOCO)")
@@ -479,6 +480,8 @@ def run_backtest():
         print(f"Pior Cenário Possível : ${mc_stress['worst_final']:.2f}")
         print(f"Drawdown Mediano      : {mc_stress['median_dd']*100:.1f}%")
         print(f"Pior Drawdown Absoluto: {mc_stress['worst_dd']*100:.1f}%")
+        pct = mc_stress['final_percentiles']
+        if pct: print(f"Faixa P5 - P95 Final  : ${pct[5]:.2f} - ${pct[95]:.2f}")
         print("-" * 65)
         ruin = mc_stress['ruin_prob'] * 100
         if ruin < 5.0:
@@ -488,6 +491,7 @@ def run_backtest():
         else:
             print(f"🔴 REPROVADO: Probabilidade de Ruína ({ruin:.1f}%). Não ative em live.")
         print("="*65)
+    perfil.finalizar(pasta)
 
 if __name__ == "__main__":
     run_backtest()
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import monte_carlo as mc
+
+# --- AGREGADOS DO HISTÓRICO DE TRADES (PARA O RELATÓRIO ANALÍTICO) ---
+# Tudo sai de uma tabela colunar montada uma vez (lucro, saldo, data, símbolo,
+# estratégia, motivo): os agregados por ano/símbolo/estratégia/motivo são um groupby
+# cada, e as curvas (drawdown, win rate móvel) são cumsum/cummax/rolling sobre a coluna
+# inteira, reduzidas a no máximo PONTOS_CURVA pontos para o gráfico. Aceita o diário do
+# bot, o histórico dos backtests e os trades de um pacote do resultado.py (colunas que
+# faltam ficam como "N/A").
+JANELA_WR = 50           # Trades na janela do win rate móvel
+PONTOS_CURVA = 2000      # Pontos gravados por curva (o pior drawdown de cada trecho é mantido)
+MC_SIMS = 1000
+MC_MIN_SIMS = 100
+MC_BLOCOS = (5,)
+MC_CELULAS = 50_000_000 # Teto de simulações x trades (com 500k trades: 100 simulações)
+FORMATO_DATA_BOT = "%d/%m/%Y %H:%M:%S"
+
+# "dd/mm/aaaa HH:MM:SS" -> "aaaa-mm-ddTHH:MM:SS" trocando os caracteres de lugar
+_ISO = [6, 7, 8, 9, 5, 3, 4, 2, 0, 1, 10, 11, 12, 13, 14, 15, 16, 17, 18]
+
+def _datas_bot(coluna):
+    # Caminho rápido para o diário inteiro no formato do bot (~6x o strptime do pandas);
+    # qualquer valor fora do formato levanta ValueError e cai no caminho genérico
+    if not all(isinstance(v, str) and len(v) == 19 for v in coluna): raise ValueError
+    c = np.asarray(coluna, dtype="U19").view("U1").reshape(-1, 19)[:, _ISO]
+    c[:, 4] = "-"; c[:, 7] = "-"; c[:, 10] = "T"
+    return pd.Series(np.ascontiguousarray(c).view("U19").ravel().astype("datetime64[s]"), index=coluna.index)
+
+def _datas(coluna):
+    if pd.api.types.is_datetime64_any_dtype(coluna): return coluna
+    try:
+        return _datas_bot(coluna)
+    except ValueError:
+        pass
+    # Diário do bot grava dd/mm/aaaa; o resto (Timestamp dos backtests, ISO) vai no genérico
+    datas = pd.to_datetime(coluna, format=FORMATO_DATA_BOT, errors="coerce")
+    falta = datas.isna() & coluna.notna()
+    if falta.any(): datas[falta] = pd.to_datetime(coluna[falta].astype(str), errors="coerce")
+    return datas
+
+def tabela(trades, saldo_inicial):
+    # trades: iterável de dicts (diário / historico_global) ou DataFrame
+    df = trades.copy() if isinstance(trades, pd.DataFrame) else pd.DataFrame.from_records(list(trades))
+    for c in ("symbol", "strat", "motivo"):
+        df[c] = df[c].fillna("N/A") if c in df else "N/A"
+    df["lucro"] = pd.to_numeric(df["lucro"], errors="coerce").fillna(0.0) if "lucro" in df else 0.0
+    df["saldo"] = saldo_inicial + df["lucro"].cumsum()
+    df["saldo_antes"] = df["saldo"] - df["lucro"]
+    # Retorno do trade sobre a banca de antes (o pnl_pct dos backtests, quando existe)
+    pct = df["lucro"] / df["saldo_antes"].where(df["saldo_antes"] != 0)
+    df["pnl_pct"] = pd.to_numeric(df["pnl_pct"], errors="coerce").fillna(pct) if "pnl_pct" in df else pct
+    df["data"] = _datas(df["data"]) if "data" in df else pd.NaT
+    df["ano"] = df["data"].dt.year.astype("Int64")
+    df["ganho"] = df["lucro"].clip(lower=0); df["perda"] = -df["lucro"].clip(upper=0)
+    df["win"] = df["lucro"] > 0
+    return df[["data", "ano", "symbol", "strat", "motivo", "lucro", "pnl_pct", "saldo_antes", "saldo", "ganho", "perda", "win"]]
+
+def agregar(df, chave):
+    # Uma linha por valor da chave: contagem, win rate, lucro, extremos e profit factor
+    g = df.groupby(chave, sort=True, dropna=False).agg(
+        trades=("lucro", "size"), wins=("win", "sum"), lucro=("lucro", "sum"), lucro_medio=("lucro", "mean"),
+        maior_ganho=("lucro", "max"), maior_perda=("lucro", "min"), ganhos=("ganho", "sum"), perdas=("perda", "sum"),
+        inicio=("saldo_antes", "first"), fim=("saldo", "last"))
+    g["win_rate"] = g["wins"] / g["trades"] * 100
+    g["profit_factor"] = g["ganhos"] / g["perdas"].where(g["perdas"] > 0)
+    g["roi"] = (g["fim"] - g["inicio"]) / g["inicio"].where(g["inicio"] != 0) * 100
+    colunas = ["trades", "wins", "win_rate", "lucro", "lucro_medio", "maior_ganho", "maior_perda", "profit_factor"]
+    if chave == "ano": colunas = ["inicio", "fim", "roi"] + colunas # Saldo de início/fim só faz sentido no tempo
+    return g[colunas].reset_index()
+
+def _trechos(n, pontos):
+    # Início de cada trecho contíguo (no máximo `pontos` trechos cobrindo os n trades)
+    return np.unique(np.linspace(0, n, min(pontos, n) + 1).astype(np.int64))[:-1]
+
+def curva_drawdown(df, pontos=PONTOS_CURVA):
+    saldo = df["saldo"].to_numpy()
+    if not len(saldo): return pd.DataFrame(columns=["trade", "data", "saldo", "pico", "drawdown"])
+    pico = np.maximum.accumulate(saldo)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dd = np.where(pico > 0, (saldo - pico) / pico * 100, 0.0)
+    ini = _trechos(len(saldo), pontos)
+    fim = np.r_[ini[1:], len(saldo)] - 1
+    return pd.DataFrame({"trade": fim + 1, "data": df["data"].to_numpy()[fim], "saldo": saldo[fim],
+                         "pico": pico[fim], "drawdown": np.minimum.reduceat(dd, ini)})
+
+def win_rate_movel(df, janela=JANELA_WR, pontos=PONTOS_CURVA):
+    wr = df["win"].astype(float).rolling(janela, min_periods=janela).mean().to_numpy() * 100
+    if not len(wr): return pd.DataFrame(columns=["trade", "data", "win_rate"])
+    fim = np.r_[_trechos(len(wr), pontos)[1:], len(wr)] - 1
+    return pd.DataFrame({"trade": fim + 1, "data": df["data"].to_numpy()[fim], "win_rate": wr[fim]})
+
+def resumo(df, saldo_inicial):
+    lucro = df["lucro"]
+    saldo_final = saldo_inicial + lucro.sum()
+    pico = np.maximum.accumulate(np.r_[saldo_inicial, df["saldo"].to_numpy()])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        max_dd = float(np.nanmax(np.where(pico > 0, (pico - np.r_[saldo_inicial, df["saldo"].to_numpy()]) / pico, 0.0)))
+    perdas = df["perda"].sum()
+    return {
+        "Trades": len(df),
+        "Banca Inicial ($)": saldo_inicial,
+        "Banca Final ($)": saldo_final,
+        "ROI (%)": (saldo_final - saldo_inicial) / saldo_inicial * 100 if saldo_inicial else float("nan"),
+        "Win Rate (%)": df["win"].mean() * 100 if len(df) else float("nan"),
+        "Lucro Médio ($)": lucro.mean() if len(df) else float("nan"),
+        "Profit Factor": df["ganho"].sum() / perdas if perdas > 0 else float("nan"),
+        "Max Drawdown (%)": max_dd * 100,
+        "Primeiro Trade": df["data"].min(),
+        "Último Trade": df["data"].max()
+    }
+
+def simulacoes(n_trades, sims=MC_SIMS):
+    # Históricos enormes: menos caminhos (cada um tem n_trades passos), nunca menos que MC_MIN_SIMS
+    return int(min(sims, max(MC_MIN_SIMS, MC_CELULAS // max(1, n_trades))))
+
+def bandas_monte_carlo(df, saldo_inicial, sims=MC_SIMS, block_sizes=MC_BLOCOS, seed=None):
+    # Block bootstrap do monte_carlo.py sobre os retornos dos trades (o lote de simulações
+    # encolhe lá dentro com o tamanho do histórico, a memória não cresce com 500k trades)
+    pct = df["pnl_pct"].fillna(0.0).to_numpy()
+    sims = simulacoes(len(pct), sims)
+    return {**mc.block_bootstrap(pct, saldo_inicial, sims=sims, block_sizes=block_sizes, seed=seed), "sims": sims}
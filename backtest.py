@@ -11,13 +11,13 @@ def install_package(package):
         print(f"📦 Biblioteca '{package}' não encontrada. Instalando agora...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", package])
 
-for lib in ["pandas", "pandas_ta", "requests", "numpy"]:
+for lib in ["pandas", "requests", "numpy"]:
     install_package(lib)
 
 import requests
-import pandas as pd
-import pandas_ta as ta
 import numpy as np
+import kline_cache
+import indicadores as ind
 
 # --- CONFIGURAÇÕES V70 (HYBRID FUSION) ---
 BANCA_INICIAL = 60.00
@@ -46,22 +46,20 @@ STOP_DRAWDOWN_GLOBAL = 0.25
 
 COINS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "ADAUSDT"]
 
-def fetch_binance_data(symbol, start_date_str):
+def _baixar_klines(symbol, start_ts, end_time):
     interval = "15m"
     limit = 1000
-    start_dt = datetime.strptime(start_date_str, "%Y-%m-%d")
-    current_start = int(start_dt.timestamp() * 1000)
-    end_time = int(datetime.now().timestamp() * 1000)
+    current_start = start_ts
     all_klines = []
     base_url = "https://data-api.binance.vision/api/v3/klines"
+    falhou = False
 
-    print(f"   📥 {symbol}...", end=" ", flush=True)
     empty_count = 0
     while True:
         params = {"symbol": symbol, "interval": interval, "startTime": current_start, "limit": limit}
         try:
             response = requests.get(base_url, params=params, timeout=10)
-            if response.status_code != 200: break
+            if response.status_code != 200: falhou = True; break
             data = response.json()
             if not data:
                 empty_count += 1
@@ -69,19 +67,29 @@ def fetch_binance_data(symbol, start_date_str):
                 current_start += (limit * 15 * 60 * 1000)
                 continue
             empty_count = 0
+            data = [x for x in data if x[0] <= end_time]
+            if not data: break
             all_klines.extend(data)
             current_start = data[-1][6] + 1
             if len(all_klines) % 5000 == 0: print(".", end=" ", flush=True)
             if len(data) < limit or current_start > end_time: break
             time.sleep(0.05)
-        except: break
-    print(f"✅ {len(all_klines)}")
-    if not all_klines: return None
-    df = pd.DataFrame(all_klines, columns=["open_time", "open", "high", "low", "close", "volume", "close_time", "q_vol", "trades", "taker_base", "taker_quote", "ignore"])
-    df["open_time"] = pd.to_datetime(df["open_time"], unit="ms")
-    for col in ["open", "high", "low", "close", "volume"]:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df.set_index("open_time", inplace=True)
+        except: falhou = True; break
+    # None = falha de rede (o cache não marca a faixa como coberta)
+    if falhou and not all_klines: return None
+    return all_klines
+
+def fetch_binance_data(symbol, start_date_str):
+    start_dt = datetime.strptime(start_date_str, "%Y-%m-%d")
+    start_ts = int(start_dt.timestamp() * 1000)
+    end_time = int(datetime.now().timestamp() * 1000)
+
+    print(f"   📥 {symbol}...", end=" ", flush=True)
+    # Cache local primeiro; a Binance só é consultada para as faixas que faltam
+    df = kline_cache.carregar_klines(symbol, "15m", start_ts, end_time,
+                                     lambda ini, fim: _baixar_klines(symbol, ini, fim), index_name="open_time")
+    print(f"✅ {len(df) if df is not None else 0}")
+    if df is None: return None
     return df
 
 def run_backtest_hybrid_v70():
@@ -103,11 +111,10 @@ def run_backtest_hybrid_v70():
         df = fetch_binance_data(sym, (inicio_dt - timedelta(days=2)).strftime("%Y-%m-%d"))
         if df is not None and not df.empty:
             # INDICADORES COMPLETOS
-            df["adx"] = ta.adx(df["high"], df["low"], df["close"])["ADX_14"]
-            df["rsi"] = ta.rsi(df["close"], length=14)
-            df["vol_ma"] = ta.sma(df["volume"], length=20)
-            bb = ta.bbands(df["close"], length=20, std=2)
-            df["lower"], df["upper"] = bb.iloc[:, 0], bb.iloc[:, 2]
+            df["adx"] = ind.adx(df["high"], df["low"], df["close"], 14, pandas_ta=True)
+            df["rsi"] = ind.rsi(df["close"], 14)
+            df["vol_ma"] = ind.sma(df["volume"], 20)
+            df["lower"], _, df["upper"] = ind.bbands(df["close"], 20, 2, ddof=0)
             dados[sym] = df.dropna()
 
     all_indices = []
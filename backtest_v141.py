@@ -4,8 +4,8 @@ import time
 from datetime import datetime
 import json
 import requests
-import pandas as pd
-import numpy as np
+import kline_cache
+import indicadores as ind
 
 # --- ESCOLHA O CENÁRIO ---
 CENARIO = 1
@@ -55,28 +55,19 @@ MAX_TRADES_SIMULTANEOS = 3
 TAXA_OPERACIONAL = 0.001
 
 # --- MOTOR DE DADOS ---
-def fetch_binance_data(symbol, start_date_str, end_date_str=None):
+def _baixar_klines(symbol, start_ts, end_ts):
     interval = TIMEFRAME
     limit = 1000
     base_url = "https://data-api.binance.vision/api/v3/klines"
-    
-    start_dt = datetime.strptime(start_date_str, "%Y-%m-%d")
-    start_ts = int(start_dt.timestamp() * 1000)
-    
-    if end_date_str:
-        end_ts = int(datetime.strptime(end_date_str, "%Y-%m-%d").timestamp() * 1000)
-    else:
-        end_ts = int(datetime.now().timestamp() * 1000)
-
-    print(f"📥 {symbol}...", end=" ", flush=True)
     all_klines = []
     current_start = start_ts
+    falhou = False
     
     while True:
         params = {"symbol": symbol, "interval": interval, "startTime": current_start, "limit": limit}
         try:
             response = requests.get(base_url, params=params, timeout=10)
-            if response.status_code != 200: break
+            if response.status_code != 200: falhou = True; break
             data = response.json()
             if not data: break
             
@@ -87,16 +78,26 @@ def fetch_binance_data(symbol, start_date_str, end_date_str=None):
             current_start = chunk[-1][0] + 1
             if len(data) < limit or current_start > end_ts: break
             time.sleep(0.1) 
-        except: break
-            
-    print(f"✅ {len(all_klines)}")
-    if not all_klines: return None
+        except: falhou = True; break
     
-    df = pd.DataFrame(all_klines, columns=["open_time", "open", "high", "low", "close", "volume", "ct", "qv", "tr", "tb", "tq", "ig"])
-    df["date"] = pd.to_datetime(df["open_time"], unit="ms")
-    for col in ["open", "high", "low", "close", "volume"]:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df.set_index("date", inplace=True)
+    # None = falha de rede (o cache não marca a faixa como coberta)
+    if falhou and not all_klines: return None
+    return all_klines
+
+def fetch_binance_data(symbol, start_date_str, end_date_str=None):
+    start_dt = datetime.strptime(start_date_str, "%Y-%m-%d")
+    start_ts = int(start_dt.timestamp() * 1000)
+    
+    if end_date_str:
+        end_ts = int(datetime.strptime(end_date_str, "%Y-%m-%d").timestamp() * 1000)
+    else:
+        end_ts = int(datetime.now().timestamp() * 1000)
+
+    print(f"📥 {symbol}...", end=" ", flush=True)
+    # Cache local primeiro; a Binance só é consultada para as faixas que faltam
+    df = kline_cache.carregar_klines(symbol, TIMEFRAME, start_ts, end_ts,
+                                     lambda ini, fim: _baixar_klines(symbol, ini, fim))
+    print(f"✅ {len(df) if df is not None else 0}")
     return df
 
 # --- INDICADORES ---
@@ -105,50 +106,19 @@ def calcular_indicadores_nativos(df):
     high = df['high']
     low = df['low']
     
-    df['ema_fast'] = close.ewm(span=EMA_FAST, adjust=False).mean()
-    df['ema_macro'] = close.ewm(span=EMA_MACRO, adjust=False).mean()
+    df['ema_fast'] = ind.ema(close, EMA_FAST)
+    df['ema_macro'] = ind.ema(close, EMA_MACRO)
 
-    prev_close = close.shift(1)
-    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
-    df['atr'] = tr.ewm(alpha=1/ATR_LEN, adjust=False).mean()
+    df['atr'] = ind.atr(high, low, close, ATR_LEN, adjust=False)
 
     # ADX
-    up, down = high - high.shift(1), low.shift(1) - low
-    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
-    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
-    tr_smooth = tr.ewm(alpha=1/14, adjust=False).mean()
-    plus_di = 100 * (pd.Series(plus_dm, index=df.index).ewm(alpha=1/14, adjust=False).mean() / tr_smooth)
-    minus_di = 100 * (pd.Series(minus_dm, index=df.index).ewm(alpha=1/14, adjust=False).mean() / tr_smooth)
-    dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
-    df['adx'] = dx.ewm(alpha=1/14, adjust=False).mean()
+    df['adx'] = ind.adx(high, low, close, 14, adjust=False)
 
     # CHOP
-    tr_roll_sum = tr.rolling(window=14).sum()
-    hh = high.rolling(window=14).max()
-    ll = low.rolling(window=14).min()
-    range_hl = (hh - ll).replace(0, 0.00001)
-    df['chop'] = 100 * np.log10(tr_roll_sum / range_hl) / np.log10(14)
+    df['chop'] = ind.chop(high, low, close, 14)
 
     # SuperTrend
-    hl2 = (high + low) / 2
-    df['st_basic_upper'] = hl2 + (ST_MULTIPLIER * df['atr'])
-    df['st_basic_lower'] = hl2 - (ST_MULTIPLIER * df['atr'])
-    st_lower = [0.0] * len(df); st_upper = [0.0] * len(df); st_trend = [1] * len(df)
-    close_vals = close.values
-    basic_upper = df['st_basic_upper'].values; basic_lower = df['st_basic_lower'].values
-    for i in range(1, len(df)):
-        if basic_lower[i] > st_lower[i-1] or close_vals[i-1] < st_lower[i-1]: st_lower[i] = basic_lower[i]
-        else: st_lower[i] = st_lower[i-1]
-        if basic_upper[i] < st_upper[i-1] or close_vals[i-1] > st_upper[i-1]: st_upper[i] = basic_upper[i]
-        else: st_upper[i] = st_upper[i-1]
-        if st_trend[i-1] == 1:
-            if close_vals[i] < st_lower[i]: st_trend[i] = -1
-            else: st_trend[i] = 1
-        else:
-            if close_vals[i] > st_upper[i]: st_trend[i] = 1
-            else: st_trend[i] = -1
-    df['supertrend'] = np.where(np.array(st_trend) == 1, st_lower, st_upper)
-    df['st_dir'] = st_trend
+    df['supertrend'], df['st_dir'] = ind.supertrend(high, low, close, df['atr'], ST_MULTIPLIER)
 
     df.dropna(inplace=True)
     return df
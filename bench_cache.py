@@ -0,0 +1,183 @@
+import io
+import os
+import sys
+import json
+import time
+import socket
+import types
+import shutil
+import tempfile
+import contextlib
+import importlib.util
+import importlib.machinery
+from datetime import datetime
+import numpy as np
+import kline_cache
+
+# --- CONFERÊNCIA DO CACHE DE KLINES (OFFLINE) ---
+# Roda o fetch_binance_data de um script de verdade contra um cache pré-semeado com
+# gravar_cache numa pasta temporária. A rede é trocada por um baixar() falso que levanta
+# erro se for chamado para uma faixa que o cache já cobre. Cenários:
+#   coberto      faixa toda no cache -> nenhuma chamada
+#   cabeca_cauda só a cabeça e a cauda que faltam são pedidas; a vela ainda aberta
+#                volta no DataFrame mas não vai para o disco; meta.json cobre a faixa nova
+#   falha        baixar() devolve None (falha de rede) -> meta["fim"] não anda
+#   corrompido   coluna ilegível -> cache ignorado, faixa inteira baixada e regravada
+#   tipo_antigo  cache com volume float64 (formato antigo) lido como float32
+#   sem_rede     nenhum socket de verdade foi aberto durante os cenários
+# Só os scripts mantidos, que baixam pelo klines_async.baixar_faixa: os legados
+# (backtest.py, backtest_v134/V136/v141) têm o próprio downloader com requests.
+# Uso: python bench_cache.py [script]  (sem argumento: os três)
+SCRIPTS = ["Backtest_V164_Validado", "Backtest_28022026", "Backtest25112026.py"]
+SYMBOL = "BTCUSDT"
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+def carregar_script(path):
+    # Os scripts sem extensão não são importáveis por nome, carrega direto do arquivo
+    loader = importlib.machinery.SourceFileLoader("cache_" + os.path.basename(path).split(".")[0].lower(), path)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    mod = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()): loader.exec_module(mod)
+    return mod
+
+def _ms(data):
+    # Mesma conversão do fetch_binance_data (datetime local)
+    return int(datetime.strptime(data, "%Y-%m-%d").timestamp() * 1000)
+
+def velas(ini, fim, ms):
+    # Klines cruas (strings, como a API) de todas as velas que abrem em [ini, fim] e já abriram
+    agora = int(time.time() * 1000)
+    t = -(-ini // ms) * ms
+    saida = []
+    while t <= min(fim, agora):
+        c = 100 + (t // ms) % 97
+        saida.append([t, f"{c}", f"{c + 1}", f"{c - 1}", f"{c + 0.5}", f"{(t // ms) % 13 + 1}", t + ms - 1])
+        t += ms
+    return saida
+
+def semear(interval, ini, fim, tipo_volume=np.float32):
+    # Cache cobrindo [ini, fim] só com velas fechadas
+    dados = kline_cache.klines_para_arrays(velas(ini, fim, kline_cache.INTERVALO_MS[interval]))
+    dados["volume"] = dados["volume"].astype(tipo_volume)
+    kline_cache.gravar_cache(SYMBOL, interval, dados, ini, fim)
+
+def meta(interval):
+    with open(os.path.join(kline_cache._pasta(SYMBOL, interval), "meta.json"), "r") as f: return json.load(f)
+
+def no_disco(interval):
+    return np.load(os.path.join(kline_cache._pasta(SYMBOL, interval), "open_time.npy"))
+
+def rede_falsa(coberto, ms, falha=False):
+    # baixar_faixa falso: registra cada pedido e recusa faixas que o cache já tem
+    pedidos = []
+    def baixar_faixa(symbol, interval, ini, fim, *args, **kwargs):
+        if coberto is not None and ini <= coberto[1] and fim >= coberto[0]:
+            raise AssertionError(f"pediu faixa já coberta: {ini}-{fim} x {coberto}")
+        pedidos.append((ini, fim))
+        return None if falha else velas(ini, fim, ms)
+    return pedidos, types.SimpleNamespace(baixar_faixa=baixar_faixa)
+
+def buscar(mod, rede, inicio, fim):
+    mod.klines_async = rede
+    with contextlib.redirect_stdout(io.StringIO()): return mod.fetch_binance_data(SYMBOL, inicio, fim)
+
+@contextlib.contextmanager
+def sem_rede(tentativas):
+    # Qualquer conexão/DNS de verdade é registrada e recusada (um except no script não esconde)
+    def recusar(*args, **kwargs):
+        tentativas.append(args[1:] if args and isinstance(args[0], socket.socket) else args)
+        raise OSError("bench_cache: acesso à rede bloqueado")
+    originais = (socket.socket.connect, socket.socket.connect_ex, socket.create_connection, socket.getaddrinfo)
+    socket.socket.connect = socket.socket.connect_ex = recusar
+    socket.create_connection = socket.getaddrinfo = recusar
+    try:
+        yield
+    finally:
+        socket.socket.connect, socket.socket.connect_ex, socket.create_connection, socket.getaddrinfo = originais
+
+def cenarios(mod):
+    interval = mod.TIMEFRAME; ms = kline_cache.INTERVALO_MS[interval]
+    agora = int(time.time() * 1000)
+    ultimo_fechado = agora - ms
+    # Faixa semeada: de 60 a 10 dias atrás (alinhada nas velas), tudo fechado
+    c_ini = (agora - 60 * 86_400_000) // ms * ms
+    c_fim = (agora - 10 * 86_400_000) // ms * ms - 1
+    cabeca = time.strftime("%Y-%m-%d", time.localtime((c_ini - 30 * 86_400_000) / 1000))
+    amanha = time.strftime("%Y-%m-%d", time.localtime((agora + 86_400_000) / 1000)) # Cauda passa do "agora"
+    res = {}
+
+    # 1) Faixa toda coberta: nenhuma chamada à rede
+    semear(interval, c_ini, c_fim)
+    pedidos, rede = rede_falsa((c_ini, c_fim), ms)
+    dentro_ini = time.strftime("%Y-%m-%d", time.localtime((c_ini + 86_400_000) / 1000))
+    dentro_fim = time.strftime("%Y-%m-%d", time.localtime((c_fim - 86_400_000) / 1000))
+    df = buscar(mod, rede, dentro_ini, dentro_fim)
+    res["coberto"] = not pedidos and df is not None and len(df) > 0
+
+    # 2) Cabeça + cauda até agora: só o que falta, vela aberta fora do disco
+    pedidos, rede = rede_falsa((c_ini, c_fim), ms)
+    df = buscar(mod, rede, cabeca, amanha)
+    m = meta(interval); ot = no_disco(interval)
+    aberta = agora // ms * ms # Vela que abriu e ainda não fechou
+    res["cabeca_cauda"] = (
+        pedidos == [(_ms(cabeca), c_ini - 1), (c_fim + 1, pedidos[-1][1])] and pedidos[-1][1] >= agora - 60_000
+        and df is not None and int(df.index[-1].value // 1_000_000) == aberta
+        and ot.max() <= ultimo_fechado and aberta not in set(ot.tolist())
+        and m["inicio"] == _ms(cabeca) and c_fim < m["fim"] < aberta
+        and np.all(np.diff(ot) == ms))
+
+    # 3) Falha de rede na cauda: a cobertura não anda
+    semear(interval, c_ini, c_fim)
+    pedidos, rede = rede_falsa((c_ini, c_fim), ms, falha=True)
+    df = buscar(mod, rede, dentro_ini, amanha)
+    m = meta(interval)
+    res["falha"] = len(pedidos) == 1 and m["fim"] == c_fim and m["inicio"] == c_ini and df is not None
+
+    # 4) Coluna corrompida: cache ignorado, faixa inteira baixada de novo
+    semear(interval, c_ini, c_fim)
+    with open(os.path.join(kline_cache._pasta(SYMBOL, interval), "close.npy"), "wb") as f: f.write(b"lixo")
+    pedidos, rede = rede_falsa(None, ms)
+    with contextlib.redirect_stdout(io.StringIO()): df = buscar(mod, rede, dentro_ini, dentro_fim)
+    res["corrompido"] = (pedidos == [(_ms(dentro_ini), _ms(dentro_fim))] and df is not None
+                         and kline_cache.ler_cache(SYMBOL, interval) is not None)
+
+    # 5) Cache antigo com volume float64: lido como float32, sem ir à rede
+    shutil.rmtree(kline_cache._pasta(SYMBOL, interval))
+    semear(interval, c_ini, c_fim, tipo_volume=np.float64)
+    pedidos, rede = rede_falsa((c_ini, c_fim), ms)
+    df = buscar(mod, rede, dentro_ini, dentro_fim)
+    lido = kline_cache.ler_cache(SYMBOL, interval)
+    res["tipo_antigo"] = (not pedidos and lido is not None and lido[0]["volume"].dtype == np.float32
+                          and all(lido[0][c].dtype == t for c, t in kline_cache.TIPOS.items()))
+    return res
+
+def conferir(script):
+    tentativas = []
+    original = kline_cache.CACHE_DIR
+    kline_cache.CACHE_DIR = tempfile.mkdtemp(prefix="bench_cache_")
+    try:
+        with sem_rede(tentativas):
+            mod = carregar_script(os.path.join(PASTA, script))
+            print(f"🗄️ Cache de klines offline ({script}, {mod.TIMEFRAME})")
+            res = cenarios(mod)
+    finally:
+        shutil.rmtree(kline_cache.CACHE_DIR, ignore_errors=True)
+        kline_cache.CACHE_DIR = original
+    res["sem_rede"] = not tentativas
+    for nome, ok in res.items(): print(f"{'✅' if ok else '❌'} {nome}")
+    if tentativas: print(f"   ❌ {len(tentativas)} tentativa(s) de rede: {tentativas[0]}")
+    return sum(not ok for ok in res.values())
+
+def main(scripts=SCRIPTS):
+    falhas = 0
+    print("-" * 65)
+    for script in scripts:
+        if script not in SCRIPTS:
+            print(f"❌ {script} não baixa pelo klines_async (use um de: {', '.join(SCRIPTS)})")
+            falhas += 1; continue
+        falhas += conferir(script)
+        print("-" * 65)
+    return falhas
+
+if __name__ == "__main__":
+    sys.exit(1 if main(sys.argv[1:] or SCRIPTS) else 0)
@@ -0,0 +1,104 @@
+import sys
+import json
+import time
+import random
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import requests
+import kline_cache
+import klines_async
+
+# --- SERVIDOR DE KLINES FALSO + BENCHMARK DO DOWNLOAD ---
+# Sobe localmente um servidor com a mesma API de /klines da Binance (velas determinísticas,
+# latência por requisição, 451 numa "região bloqueada" e 429 com Retry-After de vez em quando)
+# e compara o laço antigo dos scripts (um símbolo e uma página por vez) com o klines_async.
+# Confere que as duas listas de velas são idênticas e mede o tempo de cada um.
+# Uso: python bench_download.py [dias] [latencia_ms]
+
+INTERVALO = "15m"
+MOEDAS = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "ADAUSDT"]
+INICIO_MS = 1577836800000 # 2020-01-01
+DIAS = 365
+
+def vela(symbol, t):
+    rng = random.Random(f"{symbol}{t}")
+    c = 100 + rng.random()
+    return [t, f"{c:.4f}", f"{c * 1.01:.4f}", f"{c * 0.99:.4f}", f"{c:.4f}", f"{rng.random() * 1000:.2f}",
+            t + 899_999, "0", 10, "0", "0", "0"]
+
+def servidor(latencia, prob_429=0.02):
+    ms = kline_cache.INTERVALO_MS[INTERVALO]
+    contagem = {"req": 0, "429": 0, "451": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args): pass
+
+        def do_GET(self):
+            url = urlparse(self.path); q = {k: v[0] for k, v in parse_qs(url.query).items()}
+            contagem["req"] += 1
+            time.sleep(latencia)
+            if url.path.startswith("/bloqueado"):
+                contagem["451"] += 1; self.send_response(451); self.end_headers(); return
+            if random.random() < prob_429:
+                contagem["429"] += 1
+                self.send_response(429); self.send_header("Retry-After", "1"); self.end_headers(); return
+            ini = int(q["startTime"]); ini += -ini % ms
+            fim = int(q.get("endTime", 2 ** 62)); limite = int(q.get("limit", 500))
+            agora = INICIO_MS + DIAS * 86_400_000
+            corpo = json.dumps([vela(q["symbol"], t) for t in range(ini, min(fim, agora) + 1, ms)][:limite]).encode()
+            self.send_response(200); self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(corpo))); self.end_headers(); self.wfile.write(corpo)
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, contagem
+
+def laco_antigo(base_url, symbol, start_ts, end_ts):
+    # _baixar_klines dos backtests (sem o sleep entre páginas): uma página por vez
+    all_klines = []; current_start = start_ts
+    while True:
+        r = requests.get(base_url, params={"symbol": symbol, "interval": INTERVALO, "startTime": current_start, "limit": 1000}, timeout=15)
+        if r.status_code in [429, 451]: time.sleep(1); continue
+        d = r.json()
+        chunk = [x for x in d if x[0] <= end_ts]
+        if not chunk: break
+        all_klines.extend(chunk)
+        current_start = chunk[-1][0] + 1
+        if current_start > end_ts: break
+    return all_klines
+
+def main(dias=365, latencia_ms=40):
+    global DIAS
+    DIAS = dias
+    srv, contagem = servidor(latencia_ms / 1000)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    urls = [f"{base}/bloqueado/klines", f"{base}/api/v3/klines"]
+    klines_async.PESOS[f"127.0.0.1:{srv.server_address[1]}"] = (6000 * 0.8, 2)
+    fim = INICIO_MS + dias * 86_400_000 - 1
+    print(f"📡 Download de klines | {len(MOEDAS)} moedas x {dias} dias de {INTERVALO} | latência {latencia_ms} ms")
+    print("-" * 65)
+
+    t0 = time.perf_counter()
+    antigo = {s: laco_antigo(urls[1], s, INICIO_MS, fim) for s in MOEDAS}
+    t_antigo = time.perf_counter() - t0
+    req_antigo = contagem["req"]
+    print(f"⏱️ Sequencial (laço antigo) | {t_antigo:6.1f}s | {req_antigo} requisições")
+
+    contagem.update({"req": 0, "429": 0, "451": 0})
+    t0 = time.perf_counter()
+    novo = klines_async.baixar({s: (s, INICIO_MS, fim) for s in MOEDAS}, INTERVALO, urls)
+    t_novo = time.perf_counter() - t0
+    print(f"⏱️ klines_async            | {t_novo:6.1f}s | {contagem['req']} requisições | "
+          f"{contagem['429']} x 429 | {contagem['451']} x 451 | {t_antigo / t_novo:.1f}x")
+
+    igual = all(novo[s] is not None and [k[0] for k in novo[s]] == [k[0] for k in antigo[s]] and novo[s] == antigo[s] for s in MOEDAS)
+    velas = sum(len(v) for v in novo.values() if v)
+    print(f"{'✅' if igual else '❌'} Mesmas velas, em ordem e sem repetição: {igual} ({velas} velas)")
+    print("-" * 65)
+    srv.shutdown()
+    return 0 if igual else 1
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 365, int(sys.argv[2]) if len(sys.argv) > 2 else 40))
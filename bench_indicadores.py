@@ -0,0 +1,184 @@
+import time
+import numpy as np
+import pandas as pd
+import indicadores as ind
+
+# --- PARIDADE + BENCHMARK DA BIBLIOTECA DE INDICADORES ---
+# Compara cada kernel de indicadores.py com a implementação pandas que os scripts
+# usavam antes (mesmas fórmulas, copiadas daqui para não depender da rede/pandas_ta)
+# e mede o ganho numa série sintética de 200k velas de 15m.
+# Uso: python bench_indicadores.py [n_velas]
+TOLERANCIA = 1e-9 # erro relativo máximo aceito
+# O rolling().std() do pandas é um algoritmo online que acumula ~1e-6 de erro relativo em
+# séries longas (a versão cumsum em blocos fica em ~1e-9 do desvio exato), então as BB
+# são comparadas com tolerância própria.
+TOLERANCIA_BB = 1e-6
+
+def serie_sintetica(n, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + rng.random(n) * 0.003)
+    low = np.minimum(open_, close) * (1 - rng.random(n) * 0.003)
+    idx = pd.date_range("2020-01-01", periods=n, freq="15min")
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close}, index=idx)
+
+# --- REFERÊNCIAS (código original dos scripts) ---
+def ref_v164(df):
+    c = df['close']; h = df['high']; l = df['low']; out = {}
+    out['ema20'] = c.ewm(span=20).mean()
+    out['ema800'] = c.ewm(span=800).mean()
+    tr = pd.concat([h-l, (h-c.shift(1)).abs(), (l-c.shift(1)).abs()], axis=1).max(axis=1)
+    out['atr'] = tr.ewm(alpha=1/14).mean()
+    up, down = h - h.shift(1), l.shift(1) - l
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    tr_s = tr.ewm(alpha=1/14).mean()
+    plus_di = 100*(pd.Series(plus_dm, index=df.index).ewm(alpha=1/14).mean()/tr_s)
+    minus_di = 100*(pd.Series(minus_dm, index=df.index).ewm(alpha=1/14).mean()/tr_s)
+    dx = 100*(abs(plus_di-minus_di)/(plus_di+minus_di))
+    out['adx'] = dx.ewm(alpha=1/14).mean()
+    bb_mean = c.rolling(20).mean(); bb_std = c.rolling(20).std()
+    out['bb_u'] = bb_mean + 2*bb_std; out['bb_l'] = bb_mean - 2*bb_std
+    return out
+
+def lib_v164(df):
+    c = df['close']; h = df['high']; l = df['low']; out = {}
+    out['ema20'] = ind.ema(c, 20, adjust=True)
+    out['ema800'] = ind.ema(c, 800, adjust=True)
+    out['atr'] = ind.atr(h, l, c, 14, adjust=True)
+    out['adx'] = ind.adx(h, l, c, 14, adjust=True)
+    out['bb_l'], _, out['bb_u'] = ind.bbands(c, 20, 2, ddof=1)
+    return out
+
+def ref_v141(df):
+    close = df['close']; high = df['high']; low = df['low']; out = {}
+    out['ema_macro'] = close.ewm(span=800, adjust=False).mean()
+    prev_close = close.shift(1)
+    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    out['atr'] = tr.ewm(alpha=1/14, adjust=False).mean()
+    up, down = high - high.shift(1), low.shift(1) - low
+    plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    tr_smooth = tr.ewm(alpha=1/14, adjust=False).mean()
+    plus_di = 100 * (pd.Series(plus_dm, index=df.index).ewm(alpha=1/14, adjust=False).mean() / tr_smooth)
+    minus_di = 100 * (pd.Series(minus_dm, index=df.index).ewm(alpha=1/14, adjust=False).mean() / tr_smooth)
+    dx = 100 * (abs(plus_di - minus_di) / (plus_di + minus_di))
+    out['adx'] = dx.ewm(alpha=1/14, adjust=False).mean()
+    tr_roll_sum = tr.rolling(window=14).sum()
+    range_hl = (high.rolling(window=14).max() - low.rolling(window=14).min()).replace(0, 0.00001)
+    out['chop'] = 100 * np.log10(tr_roll_sum / range_hl) / np.log10(14)
+    return out
+
+def lib_v141(df):
+    close = df['close']; high = df['high']; low = df['low']; out = {}
+    out['ema_macro'] = ind.ema(close, 800)
+    out['atr'] = ind.atr(high, low, close, 14, adjust=False)
+    out['adx'] = ind.adx(high, low, close, 14, adjust=False)
+    out['chop'] = ind.chop(high, low, close, 14)
+    return out
+
+def _ta_rma(x, n): return x.ewm(alpha=1/n, min_periods=n).mean()
+
+def ref_pandas_ta(df):
+    # Definições do pandas_ta 0.3.x (ema com semente SMA, rma, bbands ddof=0)
+    c = df['close'].copy(); h = df['high']; l = df['low']; out = {}
+    seed = c.copy(); seed.iloc[19] = seed.iloc[:20].mean(); seed.iloc[:19] = np.nan
+    out['ema20'] = seed.ewm(span=20, adjust=False).mean()
+    tr = pd.concat([h-l, (h-c.shift()).abs(), (l-c.shift()).abs()], axis=1).max(axis=1); tr.iloc[0] = np.nan
+    atr = _ta_rma(tr, 14); out['atr'] = atr
+    up = h - h.shift(); dn = l.shift() - l
+    pos = ((up > dn) & (up > 0)) * up; neg = ((dn > up) & (dn > 0)) * dn
+    k = 100 / atr; dmp = k * _ta_rma(pos, 14); dmn = k * _ta_rma(neg, 14)
+    out['adx'] = _ta_rma(100 * (dmp - dmn).abs() / (dmp + dmn), 14)
+    mid = c.rolling(20).mean(); dev = c.rolling(20).std(ddof=0)
+    out['bb_l'] = mid - 2 * dev; out['bb_u'] = mid + 2 * dev
+    neg_d = c.diff(); pos_d = neg_d.copy(); pos_d[pos_d < 0] = 0; neg_d[neg_d > 0] = 0
+    pa = _ta_rma(pos_d, 14); na = _ta_rma(neg_d, 14)
+    out['rsi'] = 100 * pa / (pa + na.abs())
+    return out
+
+def lib_pandas_ta(df):
+    c = df['close']; h = df['high']; l = df['low']; out = {}
+    out['ema20'] = ind.ema(c, 20, sma_seed=True)
+    out['atr'] = ind.atr(h, l, c, 14, pandas_ta=True)
+    out['adx'] = ind.adx(h, l, c, 14, pandas_ta=True)
+    out['bb_l'], _, out['bb_u'] = ind.bbands(c, 20, 2.0, ddof=0)
+    out['rsi'] = ind.rsi(c, 14)
+    return out
+
+def ref_supertrend(df, mult=3.0):
+    # Laço original de calcular_indicadores_nativos (V134/V136/V141)
+    close = df['close']; high = df['high']; low = df['low']
+    atr = ind.atr(high, low, close, 14, adjust=False)
+    hl2 = (high + low) / 2
+    basic_upper = (hl2 + (mult * atr)).values; basic_lower = (hl2 - (mult * atr)).values
+    st_lower = [0.0] * len(df); st_upper = [0.0] * len(df); st_trend = [1] * len(df)
+    close_vals = close.values
+    for i in range(1, len(df)):
+        if basic_lower[i] > st_lower[i-1] or close_vals[i-1] < st_lower[i-1]: st_lower[i] = basic_lower[i]
+        else: st_lower[i] = st_lower[i-1]
+        if basic_upper[i] < st_upper[i-1] or close_vals[i-1] > st_upper[i-1]: st_upper[i] = basic_upper[i]
+        else: st_upper[i] = st_upper[i-1]
+        if st_trend[i-1] == 1:
+            if close_vals[i] < st_lower[i]: st_trend[i] = -1
+            else: st_trend[i] = 1
+        else:
+            if close_vals[i] > st_upper[i]: st_trend[i] = 1
+            else: st_trend[i] = -1
+    return np.where(np.array(st_trend) == 1, st_lower, st_upper), np.array(st_trend)
+
+def bench_supertrend(df, mult=3.0):
+    # Micro-benchmark do SuperTrend: exige igualdade BIT A BIT em todos os motores disponíveis
+    atr = ind.atr(df['high'], df['low'], df['close'], 14, adjust=False)
+    ref_st, ref_dir = ref_supertrend(df, mult)
+    t_ref = cronometrar(lambda d: ref_supertrend(d, mult), df)
+    motores = ["numpy"] + (["numba"] if ind._supertrend_jit() is not None else [])
+    falhas = 0
+    for motor in motores:
+        st, st_dir = ind.supertrend(df['high'], df['low'], df['close'], atr, mult, motor=motor) # aquece o JIT
+        igual = np.array_equal(ref_st.view(np.int64), st.view(np.int64)) and np.array_equal(ref_dir, st_dir)
+        if not igual: falhas += 1
+        t = cronometrar(lambda d: ind.supertrend(d['high'], d['low'], d['close'], atr, mult, motor=motor), df)
+        print(f"{'✅' if igual else '❌'} SuperTrend {motor:<5} | bit a bit: {igual} | laço {t_ref*1000:8.1f} ms | {t*1000:8.1f} ms | {t_ref/t:6.1f}x")
+    if ind._supertrend_jit() is None: print("ℹ️ numba não instalado: só a versão NumPy foi medida")
+    print("-" * 65)
+    return falhas
+
+def erro_relativo(ref, novo):
+    ref = np.asarray(ref, dtype=np.float64); novo = np.asarray(novo, dtype=np.float64)
+    if not np.array_equal(np.isnan(ref), np.isnan(novo)): return np.inf
+    ok = ~np.isnan(ref)
+    return float(np.max(np.abs(ref[ok] - novo[ok]) / np.maximum(np.abs(ref[ok]), 1e-12))) if ok.any() else 0.0
+
+def cronometrar(fn, df, repeticoes=3):
+    melhor = np.inf
+    for _ in range(repeticoes):
+        t0 = time.perf_counter(); fn(df); melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+def main(n=200_000):
+    df = serie_sintetica(n)
+    print(f"📐 Paridade + benchmark em {n} velas de 15m")
+    print("-" * 65)
+    falhas = 0
+    for nome, ref_fn, lib_fn in [("V164 nativo", ref_v164, lib_v164),
+                                 ("V134/V136/V141", ref_v141, lib_v141),
+                                 ("pandas_ta", ref_pandas_ta, lib_pandas_ta)]:
+        ref = ref_fn(df); novo = lib_fn(df)
+        for col in ref:
+            err = erro_relativo(ref[col], novo[col])
+            tol = TOLERANCIA_BB if col.startswith('bb_') else TOLERANCIA
+            status = "✅" if err <= tol else "❌"
+            if err > tol: falhas += 1
+            print(f"{status} {nome:<15} | {col:<10} | erro rel. máx {err:.2e}")
+        t_ref = cronometrar(ref_fn, df); t_lib = cronometrar(lib_fn, df)
+        print(f"⏱️ {nome:<15} | pandas {t_ref*1000:8.1f} ms | numpy {t_lib*1000:8.1f} ms | {t_ref/t_lib:5.1f}x")
+        print("-" * 65)
+    falhas += bench_supertrend(df)
+    return falhas
+
+if __name__ == "__main__":
+    import sys
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    sys.exit(1 if main(n) else 0)
@@ -0,0 +1,72 @@
+import sys
+import time
+import numpy as np
+import monte_carlo as mc
+
+# --- PARIDADE + BENCHMARK DO MONTE CARLO VETORIZADO ---
+# 1) Paridade: o laço trade a trade dos scripts, rodado sobre as MESMAS séries sorteadas,
+#    tem que dar exatamente o mesmo capital final e drawdown de simular_caminhos.
+# 2) Benchmark: laço antigo (2.000 sims) contra o motor em lotes (2.000 e 100.000 sims).
+# Uso: python bench_monte_carlo.py [n_trades]
+
+def trades_sinteticos(n, seed=3):
+    rng = np.random.default_rng(seed)
+    ganho = rng.random(n) < 0.45
+    return np.where(ganho, rng.uniform(0.01, 0.08, n), -rng.uniform(0.005, 0.03, n))
+
+def laco_antigo(pnl_linha, initial_capital):
+    # Composição do monte_carlo_block_bootstrap original (sem o sorteio)
+    equity = initial_capital; peak = equity; max_dd = 0
+    for pnl_pct in pnl_linha:
+        equity *= (1 + pnl_pct)
+        peak = max(peak, equity)
+        if peak > 0:
+            dd = (peak - equity) / peak
+            max_dd = max(max_dd, dd)
+        if equity <= initial_capital * 0.05:
+            equity = 0
+            break
+    return equity, max_dd
+
+def monte_carlo_antigo(trades_pct, initial_capital, sims=2000, block_size=5):
+    trades_pct = np.array(trades_pct); n_trades = len(trades_pct); results = []
+    for _ in range(sims):
+        sampled_trades = []
+        while len(sampled_trades) < n_trades:
+            idx = np.random.randint(0, n_trades - block_size + 1)
+            sampled_trades.extend(trades_pct[idx:idx + block_size])
+        sampled = []
+        for pnl_pct in sampled_trades[:n_trades]:
+            if np.random.rand() < 0.005:
+                pnl_pct = pnl_pct * np.random.uniform(3.0, 6.0) if pnl_pct < 0 else pnl_pct * 0.1
+            sampled.append(pnl_pct)
+        results.append(laco_antigo(sampled, initial_capital))
+    return results
+
+def main(n=500):
+    trades = trades_sinteticos(n)
+    falhas = 0
+    print(f"🎲 Monte Carlo block bootstrap | {n} trades")
+    print("-" * 65)
+
+    # Paridade com alavancagem forçada para incluir caminhos que quebram
+    for nome, escala, tamanhos in [("normal", 1.0, (5,)), ("ruína", 6.0, (10, 20, 30))]:
+        rng = np.random.default_rng(11)
+        pnl = mc._chocar(rng, trades[mc._indices_blocos(rng, 500, n, tamanhos)] * escala, 0.005)
+        finais, dds, _ = mc.simular_caminhos(pnl.copy(), 60.0)
+        ref = [laco_antigo(linha, 60.0) for linha in pnl]
+        igual = (np.array_equal(finais, [r[0] for r in ref]) and np.array_equal(dds, [r[1] for r in ref]))
+        if not igual: falhas += 1
+        print(f"{'✅' if igual else '❌'} Paridade ({nome:<6}) | {int((finais == 0).sum())}/500 ruínas | bit a bit: {igual}")
+
+    np.random.seed(0)
+    t0 = time.perf_counter(); monte_carlo_antigo(trades, 60.0, sims=2000); t_antigo = time.perf_counter() - t0
+    print(f"⏱️ Laço antigo      |   2.000 sims | {t_antigo:7.2f} s")
+    for sims in [2000, 100_000]:
+        t0 = time.perf_counter(); res = mc.block_bootstrap(trades, 60.0, sims=sims, seed=42); t = time.perf_counter() - t0
+        print(f"⏱️ Vetorizado       | {sims:7,d} sims | {t:7.2f} s | mediana ${res['median_final']:.2f} | ruína {res['ruin_prob']*100:.1f}%".replace(",", "."))
+    print("-" * 65)
+    return falhas
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 500) else 0)
@@ -0,0 +1,217 @@
+import io
+import os
+import sys
+import json
+import time
+import types
+import zlib
+import random
+import shutil
+import platform
+import tempfile
+import subprocess
+import contextlib
+import importlib.util
+import importlib.machinery
+import numpy as np
+import pandas as pd
+
+# --- BENCHMARK DOS SIMULADORES EM MERCADO SINTÉTICO ---
+# Gera OHLCV determinístico (GBM com troca de regime alta/baixa/lateral e volatilidade
+# em clusters via GARCH(1,1)) para N moedas x M anos no timeframe de cada motor
+# (V164: 4h, V1800: 1h, V3700: 15m) e roda o ponto de entrada do script inteiro, sem
+# rede, com o perfil.py ligado. Tempo por etapa:
+#   dados        geração das velas sintéticas (no lugar do download)
+#   indicadores  calcular_features de cada moeda (feature store desligado)
+#   features     painel alinhado + matriz macro (energia/beta)
+#   laco         laço de eventos do simulador
+#   monte_carlo  block bootstrap do script (o V164 não tem)
+#   relatorio    pacote do resultado.py + relatório analítico (reporter.gerar_analitico)
+# mais vazão (velas x moedas por segundo no laço e no pipeline) e pico de RSS. Cada motor
+# roda num processo novo (o pico de RSS é do processo). Os números vão para HISTORICO
+# (uma linha JSON por motor) e são comparados com a última rodada na mesma máquina e
+# tamanho: vazão TOLERANCIA abaixo ou RSS TOLERANCIA acima = regressão (código 1).
+# Use tamanhos em que o laço passe de MIN_SEGUNDOS, senão a vazão dele não é comparada.
+# Uso: python bench_simuladores.py [anos] [moedas] [motores...]
+#      ex.: python bench_simuladores.py 2 5 V164 V3700
+
+MOTORES = {
+    "V164": ("Backtest_V164_Validado", "run_backtest_v164"),
+    "V1800": ("Backtest25112026.py", "run_backtest"),
+    "V3700": ("Backtest_28022026", "run_backtest"),
+}
+ANOS = 7
+MOEDAS = 10
+INICIO = "2020-01-01"      # Os annual_stats dos scripts vão de 2020 a 2026: no máximo 7 anos
+SEMENTE = 42
+HISTORICO = os.environ.get("ROBODERIK_BENCH_HISTORICO", "bench_historico.jsonl")
+TOLERANCIA = 0.25
+MIN_SEGUNDOS = 0.5 # Etapas mais curtas que isso são ruído de medição: não entram na comparação
+ETAPAS = {"download": "dados", "features": "indicadores", "painel": "features", "matriz_energia": "features",
+          "matriz_beta": "features", "simulacao": "laco", "monte_carlo": "monte_carlo",
+          "relatorio": "relatorio", "resultado": "relatorio"}
+ORDEM = ["dados", "indicadores", "features", "laco", "monte_carlo", "relatorio"]
+PASTA = os.path.dirname(os.path.abspath(__file__))
+FREQ = {"15m": "15min", "1h": "1h", "4h": "4h"}
+# Moedas que os scripts procuram pelo nome (BTC: beta/energia); o resto é SYNnnUSDT
+NOMES = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "ADAUSDT"]
+
+# --- MERCADO SINTÉTICO ---
+# (deriva anual, multiplicador de volatilidade) por regime: alta, baixa, lateral
+REGIMES = [(0.8, 1.0), (-0.6, 1.3), (0.0, 0.7)]
+DURACAO_REGIME_DIAS = 45   # Duração média de um regime (troca geométrica)
+VOL_ANUAL = 0.7
+GARCH_A = 0.08
+GARCH_B = 0.90
+
+def moedas_sinteticas(n):
+    return NOMES[:n] + [f"SYN{k:02d}USDT" for k in range(len(NOMES), n)]
+
+def mercado_sintetico(symbol, timeframe, anos, seed=SEMENTE):
+    # Mesmas velas para o mesmo (símbolo, timeframe, anos, semente) em qualquer máquina
+    idx = pd.date_range(INICIO, pd.Timestamp(INICIO) + pd.DateOffset(years=anos), freq=FREQ[timeframe], inclusive="left", name="date")
+    n = len(idx)
+    rng = np.random.default_rng([seed, zlib.crc32(symbol.encode()), zlib.crc32(timeframe.encode())])
+    por_ano = pd.Timedelta(days=365) / pd.Timedelta(FREQ[timeframe])
+
+    # Regimes: cadeia que troca com probabilidade 1/duração a cada vela
+    troca = rng.random(n) < 1 / (DURACAO_REGIME_DIAS * por_ano / 365)
+    regime = rng.integers(0, len(REGIMES), int(troca.sum()) + 1)[np.cumsum(troca)]
+    deriva = np.array([r[0] for r in REGIMES])[regime] / por_ano
+    mult = np.array([r[1] for r in REGIMES])[regime]
+
+    # GARCH(1,1) na variância por vela (o laço é a recorrência; o resto é vetorizado)
+    var_base = VOL_ANUAL ** 2 / por_ano
+    w = var_base * (1 - GARCH_A - GARCH_B)
+    z = rng.standard_normal(n).tolist()
+    sigma = np.empty(n); var = var_base
+    for k in range(n):
+        sigma[k] = var ** 0.5
+        e = sigma[k] * z[k]
+        var = w + GARCH_A * e * e + GARCH_B * var
+    sigma *= mult
+    eps = sigma * np.array(z)
+
+    close = 100 * np.exp(np.cumsum(deriva - 0.5 * sigma ** 2 + eps))
+    open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.1, n) * sigma)
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.6, n)) * sigma)
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.6, n)) * sigma)
+    volume = rng.lognormal(10, 0.5, n) * (1 + np.abs(eps) / np.sqrt(var_base))
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "v": volume}, index=idx)
+
+# --- UM MOTOR (PROCESSO FILHO) ---
+def carregar_script(path):
+    # Os scripts sem extensão não são importáveis por nome, carrega direto do arquivo
+    loader = importlib.machinery.SourceFileLoader("bench_" + os.path.basename(path).split(".")[0].lower(), path)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    mod = importlib.util.module_from_spec(spec)
+    loader.exec_module(mod)
+    return mod
+
+def medir_motor(motor, anos, moedas):
+    import feature_store
+    import resultado
+    import perfil
+    import reporter
+    script, funcao = MOTORES[motor]
+    tmp = tempfile.mkdtemp(prefix="bench_simuladores_")
+    feature_store.ATIVO = False # Indicadores sempre calculados (não lidos do cache)
+    resultado.RESULT_DIR = tmp
+    perfil.ATIVO = True; perfil.MODO = "1"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            mod = carregar_script(os.path.join(PASTA, script))
+            mod.COINS = moedas_sinteticas(moedas)
+            mod.fetch_binance_data = lambda symbol, *args, **kwargs: mercado_sintetico(symbol, mod.TIMEFRAME, anos)
+            mod.klines_async = types.SimpleNamespace(aquecer_cache=lambda *args, **kwargs: 0)
+            random.seed(SEMENTE); np.random.seed(SEMENTE)
+            getattr(mod, funcao)()
+            pasta = resultado.ultimo()
+            with open(os.path.join(pasta, perfil.ARQUIVO), "r") as f: p = json.load(f)
+            pacote = resultado.carregar(pasta)
+            t0 = time.perf_counter()
+            if len(pacote["trades"]):
+                reporter.gerar_analitico(pacote["trades"], os.path.join(tmp, "analitico.xlsx"), pacote["meta"]["banca_inicial"])
+            t_analitico = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    etapas = {e: 0.0 for e in ORDEM}
+    for nome, e in p["etapas"].items(): etapas[ETAPAS.get(nome, nome)] = etapas.get(ETAPAS.get(nome, nome), 0.0) + e["s"]
+    etapas["relatorio"] += t_analitico
+    total = p["total_s"] + t_analitico
+    c = p["contadores"]
+    return {
+        "motor": motor, "timeframe": mod.TIMEFRAME, "anos": anos, "moedas": moedas,
+        "barras": c.get("barras", 0), "barras_moeda": c.get("barras_moeda", 0), "visitadas": c.get("visitadas", 0),
+        "trades": c.get("fechamentos", 0), "etapas": etapas, "total_s": total,
+        "laco_barras_por_s": c.get("barras_moeda", 0) / etapas["laco"] if etapas["laco"] else float("nan"),
+        "pipeline_barras_por_s": c.get("barras_moeda", 0) / total if total else float("nan"),
+        "pico_rss_mb": perfil.pico_rss_mb()
+    }
+
+# --- ORQUESTRAÇÃO, HISTÓRICO E REGRESSÃO ---
+def _commit():
+    r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PASTA, capture_output=True, text=True)
+    return r.stdout.strip() if r.returncode == 0 else None
+
+def maquina():
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}cpu|py{platform.python_version()}"
+
+def rodar_filho(motor, anos, moedas):
+    r = subprocess.run([sys.executable, os.path.abspath(__file__), "--filho", motor, str(anos), str(moedas)],
+                       cwd=PASTA, capture_output=True, text=True)
+    if r.returncode != 0: raise RuntimeError(f"{motor} falhou:\n{r.stderr[-2000:]}")
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+def ler_historico(caminho=HISTORICO):
+    if not os.path.exists(caminho): return []
+    with open(caminho, "r") as f: return [json.loads(l) for l in f if l.strip()]
+
+def anterior(historico, linha):
+    # Última rodada comparável: mesmo motor, tamanho e máquina
+    chave = ("motor", "timeframe", "anos", "moedas", "maquina")
+    iguais = [h for h in historico if all(h.get(k) == linha[k] for k in chave)]
+    return iguais[-1] if iguais else None
+
+def regressoes(ref, linha, tolerancia=TOLERANCIA):
+    if ref is None: return []
+    achados = []
+    for k, tempo in (("laco_barras_por_s", linha["etapas"]["laco"]), ("pipeline_barras_por_s", linha["total_s"])):
+        if tempo < MIN_SEGUNDOS: continue
+        if ref.get(k) and linha[k] < ref[k] * (1 - tolerancia):
+            achados.append(f"{k} {ref[k]:,.0f} -> {linha[k]:,.0f}")
+    if ref.get("pico_rss_mb") and linha["pico_rss_mb"] > ref["pico_rss_mb"] * (1 + tolerancia):
+        achados.append(f"pico RSS {ref['pico_rss_mb']:.0f} -> {linha['pico_rss_mb']:.0f} MB")
+    return achados
+
+def main(anos=ANOS, moedas=MOEDAS, motores=None):
+    if not 1 <= anos <= 7: raise ValueError("anos entre 1 e 7 (2020-2026)")
+    historico = ler_historico()
+    base = {"data": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": _commit(), "maquina": maquina()}
+    falhas = 0
+    print(f"🏁 Benchmark dos simuladores | {moedas} moedas x {anos} anos sintéticos")
+    print("-" * 100)
+    print(f"   {'MOTOR':<6} {'TF':<4} {'VELAS':>9} " + " ".join(f"{e[:11]:>11}" for e in ORDEM) + f" {'LAÇO v/s':>10} {'RSS MB':>7}")
+    novas = []
+    for motor in motores or list(MOTORES):
+        linha = {**base, **rodar_filho(motor, anos, moedas)}
+        achados = regressoes(anterior(historico, linha), linha)
+        if achados: falhas += 1
+        print(f"{'❌' if achados else '✅'} {motor:<6} {linha['timeframe']:<4} {linha['barras_moeda']:>9,} "
+              + " ".join(f"{linha['etapas'][e]:>10.2f}s" for e in ORDEM)
+              + f" {linha['laco_barras_por_s']:>10,.0f} {linha['pico_rss_mb']:>7.0f}")
+        for a in achados: print(f"   ⚠️ Regressão: {a}")
+        novas.append(linha)
+    print("-" * 100)
+    with open(HISTORICO, "a") as f:
+        for linha in novas: f.write(json.dumps(linha) + "\n")
+    print(f"💾 Histórico: {HISTORICO} ({len(historico) + len(novas)} rodadas)")
+    return falhas
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args and args[0] == "--filho":
+        print(json.dumps(medir_motor(args[1], int(args[2]), int(args[3]))))
+    else:
+        sys.exit(1 if main(int(args[0]) if args else ANOS, int(args[1]) if len(args) > 1 else MOEDAS, args[2:] or None) else 0)
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import subprocess
+
+# --- BENCHMARK DE STARTUP (python -X importtime) ---
+# Mede o custo de subir cada ponto de entrada do cron (interpretador + imports) e falha
+# se algum passar do limite ou voltar a importar no startup uma biblioteca pesada que
+# deveria ser carregada só quando usada. Roda no CI (.github/workflows/startup.yml).
+# Uso: python bench_startup.py [repeticoes]
+
+# módulo -> (limite em ms para os imports, módulos que NÃO podem ser carregados no import)
+ENTRADAS = {
+    "bot": (1500, ["yfinance", "numba"]),
+    "reporter": (300, ["pandas", "numpy", "xlsxwriter"]),
+    "motor_live": (1200, ["numba", "yfinance"]),
+}
+REPETICOES = 3
+TOP = 6
+PASTA = os.path.dirname(os.path.abspath(__file__))
+
+def medir(modulo):
+    # Um processo novo por medição (cache de import frio no interpretador, como no cron)
+    t0 = time.perf_counter()
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                       cwd=PASTA, capture_output=True, text=True)
+    parede = time.perf_counter() - t0
+    if r.returncode != 0: raise RuntimeError(f"import {modulo} falhou:\n{r.stderr[-2000:]}")
+    # "import time:  self [us] | cumulative |   nome" -> (profundidade, nome, acumulado em us)
+    linhas = []
+    for texto in r.stderr.splitlines():
+        if not texto.startswith("import time:") or "cumulative" in texto: continue
+        _, acumulado, nome = texto[len("import time:"):].split("|")
+        nome = nome[1:].rstrip()
+        linhas.append(((len(nome) - len(nome.lstrip())) // 2, nome.strip(), int(acumulado)))
+    return parede, linhas
+
+def resumo(linhas, modulo):
+    # Tempo do ponto de entrada, tudo o que foi carregado e os filhos diretos dele (o
+    # importtime imprime cada módulo depois dos filhos, então eles vêm logo antes)
+    pos = max(k for k, (nivel, nome, _) in enumerate(linhas) if nivel == 0 and nome == modulo)
+    filhos = []
+    for nivel, nome, acc in reversed(linhas[:pos]):
+        if nivel == 0: break
+        if nivel == 1: filhos.append((nome, acc))
+    return linhas[pos][2] / 1000, {nome for _, nome, _ in linhas}, filhos
+
+def main(repeticoes=REPETICOES):
+    falhas = 0
+    print(f"🚀 Startup dos pontos de entrada (melhor de {repeticoes})")
+    print("-" * 65)
+    for modulo, (limite_ms, proibidos) in ENTRADAS.items():
+        medicoes = [medir(modulo) for _ in range(repeticoes)]
+        parede, linhas = min(medicoes, key=lambda m: m[0])
+        total_ms, carregados, filhos = resumo(linhas, modulo)
+        vazou = [p for p in proibidos if p in carregados]
+        ok = total_ms <= limite_ms and not vazou
+        if not ok: falhas += 1
+        print(f"{'✅' if ok else '❌'} {modulo:<10} | imports {total_ms:7.1f} ms (limite {limite_ms}) | processo {parede * 1000:7.1f} ms")
+        if vazou: print(f"   ⚠️ Importados no startup: {', '.join(vazou)}")
+        # Filhos diretos mais caros
+        for nome, acc in sorted(filhos, key=lambda x: -x[1])[:TOP]:
+            print(f"   {nome:<30} {acc / 1000:8.1f} ms")
+    print("-" * 65)
+    return falhas
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else REPETICOES) else 0)
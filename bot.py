@@ -1,27 +1,22 @@
 import sys
-import subprocess
 import os
 import json
 import time
 from datetime import datetime
 import traceback
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# --- AUTO-INSTALAÇÃO DE DEPENDÊNCIAS ---
-def install(package):
-    try:
-        __import__(package)
-    except ImportError:
-        print(f"📦 Instalando {package}...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", package])
-
-for lib in ["yfinance", "pandas", "pandas_ta", "numpy", "pytz"]:
-    install(lib)
-
-import yfinance as yf
+# --- DEPENDÊNCIAS ---
+# Instalação/verificação é um passo explícito (python dependencias.py), não roda em todo
+# import. O yfinance (~0.8s de import) só é carregado quando a primeira vela é baixada.
 import pandas as pd
-import pandas_ta as ta
 import numpy as np
 import pytz
+import motor_live
+import diario
+import covariancia as cv
 
 # --- CONFIGURAÇÕES DE AMBIENTE ---
 FUSO_BR = pytz.timezone('America/Sao_Paulo')
@@ -50,11 +45,31 @@ RISK_SUMMER = 0.10    # 10% da banca em Tendência de Alta
 RISK_WINTER = 0.015   # 1,5% da banca em Mercado de Baixa
 MAX_ADDS = 1          # Máximo de 1 piramidagem 
 
+# SCAN CONCORRENTE (1 = sequencial)
+SCAN_WORKERS = 16
+
+# MODO DAEMON (python bot.py --daemon [offset_seg])
+# O processo fica vivo e acorda a cada fechamento de vela de 15m + DAEMON_OFFSET_SEG
+# (tempo para o yfinance publicar a vela que acabou de fechar)
+DAEMON_OFFSET_SEG = 10
+
 # ZONA DE RUÍDO (BUFFER)
 BUFFER_PCT = 0.002    # 0.2% de margem 
 
-# ARQUIVO DE ESTADO
-STATE_FILE = "estado_v164.json"
+# EXPOSIÇÃO BETA (mesma regra do Backtest25112026): tamanho * (1 + beta médio ao BTC)
+# não passa de EXPOSICAO_MAX da banca alavancada. Beta da janela de 120 velas de 15m.
+# Desligado por padrão (regra nova de entrada, o V164 nunca teve esse filtro)
+LIMITE_BETA = False
+JANELA_BETA = 120
+EXPOSICAO_MAX = 0.8
+BETA_PADRAO = 0.5     # Enquanto a janela não enche
+
+# ARQUIVOS DE ESTADO
+STATE_FILE = "estado_v164.json"    # Snapshot pequeno (banca, posição aberta, PnL do dia)
+JOURNAL_FILE = "trades_v164.jsonl" # Diário append-only com todos os trades fechados
+# Depois da migração o histórico só existe no diário: o deploy que versiona o snapshot
+# precisa versionar o diário também (git add estado_v164.json trades_v164.jsonl),
+# senão o reporter.py do CI não tem de onde ler os trades
 
 def inicializar_arquivo():
     if not os.path.exists(STATE_FILE):
@@ -62,13 +77,11 @@ def inicializar_arquivo():
             "banca_atual": 60.0,      
             "pico_banca": 60.0,
             "posicao_aberta": None,
-            "historico_trades": [],
             "data_hoje": obter_data_hoje_br(),
             "pnl_hoje": 0.0
         }
         try:
-            with open(STATE_FILE, "w") as f:
-                json.dump(dados_iniciais, f, indent=4)
+            diario.salvar_snapshot(STATE_FILE, dados_iniciais)
             print(f"✅ Arquivo '{STATE_FILE}' criado com sucesso!")
         except Exception as e:
             print(f"❌ Erro crítico ao criar arquivo: {e}")
@@ -78,78 +91,151 @@ def carregar_estado():
         inicializar_arquivo()
     try:
         with open(STATE_FILE, "r") as f:
-            return json.load(f)
+            estado = json.load(f)
     except Exception as e:
         print(f"⚠️ Erro ao ler estado: {e}")
         return None
+    migrar_historico(estado)
+    recuperar_fechamento(estado)
+    return estado
 
 def salvar_estado(estado):
     try:
-        with open(STATE_FILE, "w") as f:
-            json.dump(estado, f, indent=4)
+        diario.salvar_snapshot(STATE_FILE, estado)
     except Exception as e:
         print(f"❌ Erro ao salvar: {e}")
 
+def migrar_historico(estado):
+    # Snapshot do formato antigo (últimos 50 trades dentro do JSON): vão para o diário uma vez
+    if "historico_trades" not in estado: return
+    if not os.path.exists(JOURNAL_FILE):
+        for t in estado["historico_trades"]: diario.registrar_trade(JOURNAL_FILE, t)
+    del estado["historico_trades"]
+    salvar_estado(estado)
+
+def recuperar_fechamento(estado):
+    # Queda entre o append no diário e o snapshot: o trade já está no diário mas a
+    # posição ainda aparece aberta. Aplica o fechamento registrado em vez de fechar de novo.
+    pos = estado.get("posicao_aberta")
+    if not pos or "id" not in pos: return
+    ultimo = diario.ultimo_trade(JOURNAL_FILE)
+    if not ultimo or ultimo.get("id") != pos["id"]: return
+    print(f"♻️ Fechamento de {pos['symbol']} já estava no diário, atualizando o snapshot...")
+    estado['pnl_hoje'] += ultimo['lucro']
+    estado['banca_atual'] = ultimo['banca']
+    estado['posicao_aberta'] = None
+    if estado['banca_atual'] > estado['pico_banca']: estado['pico_banca'] = estado['banca_atual']
+    salvar_estado(estado)
+
 # --- MOTOR DE DADOS (SEPARANDO VELA FECHADA DE PREÇO ATUAL) ---
 
+INTERVALO_MS = 15 * 60 * 1000
+
+# Buffers do motor_live mantidos em memória entre os ticks do daemon (vazio no modo one-shot)
+_BUFFERS = {}
+MODO_DAEMON = False
+# Covariância móvel de todos os símbolos (covariancia.py), no disco junto dos buffers
+COV_FILE = os.path.join(motor_live.BUFFER_DIR, "covariancia.json")
+_MATRIZ = {}
+
+def _yf():
+    import yfinance
+    return yfinance
+
+def _baixar_velas(symbol, periodo):
+    # Ticker.history não usa o dicionário global do yf.download (seguro entre threads)
+    df = _yf().Ticker(symbol).history(period=periodo, interval=TIMEFRAME)
+    if df.empty: return None
+    if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
+    df = df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"})
+    df.columns = [c.lower() for c in df.columns]
+    return df
+
+def _ts_ms(index):
+    return np.asarray((index - pd.Timestamp(0, tz=index.tz)) // pd.Timedelta(milliseconds=1), dtype=np.int64)
+
 def obter_dados_v164(symbol):
     try:
-        df = yf.download(symbol, period="60d", interval=TIMEFRAME, progress=False)
-        if df.empty or len(df) < 805: return None
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
-        
-        df = df.rename(columns={"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"})
-        df.columns = [c.lower() for c in df.columns]
-
-        # Calcula indicadores na série toda
-        df['ema20'] = ta.ema(df['close'], length=20)
-        df['ema50'] = ta.ema(df['close'], length=50)   
-        df['ema200'] = ta.ema(df['close'], length=200) 
-        df['ema800'] = ta.ema(df['close'], length=800) 
-        df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=14)
-        df['adx'] = ta.adx(df['high'], df['low'], df['close'])['ADX_14']
-
-        bb = ta.bbands(df['close'], length=20, std=2)
-        if bb is not None:
-            df['bb_l'] = bb.iloc[:, 0]
-            df['bb_u'] = bb.iloc[:, 2]
+        # Buffer persistente: só as velas fechadas desde a última rodada são processadas
+        # (no daemon ele já está em memória; o disco só é lido no primeiro tick)
+        buf = _BUFFERS.get(symbol) or motor_live.carregar_buffer(symbol)
+        periodo = motor_live.periodo_download(buf, INTERVALO_MS)
+        if periodo is None:
+            buf = motor_live.novo_estado(); periodo = "60d"
+
+        df = _baixar_velas(symbol, periodo)
+        if df is None or len(df) < 2: return None
+        ts_ms = _ts_ms(df.index)
+
+        # Buraco entre o buffer e a janela baixada: reconstrói com 60 dias
+        if buf["ultimo_ts"] is not None and ts_ms[0] > buf["ultimo_ts"] + INTERVALO_MS:
+            buf = motor_live.novo_estado()
+            df = _baixar_velas(symbol, "60d")
+            if df is None or len(df) < 2: return None
+            ts_ms = _ts_ms(df.index)
 
         # O SEGREDO DO 1 MINUTO:
-        # Pega o preço atual em TEMPO REAL (vela aberta - índice -1)
-        current_price = float(df['close'].iloc[-1])
-        
-        # Pega os INDICADORES da última vela FECHADA (índice -2) para evitar repintura
-        row_closed = df.iloc[-2]
-
-        return {
-            "current_price": current_price,
-            "ema20": float(row_closed['ema20']),
-            "ema50": float(row_closed['ema50']),
-            "ema200": float(row_closed['ema200']),
-            "ema800": float(row_closed['ema800']),
-            "atr": float(row_closed['atr']),
-            "adx": float(row_closed['adx']),
-            "bb_l": float(row_closed['bb_l']),
-            "bb_u": float(row_closed['bb_u']),
-            "closed_open": float(row_closed['open']),
-            "closed_close": float(row_closed['close']),
-            "closed_high": float(row_closed['high']),
-            "closed_low": float(row_closed['low'])
-        }
+        # A última linha é a vela ABERTA (preço em tempo real); as anteriores já fecharam
+        fechadas = df.iloc[:-1]
+        motor_live.atualizar(buf, ts_ms[:-1], fechadas['open'].values, fechadas['high'].values,
+                             fechadas['low'].values, fechadas['close'].values)
+        if MODO_DAEMON: _BUFFERS[symbol] = buf # Vai para o disco no encerramento
+        else: motor_live.salvar_buffer(symbol, buf)
+        if not motor_live.pronto(buf): return None
+
+        # Indicadores da última vela FECHADA (evita repintura) + preço atual
+        dados = motor_live.snapshot(buf, float(df['close'].iloc[-1]))
+        # (ts, close) das últimas velas fechadas baixadas: alimenta a covariância (e a aquece
+        # inteira já na primeira rodada, quando vêm 60 dias)
+        dados['velas'] = list(zip(ts_ms[:-1][-(JANELA_BETA + 1):].tolist(), fechadas['close'].values[-(JANELA_BETA + 1):].tolist()))
+        return dados
 
     except Exception as e:
         print(f"❌ Erro ao baixar {symbol}: {e}")
+        _BUFFERS.pop(symbol, None) # Pode ter ficado pela metade: relê do disco no próximo tick
         return None
 
+def baixar_mercado(symbols):
+    # Threads: o trabalho é I/O de rede e cada símbolo tem seu próprio arquivo de buffer
+    workers = max(1, min(SCAN_WORKERS, len(symbols)))
+    _yf() # Import feito uma vez aqui, antes de as threads disputarem o lock de import
+    if workers == 1: return {s: obter_dados_v164(s) for s in symbols}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(symbols, pool.map(obter_dados_v164, symbols)))
+
+def atualizar_matriz(mercado):
+    # Velas fechadas presentes em todos os símbolos entram na covariância (só as novas)
+    matriz = _MATRIZ.get("cov") or cv.carregar(COV_FILE, list(SYMBOL_MAP), JANELA_BETA)
+    if any(mercado.get(s) is None for s in SYMBOL_MAP): return matriz
+    closes = [dict(mercado[s]['velas']) for s in SYMBOL_MAP]
+    comuns = sorted(set.intersection(*(set(c) for c in closes)))
+    # Matriz parada há mais de uma janela (bot desligado): recomeça em vez de emendar
+    if matriz["ultimo_ts"] is not None and comuns and comuns[0] - matriz["ultimo_ts"] > JANELA_BETA * INTERVALO_MS:
+        matriz = cv.nova(list(SYMBOL_MAP), JANELA_BETA)
+    novas = sum(cv.atualizar_closes(matriz, ts, [c[ts] for c in closes]) for ts in comuns)
+    if MODO_DAEMON: _MATRIZ["cov"] = matriz # Vai para o disco no encerramento
+    elif novas:
+        try:
+            cv.salvar(matriz, COV_FILE)
+        except Exception as e:
+            print(f"❌ Erro ao salvar covariância: {e}")
+    return matriz
+
+def beta_mercado(matriz):
+    beta = cv.beta_medio(matriz)
+    return BETA_PADRAO if np.isnan(beta) else beta
+
 # --- LÓGICA PRINCIPAL ---
 
-def run_bot():
-    inicializar_arquivo()
+def run_bot(estado=None):
+    # estado: snapshot já em memória (daemon); None = lê do disco. Devolve o estado final.
     hora_atual = obter_data_hora_br()
     print(f"\n💎 ROBODERIK V164 (ASYMMETRIC COMPOUNDER) - {hora_atual}")
     
-    estado = carregar_estado()
-    if not estado: return
+    if estado is None:
+        inicializar_arquivo()
+        estado = carregar_estado()
+    if not estado: return None
 
     print(f"💰 Banca: ${estado['banca_atual']:.2f} | PnL Hoje: ${estado['pnl_hoje']:.2f}")
 
@@ -241,6 +327,7 @@ def run_bot():
                 estado['pnl_hoje'] += pnl_final
                 
                 log_trade = {
+                    "id": pos.get('id'),
                     "data": obter_data_hora_br(),
                     "symbol": symbol,
                     "strat": pos['strat'],
@@ -252,24 +339,32 @@ def run_bot():
                     "sl": pos['sl'],
                     "lucro": round(pnl_final, 2), 
                     "motivo": motivo,
-                    "adds": pos['adds']
+                    "adds": pos['adds'],
+                    "banca": estado['banca_atual']
                 }
-                estado['historico_trades'].append(log_trade)
-                if len(estado['historico_trades']) > 50: estado['historico_trades'].pop(0)
+                # Diário primeiro: se cair antes do snapshot, recuperar_fechamento completa na próxima rodada
+                diario.registrar_trade(JOURNAL_FILE, log_trade)
 
                 estado['posicao_aberta'] = None
                 if estado['banca_atual'] > estado['pico_banca']: estado['pico_banca'] = estado['banca_atual']
                 
                 print(f"✨ TRADE FECHADO: {motivo} | PnL Bruto: ${pnl_bruto:.2f} | Líquido: ${pnl_final:.2f}")
                 salvar_estado(estado)
-                return
+                return estado
 
     # --- 2. ESCANEAMENTO ---
     if estado["posicao_aberta"] is None:
         print(f"🔎 Escaneando mercado (Vela Fechada)...")
         
+        # Todos os símbolos são baixados em paralelo; a escolha da entrada continua
+        # na ordem do SYMBOL_MAP (primeiro sinal vence), igual ao scan sequencial.
+        mercado = baixar_mercado(list(SYMBOL_MAP))
+        # A covariância só é consultada aqui: cada símbolo traz as últimas JANELA_BETA + 1
+        # velas fechadas, então os ticks com posição aberta (só o símbolo dela) não deixam buraco
+        market_beta = beta_mercado(atualizar_matriz(mercado)) if LIMITE_BETA else None
+        
         for symbol, nome in SYMBOL_MAP.items():
-            dados = obter_dados_v164(symbol)
+            dados = mercado.get(symbol)
             if dados is None: continue
 
             current_price = dados['current_price']
@@ -347,7 +442,12 @@ def run_bot():
                 if pos_size_usd > estado['banca_atual'] * max_alloc:
                     pos_size_usd = estado['banca_atual'] * max_alloc
 
+                if LIMITE_BETA and pos_size_usd * (1 + market_beta) > estado['banca_atual'] * ALAVANCAGEM * EXPOSICAO_MAX:
+                    print(f"   🧲 {symbol}: exposição beta acima do limite (beta médio {market_beta:.2f}), pulando")
+                    continue
+
                 estado['posicao_aberta'] = {
+                    "id": f"{symbol}-{int(time.time() * 1000)}",
                     "symbol": symbol,
                     "strat": strat,
                     "side": side,
@@ -359,6 +459,7 @@ def run_bot():
                     "size_usd": pos_size_usd,
                     "initial_size_usd": pos_size_usd,
                     "adds": 0,
+                    "beta_mercado": market_beta,
                     "data": obter_data_hora_br()
                 }
                 
@@ -366,13 +467,68 @@ def run_bot():
                 salvar_estado(estado)
                 break 
             else:
-                print(f"   ⚪ {symbol:<9} | {macro:<6} | {bias:<4} | ADX {adx:.1f}")
+                print(f"   ⚪ {symbol:<9} | {macro:<6} | {bias:<4} | ADX {adx:.1f} | 4H ADX {dados['adx_4h']:.1f}")
 
     salvar_estado(estado)
+    return estado
+
+# --- MODO DAEMON ---
+
+def proximo_tick(agora, intervalo_seg, offset_seg):
+    # Próximo instante fechamento + offset estritamente depois de agora (epoch em segundos)
+    return ((agora - offset_seg) // intervalo_seg + 1) * intervalo_seg + offset_seg
+
+def persistir_buffers():
+    for symbol, buf in list(_BUFFERS.items()):
+        try:
+            motor_live.salvar_buffer(symbol, buf)
+        except Exception as e:
+            print(f"❌ Erro ao salvar buffer de {symbol}: {e}")
+    if "cov" in _MATRIZ:
+        try:
+            cv.salvar(_MATRIZ["cov"], COV_FILE)
+        except Exception as e:
+            print(f"❌ Erro ao salvar covariância: {e}")
+
+def rodar_daemon(offset_seg=DAEMON_OFFSET_SEG):
+    global MODO_DAEMON
+    MODO_DAEMON = True
+    parar = threading.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: parar.set())
+
+    print(f"🛰️ Modo daemon: acordando a cada fechamento de {TIMEFRAME} + {offset_seg:.0f}s (Ctrl+C / SIGTERM para sair)")
+    # Aquece os buffers de todos os símbolos antes do primeiro fechamento
+    t0 = time.perf_counter()
+    prontos = sum(1 for d in baixar_mercado(list(SYMBOL_MAP)).values() if d is not None)
+    print(f"🔥 Buffers aquecidos: {prontos}/{len(SYMBOL_MAP)} símbolos em {time.perf_counter() - t0:.1f}s")
+
+    estado = None
+    while not parar.is_set():
+        alvo = proximo_tick(time.time(), INTERVALO_MS // 1000, offset_seg)
+        print(f"💤 Próximo tick: {datetime.fromtimestamp(alvo, FUSO_BR).strftime('%H:%M:%S')}")
+        if parar.wait(max(0.0, alvo - time.time())): break
+        t0 = time.perf_counter()
+        try:
+            estado = run_bot(estado)
+        except Exception as e:
+            print(f"Erro no tick: {e}")
+            traceback.print_exc()
+            estado = None # Próximo tick relê o snapshot do disco
+        print(f"⏱️ Tick concluído em {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+    # Encerramento limpo: snapshot e buffers no disco
+    if estado: salvar_estado(estado)
+    persistir_buffers()
+    print("👋 Daemon encerrado, estado e buffers salvos.")
 
 if __name__ == "__main__":
     try:
-        run_bot()
+        if "--daemon" in sys.argv:
+            extras = [a for a in sys.argv[1:] if a != "--daemon"]
+            rodar_daemon(float(extras[0]) if extras else DAEMON_OFFSET_SEG)
+        else:
+            run_bot()
     except Exception as e:
         print(f"Erro fatal: {e}")
         traceback.print_exc()
@@ -0,0 +1,113 @@
+import os
+import json
+import numpy as np
+
+# --- COVARIÂNCIA MÓVEL INCREMENTAL (N x N) E BETAS ---
+# Substitui o laço de rolling(120).cov par a par contra o BTC: os retornos chegam uma
+# vela por vez e a matriz de covariância de todas as moedas na janela é mantida com a
+# atualização de Welford (entra o retorno novo, sai o que deixou a janela), O(N²) por
+# vela em vez de O(N x janela) por par. Com 100 moedas continua uma conta de matriz
+# pequena por vela.
+#
+# A remoção acumula erro de arredondamento aos poucos, então a cada `janela` velas a
+# média e os co-momentos são refeitos em duas passadas a partir do buffer circular
+# (custo amortizado também O(N²) por vela).
+# Semântica do pandas: rolling(janela) com min_periods=janela e ddof=1; beta = cov/var
+# do ativo de referência (NaN com variância zero ou janela incompleta).
+# O estado é um dict (numpy em memória, listas no JSON), como o buffer do motor_live.
+JANELA = 120
+
+def nova(ativos, janela=JANELA, referencia=0):
+    n = len(ativos)
+    return {
+        "ativos": list(ativos),
+        "janela": int(janela),
+        "referencia": int(referencia),  # Índice do ativo contra o qual o beta é medido (BTC)
+        "buffer": np.zeros((janela, n)),  # Retornos na janela (circular)
+        "pos": 0,                         # Próxima posição do buffer
+        "n": 0,                           # Retornos dentro da janela
+        "passos": 0,                      # Atualizações desde o último recálculo
+        "media": np.zeros(n),
+        "m2": np.zeros((n, n)),           # Soma dos co-momentos em relação à média
+        "ultimo_ts": None,                # Uso ao vivo: última vela consumida
+        "ultimo_close": None              # Uso ao vivo: closes dessa vela (base do próximo retorno)
+    }
+
+def _recalcular(cov):
+    # Duas passadas sobre o buffer: zera o erro acumulado pelas remoções
+    x = cov["buffer"] if cov["n"] == cov["janela"] else cov["buffer"][:cov["n"]]
+    cov["media"] = x.mean(axis=0)
+    d = x - cov["media"]
+    cov["m2"] = d.T @ d
+    cov["passos"] = 0
+
+def atualizar(cov, retornos):
+    # Uma vela: vetor (N,) com o retorno de cada ativo
+    x = np.asarray(retornos, dtype=np.float64)
+    media = cov["media"]; m2 = cov["m2"]
+    if cov["n"] == cov["janela"]:
+        # Sai o retorno mais antigo (Welford ao contrário)
+        velho = cov["buffer"][cov["pos"]]
+        cov["n"] -= 1
+        d = velho - media
+        media -= d / cov["n"]
+        m2 -= np.outer(d, velho - media)
+    cov["buffer"][cov["pos"]] = x
+    cov["pos"] = (cov["pos"] + 1) % cov["janela"]
+    cov["n"] += 1
+    d = x - media
+    media += d / cov["n"]
+    m2 += np.outer(d, x - media)
+    cov["passos"] += 1
+    if cov["passos"] >= cov["janela"]: _recalcular(cov)
+
+def pronto(cov):
+    return cov["n"] == cov["janela"]
+
+def covariancia(cov):
+    n = len(cov["ativos"])
+    if not pronto(cov): return np.full((n, n), np.nan)
+    return cov["m2"] / (cov["n"] - 1)
+
+def betas(cov):
+    # Beta de cada ativo contra o de referência (o próprio = 1)
+    c = covariancia(cov)
+    var = c[cov["referencia"], cov["referencia"]]
+    if not var > 0: return np.full(len(cov["ativos"]), np.nan)
+    return c[:, cov["referencia"]] / var
+
+def beta_medio(cov):
+    # Média dos |beta| (o market_beta do Backtest25112026); NaN enquanto não há janela
+    b = np.abs(betas(cov))
+    return float(b.mean()) if not np.isnan(b).all() else float("nan")
+
+# --- USO AO VIVO (bot.py) ---
+
+def atualizar_closes(cov, ts, closes):
+    # Vela fechada comum a todos os ativos: retorno simples contra a anterior
+    closes = [float(c) for c in closes]
+    if cov["ultimo_ts"] is not None and ts <= cov["ultimo_ts"]: return False
+    if cov["ultimo_close"] is not None:
+        atualizar(cov, [c / a - 1 for c, a in zip(closes, cov["ultimo_close"])])
+    cov["ultimo_ts"] = int(ts); cov["ultimo_close"] = closes
+    return True
+
+def salvar(cov, caminho):
+    dados = {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in cov.items()}
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    tmp = caminho + ".tmp"
+    with open(tmp, "w") as f: json.dump(dados, f)
+    os.replace(tmp, caminho)
+
+def carregar(caminho, ativos, janela=JANELA, referencia=0):
+    # Estado salvo para o mesmo universo/janela; qualquer outro caso recomeça do zero
+    if not os.path.exists(caminho): return nova(ativos, janela, referencia)
+    try:
+        with open(caminho, "r") as f: dados = json.load(f)
+        if dados["ativos"] != list(ativos) or dados["janela"] != janela or dados["referencia"] != referencia:
+            return nova(ativos, janela, referencia)
+        for k in ("buffer", "media", "m2"): dados[k] = np.array(dados[k], dtype=np.float64)
+        return dados
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ Covariância ilegível ({e}), recomeçando...")
+        return nova(ativos, janela, referencia)
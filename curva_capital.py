@@ -0,0 +1,33 @@
+from collections import deque
+import numpy as np
+
+# --- RASTREADOR DA CURVA DE CAPITAL ---
+# Substitui a lista equity_curve dos simuladores. Antes cada vela fazia max(equity_curve)
+# e equity_volatility copiava o final da lista para um array novo, então o laço ficava
+# mais lento a cada trade fechado. Aqui o pico é mantido corrido e os últimos retornos
+# ficam num buffer circular de tamanho fixo: registrar() é O(janela) só quando um trade
+# fecha e as leituras por vela são O(1).
+# Os números são os mesmos de antes (mesma fórmula de retorno, mesmo np.std na mesma ordem).
+
+class EquityTracker:
+    def __init__(self, inicial, janela=40):
+        self.janela = janela
+        self.atual = inicial
+        self.pico = inicial
+        self.pontos = 1 # Tamanho que a equity_curve teria
+        self.retornos = deque(maxlen=janela - 1) # janela pontos -> janela-1 retornos
+        self.vol = None
+
+    def registrar(self, equity):
+        self.retornos.append((equity - self.atual) / (self.atual + 1e-9))
+        self.atual = equity
+        self.pontos += 1
+        if equity > self.pico: self.pico = equity
+        # Mesmo critério do equity_volatility antigo: só com janela + 1 pontos na curva
+        if self.pontos >= self.janela + 1: self.vol = np.std(np.array(self.retornos))
+
+    def drawdown(self, banca):
+        return (self.pico - banca) / self.pico
+
+    def volatilidade(self):
+        return self.vol
@@ -0,0 +1,37 @@
+import os
+import sys
+import subprocess
+import importlib.util
+
+# --- SETUP DO AMBIENTE ---
+# Substitui o install() que o bot.py e o reporter.py rodavam a cada import (um __import__
+# por biblioteca e, se faltasse algo, pip no meio do tick do cron). Roda uma vez por
+# ambiente; a verificação usa importlib.util.find_spec, que não importa nada.
+# Uso: python dependencias.py            -> instala o que faltar do requirements.txt
+#      python dependencias.py --verificar -> só lista o que falta (sai com 1 se faltar algo)
+
+ARQUIVO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "requirements.txt")
+MODULO = {"vaderSentiment": "vaderSentiment"} # Pacote do pip -> nome do import, quando não é o óbvio
+
+def pacotes(arquivo=ARQUIVO):
+    with open(arquivo, "r") as f:
+        linhas = [l.split("#")[0].strip() for l in f]
+    # "pandas>=2.0" -> "pandas"
+    return [l.split(";")[0].split("[")[0].split("=")[0].split(">")[0].split("<")[0].strip() for l in linhas if l]
+
+def faltando(lista):
+    return [p for p in lista if importlib.util.find_spec(MODULO.get(p, p.replace("-", "_"))) is None]
+
+def main(argv):
+    falta = faltando(pacotes())
+    if not falta:
+        print("✅ Todas as dependências estão instaladas.")
+        return 0
+    print(f"📦 Faltando: {', '.join(falta)}")
+    if "--verificar" in argv: return 1
+    subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", *falta])
+    print("✅ Dependências instaladas.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
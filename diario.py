@@ -0,0 +1,82 @@
+import os
+import json
+
+# --- ESTADO DO BOT: SNAPSHOT ATÔMICO + DIÁRIO DE TRADES (APPEND-ONLY) ---
+# O estado vivo (banca, pico, posição aberta, PnL do dia) é um JSON pequeno e de tamanho
+# fixo, regravado inteiro a cada salvamento: arquivo temporário + fsync + os.replace,
+# então uma queda no meio deixa o snapshot antigo ou o novo, nunca um pela metade.
+# Os trades fechados vão para um diário JSONL, uma linha por trade, só com append + fsync:
+# o custo de gravar não cresce com o histórico e nada é descartado.
+# Uma linha final incompleta (queda durante o append) é ignorada na leitura e isolada
+# com uma quebra de linha no próximo append.
+
+def _fsync_pasta(pasta):
+    # Garante que o rename em si foi para o disco (em Windows não há fsync de pasta)
+    try:
+        fd = os.open(pasta, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def salvar_snapshot(caminho, dados, indent=4):
+    tmp = f"{caminho}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=indent)
+        f.flush(); os.fsync(f.fileno())
+    os.replace(tmp, caminho)
+    _fsync_pasta(os.path.dirname(os.path.abspath(caminho)))
+
+def registrar_trade(caminho, trade):
+    linha = (json.dumps(trade, ensure_ascii=False) + "\n").encode("utf-8")
+    with open(caminho, "a+b") as f:
+        # Sobra de um append interrompido: começa numa linha nova para não colar nela
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n": linha = b"\n" + linha
+        f.write(linha)
+        f.flush(); os.fsync(f.fileno())
+
+def _linha(texto):
+    texto = texto.strip()
+    if not texto: return None
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return None # Linha cortada por uma queda no meio do append
+
+def ler_trades(caminho):
+    # Gerador: um trade por vez, sem carregar o diário inteiro na memória
+    if not os.path.exists(caminho): return
+    with open(caminho, "r", encoding="utf-8") as f:
+        for texto in f:
+            trade = _linha(texto)
+            if trade is not None: yield trade
+
+def ler_trades_desde(caminho, offset=0):
+    # Gerador de (trade, offset logo após a linha) a partir de um byte do diário (relatório
+    # incremental). Para na primeira linha sem quebra: pode ser um append ainda em curso.
+    if not os.path.exists(caminho): return
+    with open(caminho, "rb") as f:
+        f.seek(offset)
+        for texto in f:
+            if not texto.endswith(b"\n"): return
+            offset += len(texto)
+            trade = _linha(texto.decode("utf-8", errors="replace"))
+            if trade is not None: yield trade, offset
+
+def ultimo_trade(caminho, bloco=65536):
+    # Lê só o fim do arquivo
+    if not os.path.exists(caminho): return None
+    with open(caminho, "rb") as f:
+        tamanho = f.seek(0, os.SEEK_END)
+        f.seek(max(0, tamanho - bloco))
+        linhas = f.read().decode("utf-8", errors="replace").splitlines()
+    for texto in reversed(linhas):
+        trade = _linha(texto)
+        if trade is not None: return trade
+    return None
@@ -0,0 +1,104 @@
+import os
+import json
+import types
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+# --- FEATURE STORE (INDICADORES PRÉ-CALCULADOS EM ARQUIVOS MAPEADOS) ---
+# Guarda a saída do calcular_features de cada script (EMA800, ADX, ATR, BB, pavios,
+# sweeps, absorção...) como um .npy por coluna e devolve um DataFrame montado sobre
+# np.load(mmap_mode="r"): nada é lido do disco até a coluna ser usada e vários
+# processos mapeando o mesmo arquivo dividem as mesmas páginas do page cache.
+#
+# Pasta: FEATURE_DIR/<símbolo>_<intervalo>/<início>_<fim>_<hash>/, onde o hash cobre
+# os argumentos da função e o código que a calcula (o arquivo do script e os módulos
+# locais que ele importa: indicadores, reamostragem...). O meta.json guarda o hash das
+# velas de origem; se as velas mudarem (cache de klines refeito, correção da Binance)
+# ou qualquer parâmetro/código mudar, a entrada não casa e é recalculada sozinha.
+# Desligar: ROBODERIK_FEATURE_STORE=0
+FEATURE_DIR = os.environ.get("ROBODERIK_FEATURE_DIR", "cache_features")
+ATIVO = os.environ.get("ROBODERIK_FEATURE_STORE", "1") != "0"
+
+def _sha(*partes):
+    h = hashlib.sha256()
+    for p in partes: h.update(p if isinstance(p, bytes) else str(p).encode())
+    return h.hexdigest()[:16]
+
+def hash_velas(df):
+    # Índice + todas as colunas de entrada, byte a byte
+    partes = [np.ascontiguousarray(df.index.asi8).tobytes()]
+    for c in sorted(df.columns): partes += [c, np.ascontiguousarray(df[c].to_numpy()).tobytes()]
+    return _sha(*partes)
+
+def _arquivo_fonte(caminho):
+    try:
+        with open(caminho, "rb") as f: return f.read()
+    except OSError:
+        return b""
+
+def hash_codigo(funcao):
+    # Arquivo onde a função mora + módulos do próprio repositório que ele importa
+    arquivo = funcao.__code__.co_filename
+    pasta = os.path.dirname(os.path.abspath(arquivo))
+    locais = sorted({os.path.abspath(m.__file__) for m in funcao.__globals__.values()
+                     if isinstance(m, types.ModuleType) and getattr(m, "__file__", None)
+                     and os.path.dirname(os.path.abspath(m.__file__)) == pasta})
+    return _sha(_arquivo_fonte(arquivo), *(_arquivo_fonte(c) for c in locais))
+
+def _pasta(symbol, interval, df, chave):
+    ini = int(df.index[0].value // 1_000_000); fim = int(df.index[-1].value // 1_000_000)
+    return os.path.join(FEATURE_DIR, f"{symbol}_{interval}", f"{ini}_{fim}_{chave}")
+
+def gravar(pasta, df, velas):
+    # Grava numa pasta temporária e troca de uma vez (leitores nunca veem coluna pela metade)
+    tmp = f"{pasta}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "_index.npy"), df.index.to_numpy())
+    colunas = []
+    for k, c in enumerate(df.columns):
+        np.save(os.path.join(tmp, f"{k}.npy"), df[c].to_numpy())
+        colunas.append(c)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"velas": velas, "colunas": colunas, "index_name": df.index.name, "linhas": len(df)}, f)
+    shutil.rmtree(pasta, ignore_errors=True)
+    try:
+        os.replace(tmp, pasta)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True) # Outro processo gravou a mesma entrada primeiro
+
+def mapear(pasta, velas=None):
+    # DataFrame sobre os arquivos mapeados (None se não existe ou não casa com as velas)
+    try:
+        with open(os.path.join(pasta, "meta.json"), "r") as f: meta = json.load(f)
+        if velas is not None and meta["velas"] != velas: return None
+        indice = pd.DatetimeIndex(np.load(os.path.join(pasta, "_index.npy")), name=meta["index_name"])
+        dados = {c: np.load(os.path.join(pasta, f"{k}.npy"), mmap_mode="r") for k, c in enumerate(meta["colunas"])}
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame(dados, index=indice, copy=False)
+
+def _limpar_antigas(pasta):
+    # Mesma função/parâmetros com outra faixa de datas: a entrada nova substitui a antiga
+    base, nome = os.path.split(pasta)
+    sufixo = nome.rsplit("_", 1)[1]
+    for outra in os.listdir(base):
+        if outra != nome and outra.endswith("_" + sufixo):
+            shutil.rmtree(os.path.join(base, outra), ignore_errors=True)
+
+def features(symbol, interval, df, funcao, *args):
+    # funcao(df, *args) com cache em disco; o DataFrame devolvido é somente leitura nas colunas
+    if not ATIVO or df is None or not len(df): return funcao(df, *args)
+    velas = hash_velas(df)
+    pasta = _pasta(symbol, interval, df, _sha(hash_codigo(funcao), funcao.__name__, json.dumps(args, default=repr)))
+    mapeado = mapear(pasta, velas)
+    if mapeado is not None: return mapeado
+
+    calculado = funcao(df, *args)
+    if any(calculado[c].dtype == object for c in calculado.columns): return calculado # Só colunas numéricas/bool
+    gravar(pasta, calculado, velas)
+    _limpar_antigas(pasta)
+    # Devolve a versão mapeada: a mesma que as próximas rodadas vão ler
+    return mapear(pasta, velas) if os.path.exists(pasta) else calculado
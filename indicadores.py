@@ -0,0 +1,293 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# --- BIBLIOTECA DE INDICADORES (NUMPY / FLOAT64) ---
+# Kernels únicos usados por todos os backtests e pelo bot. As diferenças históricas
+# entre os scripts viraram parâmetros em vez de cópias da fórmula:
+#   V164 nativo ........ ewm(span) / ewm(alpha=1/14) com adjust=True (padrão do pandas)
+#   V134 / V136 / V141 . ewm(..., adjust=False)
+#   pandas_ta .......... ema com semente SMA + adjust=False, rma com adjust=True e min_periods
+# Todas as funções aceitam Series ou arrays e devolvem np.ndarray float64 do mesmo tamanho.
+
+def _f64(x):
+    return np.asarray(x, dtype=np.float64)
+
+def _ewm(x, alpha, adjust=True, min_periods=0):
+    x = _f64(x)
+    out = np.full(len(x), np.nan)
+    nan = np.isnan(x)
+    if nan.all(): return out
+    ini = int(np.argmin(nan))
+    if nan[ini:].any():
+        # NaN no meio da série: o pandas tem regras próprias de peso (ignore_na), delega
+        return pd.Series(x).ewm(alpha=alpha, adjust=adjust, min_periods=min_periods).mean().to_numpy()
+    if alpha >= 1.0:
+        out[ini:] = x[ini:]
+    else:
+        # Recorrência linear resolvida em blocos com cumsum: S_k = w^k * cumsum(x_j / w^j).
+        # O bloco é limitado para que w^-k nunca estoure (w^-k <= e^230).
+        w = 1.0 - alpha; log_w = np.log(w)
+        xs = x[ini:]; n = len(xs)
+        bloco = min(n, max(1, int(230.0 / -log_w)))
+        k = np.arange(bloco) * log_w
+        wk = np.exp(k); inv_wk = np.exp(-k)
+        res = np.empty(n)
+        carry = 0.0 if adjust else xs[0]
+        for pos in range(0, n, bloco):
+            seg = xs[pos:pos + bloco]; m = len(seg)
+            soma = np.cumsum(seg * inv_wk[:m]) * wk[:m]
+            if adjust:
+                res[pos:pos + m] = soma + carry * w * wk[:m]
+            else:
+                res[pos:pos + m] = alpha * soma + carry * w * wk[:m]
+            carry = res[pos + m - 1]
+        if adjust:
+            # Denominador do adjust=True: soma dos pesos = (1 - w^(t+1)) / alpha, que satura em 1/alpha
+            sat = min(n, int(40.0 / -log_w) + 1)
+            res[:sat] /= -np.expm1(np.arange(1, sat + 1) * log_w) / alpha
+            res[sat:] *= alpha
+        out[ini:] = res
+    if min_periods > 1: out[ini:ini + min_periods - 1] = np.nan
+    return out
+
+def _rolling(x, length):
+    x = _f64(x)
+    if len(x) < length: return None
+    return sliding_window_view(x, length)
+
+def _alinhar(valores, n, length):
+    out = np.full(n, np.nan)
+    if valores is not None: out[length - 1:] = valores
+    return out
+
+# --- MÉDIAS ---
+def ema(close, length, adjust=False, sma_seed=False):
+    x = _f64(close)
+    if sma_seed:
+        if len(x) < length: return np.full(len(x), np.nan)
+        x = x.copy()
+        x[length - 1] = x[:length].mean()
+        x[:length - 1] = np.nan
+    return _ewm(x, 2.0 / (length + 1), adjust=adjust)
+
+def rma(x, length, adjust=True, min_periods=0):
+    # Suavização de Wilder (alpha = 1/length)
+    return _ewm(x, 1.0 / length, adjust=adjust, min_periods=min_periods)
+
+def _momentos_rolantes(x, length):
+    # Média e soma dos desvios² de cada janela via cumsum, em blocos deslocados pelo
+    # próprio preço do bloco (evita o cancelamento de sum(x²) - sum(x)²/n em preços altos)
+    m = len(x) - length + 1
+    media = np.empty(m); m2 = np.empty(m)
+    for s in range(0, m, 4096):
+        e = min(m, s + 4096)
+        seg = x[s:e + length - 1]; ref = seg[length - 1]
+        d = seg - ref
+        cs1 = np.concatenate(([0.0], np.cumsum(d)))
+        cs2 = np.concatenate(([0.0], np.cumsum(d * d)))
+        s1 = cs1[length:] - cs1[:-length]; s2 = cs2[length:] - cs2[:-length]
+        media[s:e] = ref + s1 / length
+        m2[s:e] = s2 - s1 * s1 / length
+    return media, np.maximum(m2, 0.0)
+
+def sma(x, length):
+    x = _f64(x)
+    if len(x) < length: return np.full(len(x), np.nan)
+    if np.isnan(x).any(): return _alinhar(_rolling(x, length).mean(axis=1), len(x), length)
+    return _alinhar(_momentos_rolantes(x, length)[0], len(x), length)
+
+def _reduzir_janela(x, length, op):
+    # Máximo/mínimo móvel por duplicação (sparse table): log2(length) passadas vetoriais
+    n = len(x)
+    if n < length: return np.full(n, np.nan)
+    atual = x; passo = 1
+    while passo * 2 <= length:
+        atual = op(atual[:-passo], atual[passo:]); passo *= 2
+    res = op(atual[:n - length + 1], atual[length - passo:length - passo + n - length + 1])
+    return _alinhar(res, n, length)
+
+def rolling_sum(x, length):
+    x = _f64(x)
+    if len(x) < length: return np.full(len(x), np.nan)
+    m = len(x) - length + 1
+    soma = x[:m].copy()
+    for i in range(1, length): soma += x[i:i + m]
+    return _alinhar(soma, len(x), length)
+
+def rolling_max(x, length):
+    return _reduzir_janela(_f64(x), length, np.maximum)
+
+def rolling_min(x, length):
+    return _reduzir_janela(_f64(x), length, np.minimum)
+
+def rolling_std(x, length, ddof=1):
+    x = _f64(x)
+    if len(x) < length: return np.full(len(x), np.nan)
+    if np.isnan(x).any(): return _alinhar(_rolling(x, length).std(axis=1, ddof=ddof), len(x), length)
+    return _alinhar(np.sqrt(_momentos_rolantes(x, length)[1] / (length - ddof)), len(x), length)
+
+# --- VOLATILIDADE ---
+def true_range(high, low, close, primeira_nan=False):
+    # primeira_nan=False -> 1ª vela = high-low (concat().max() dos scripts nativos)
+    # primeira_nan=True  -> 1ª vela = NaN (pandas_ta)
+    h = _f64(high); l = _f64(low); c = _f64(close)
+    pc = np.full(len(c), np.nan); pc[1:] = c[:-1]
+    tr = np.fmax(h - l, np.fmax(np.abs(h - pc), np.abs(l - pc)))
+    if primeira_nan and len(tr): tr[0] = np.nan
+    return tr
+
+def atr(high, low, close, length=14, adjust=True, pandas_ta=False):
+    if pandas_ta:
+        return rma(true_range(high, low, close, primeira_nan=True), length, adjust=True, min_periods=length)
+    return rma(true_range(high, low, close), length, adjust=adjust)
+
+def bbands(close, length=20, std=2.0, ddof=1):
+    # Devolve (lower, mid, upper). pandas_ta usa ddof=0; rolling().std() do pandas usa ddof=1
+    x = _f64(close)
+    if len(x) < length or np.isnan(x).any():
+        mid = sma(x, length); dev = rolling_std(x, length, ddof=ddof)
+    else:
+        media, m2 = _momentos_rolantes(x, length)
+        mid = _alinhar(media, len(x), length)
+        dev = _alinhar(np.sqrt(m2 / (length - ddof)), len(x), length)
+    return mid - std * dev, mid, mid + std * dev
+
+# --- TENDÊNCIA ---
+def _directional_movement(high, low):
+    h = _f64(high); l = _f64(low)
+    up = np.full(len(h), np.nan); dn = np.full(len(h), np.nan)
+    up[1:] = h[1:] - h[:-1]; dn[1:] = l[:-1] - l[1:]
+    with np.errstate(invalid='ignore'):
+        plus_dm = np.where((up > dn) & (up > 0), up, 0.0)
+        minus_dm = np.where((dn > up) & (dn > 0), dn, 0.0)
+    return plus_dm, minus_dm
+
+def adx(high, low, close, length=14, adjust=True, pandas_ta=False):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if pandas_ta:
+            # DM da 1ª vela é NaN e todas as médias são rma(adjust=True, min_periods=length)
+            plus_dm, minus_dm = _directional_movement(high, low)
+            plus_dm[0] = np.nan; minus_dm[0] = np.nan
+            k = 100.0 / atr(high, low, close, length, pandas_ta=True)
+            dmp = k * rma(plus_dm, length, min_periods=length)
+            dmn = k * rma(minus_dm, length, min_periods=length)
+            dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+            return rma(dx, length, min_periods=length)
+        plus_dm, minus_dm = _directional_movement(high, low)
+        tr_s = rma(true_range(high, low, close), length, adjust=adjust)
+        plus_di = 100.0 * (rma(plus_dm, length, adjust=adjust) / tr_s)
+        minus_di = 100.0 * (rma(minus_dm, length, adjust=adjust) / tr_s)
+        dx = 100.0 * (np.abs(plus_di - minus_di) / (plus_di + minus_di))
+        return rma(dx, length, adjust=adjust)
+
+def chop(high, low, close, length=14):
+    tr = true_range(high, low, close)
+    range_hl = rolling_max(high, length) - rolling_min(low, length)
+    range_hl[range_hl == 0] = 0.00001
+    return 100 * np.log10(rolling_sum(tr, length) / range_hl) / np.log10(length)
+
+def _supertrend_laco(close, basic_lower, basic_upper):
+    # Mesmo laço dos scripts V134/V136/V141 (compilado pelo numba quando disponível)
+    n = len(close)
+    st_lower = np.zeros(n); st_upper = np.zeros(n); st_trend = np.ones(n, dtype=np.int64)
+    for i in range(1, n):
+        if basic_lower[i] > st_lower[i-1] or close[i-1] < st_lower[i-1]: st_lower[i] = basic_lower[i]
+        else: st_lower[i] = st_lower[i-1]
+        if basic_upper[i] < st_upper[i-1] or close[i-1] > st_upper[i-1]: st_upper[i] = basic_upper[i]
+        else: st_upper[i] = st_upper[i-1]
+        if st_trend[i-1] == 1:
+            if close[i] < st_lower[i]: st_trend[i] = -1
+            else: st_trend[i] = 1
+        else:
+            if close[i] > st_upper[i]: st_trend[i] = 1
+            else: st_trend[i] = -1
+    return st_lower, st_upper, st_trend
+
+_JIT = {}
+
+def _supertrend_jit():
+    # numba é opcional e só é importado no primeiro SuperTrend: o import custa ~0.3s
+    # e o bot/motor_live (que importam este módulo a cada tick) nunca usam o SuperTrend
+    if "supertrend" not in _JIT:
+        try:
+            from numba import njit
+            _JIT["supertrend"] = njit(cache=True)(_supertrend_laco)
+        except ImportError:
+            _JIT["supertrend"] = None # Sem numba o SuperTrend usa a versão NumPy
+    return _JIT["supertrend"]
+
+def _banda_catraca(base, close, op, rompe):
+    # Banda que só anda a favor (máximo/mínimo acumulado) e reinicia no valor básico quando
+    # o fechamento anterior a rompe. Cada trecho entre reinícios é um accumulate vetorial;
+    # a janela de busca dobra até achar o próximo reinício (custo total O(n)).
+    n = len(base)
+    banda = np.empty(n)
+    s = 0; inicio = 0.0 # st_lower[0] = st_upper[0] = 0.0 como no laço original
+    while s < n:
+        janela = 64; achou = -1
+        while True:
+            e = min(n, s + janela)
+            seg = base[s:e].copy(); seg[0] = inicio
+            acum = op.accumulate(seg)
+            # Reinício em j quando close[j-1] rompe a banda em j-1 (só vale para j < n)
+            quebra = np.flatnonzero(rompe(close[s:e], acum)[:n - 1 - s] if e == n else rompe(close[s:e], acum))
+            if len(quebra): achou = s + int(quebra[0]) + 1; e = achou
+            if achou >= 0 or e == n:
+                banda[s:e] = acum[:e - s]; break
+            janela *= 2
+        if achou < 0: break
+        s = achou; inicio = base[s]
+    return banda
+
+def _tendencia(close, st_lower, st_upper):
+    # Histerese: só "abaixo da banda inferior" -> -1, só "acima da superior" -> 1,
+    # nenhum -> mantém, ambos -> inverte (resolvido num laço só sobre esses raros casos)
+    n = len(close)
+    abaixo = close < st_lower; acima = close > st_upper
+    ev = np.where(abaixo & ~acima, -1.0, np.where(acima & ~abaixo, 1.0, np.nan))
+    ev[0] = 1.0
+    ambos = np.flatnonzero(abaixo & acima); ambos = ambos[ambos > 0]
+    if len(ambos):
+        ultimo = np.maximum.accumulate(np.where(~np.isnan(ev), np.arange(n), 0))
+        anterior = 0
+        for k in ambos:
+            j = max(int(ultimo[k - 1]), anterior)
+            ev[k] = -ev[j]; anterior = k
+    idx = np.maximum.accumulate(np.where(~np.isnan(ev), np.arange(n), 0))
+    return ev[idx].astype(np.int64)
+
+def _supertrend_numpy(close, basic_lower, basic_upper):
+    st_lower = _banda_catraca(basic_lower, close, np.maximum, lambda c, b: c < b)
+    st_upper = _banda_catraca(basic_upper, close, np.minimum, lambda c, b: c > b)
+    return st_lower, st_upper, _tendencia(close, st_lower, st_upper)
+
+def supertrend(high, low, close, atr, multiplier=3.0, motor=None):
+    # Devolve (supertrend, direção) idênticos bit a bit ao laço dos scripts.
+    # motor: None = numba se instalado; "numba", "numpy" ou "python" força uma versão
+    h = _f64(high); l = _f64(low); c = _f64(close); a = _f64(atr)
+    hl2 = (h + l) / 2
+    basic_upper = hl2 + (multiplier * a)
+    basic_lower = hl2 - (multiplier * a)
+    jit = _supertrend_jit() if motor in (None, "numba") else None
+    if motor is None: motor = "numba" if jit is not None else "numpy"
+    if len(c) == 0: return np.empty(0), np.empty(0, dtype=np.int64)
+    if motor == "numba" and jit is not None:
+        st_lower, st_upper, st_trend = jit(c, basic_lower, basic_upper)
+    elif motor == "python" or np.isnan(c).any() or np.isnan(basic_lower).any() or np.isnan(basic_upper).any():
+        # Com NaN o accumulate não reproduz as comparações do laço (NaN nunca vence), usa o laço
+        st_lower, st_upper, st_trend = _supertrend_laco(c, basic_lower, basic_upper)
+    else:
+        st_lower, st_upper, st_trend = _supertrend_numpy(c, basic_lower, basic_upper)
+    return np.where(st_trend == 1, st_lower, st_upper), st_trend
+
+# --- OSCILADORES ---
+def rsi(close, length=14):
+    # Mesma definição do pandas_ta: rma dos ganhos / (rma ganhos + |rma perdas|)
+    c = _f64(close)
+    diff = np.full(len(c), np.nan); diff[1:] = c[1:] - c[:-1]
+    pos = np.where(diff > 0, diff, 0.0); neg = np.where(diff < 0, diff, 0.0)
+    pos[0] = np.nan; neg[0] = np.nan
+    pos_avg = rma(pos, length, min_periods=length); neg_avg = rma(neg, length, min_periods=length)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * pos_avg / (pos_avg + np.abs(neg_avg))
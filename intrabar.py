@@ -0,0 +1,106 @@
+import os
+import time
+import numpy as np
+import kline_cache
+import klines_async
+import reamostragem as rs
+
+# --- FILL INTRABAR COM VELAS MENORES (SOB DEMANDA) ---
+# Quando uma vela de 4h/1h toca o stop E o alvo, o OHLC dela não diz qual veio primeiro
+# (os simuladores chutam: stop pessimista no 28022026, alvo no TRAP do V164). Aqui a
+# vela é aberta em velas de 5m e, se stop e alvo caírem na mesma vela de 5m, essa vela
+# é aberta em 1m. Só as velas ambíguas consultam dados finos, e só o bloco de LIMITE
+# velas finas em volta delas é baixado (uma página da API), guardado em memória e em
+# CACHE_DIR/intrabar/<símbolo>_<intervalo>/<bloco>.npz para as próximas rodadas.
+# Se nem o 1m desempata, ou se não houver dados finos, devolve None e o simulador
+# mantém a regra antiga.
+FINOS = ["5m", "1m"]
+PASTA = os.path.join(kline_cache.CACHE_DIR, "intrabar")
+
+def novo_resolvedor(intervalo_base, finos=None, urls=None):
+    # Estado por execução do simulador (dict simples: pode ir para um processo do pool)
+    return {
+        "base_ms": kline_cache.INTERVALO_MS[intervalo_base],
+        "finos": list(finos or FINOS),
+        "urls": urls,
+        "blocos": {},  # (símbolo, intervalo, bloco) -> arrays ou None
+        "consultas": 0, "resolvidos": 0, "sem_dados": 0, "blocos_baixados": 0
+    }
+
+def _arquivo(symbol, intervalo, k):
+    return os.path.join(PASTA, f"{symbol}_{intervalo}", f"{k}.npz")
+
+def _bloco(res, symbol, intervalo, k):
+    # Bloco k = velas finas [k*LIMITE, (k+1)*LIMITE) desde a epoch: memória -> disco -> API
+    chave = (symbol, intervalo, k)
+    if chave in res["blocos"]: return res["blocos"][chave]
+    arquivo = _arquivo(symbol, intervalo, k)
+    dados = None
+    if os.path.exists(arquivo):
+        try:
+            with np.load(arquivo) as z: dados = {c: z[c] for c in ("open_time", "high", "low")}
+        except (OSError, ValueError, KeyError):
+            dados = None
+    if dados is None:
+        ms = kline_cache.INTERVALO_MS[intervalo]
+        ini = k * klines_async.LIMITE * ms; fim = ini + klines_async.LIMITE * ms - 1
+        klines = klines_async.baixar_faixa(symbol, intervalo, ini, fim, res["urls"])
+        res["blocos_baixados"] += 1
+        if klines:
+            a = kline_cache.klines_para_arrays(klines)
+            dados = {"open_time": a["open_time"], "high": a["high"], "low": a["low"]}
+            # Bloco só vai para o disco quando todas as velas dele já fecharam
+            if fim < int(time.time() * 1000) - ms:
+                os.makedirs(os.path.dirname(arquivo), exist_ok=True)
+                tmp = arquivo + ".tmp.npz"
+                np.savez(tmp, **dados)
+                os.replace(tmp, arquivo)
+    res["blocos"][chave] = dados
+    return dados
+
+def velas(res, symbol, intervalo, ini, fim):
+    # (open_time, high, low) das velas finas com abertura em [ini, fim)
+    n = klines_async.LIMITE * kline_cache.INTERVALO_MS[intervalo]
+    partes = [_bloco(res, symbol, intervalo, k) for k in range(ini // n, (fim - 1) // n + 1)]
+    if any(p is None for p in partes): return None
+    ot = np.concatenate([p["open_time"] for p in partes])
+    sel = (ot >= ini) & (ot < fim)
+    return ot[sel], np.concatenate([p["high"] for p in partes])[sel], np.concatenate([p["low"] for p in partes])[sel]
+
+def _primeiro(res, symbol, nivel, ini, fim, lado, stop, alvo):
+    intervalo = res["finos"][nivel]
+    dados = velas(res, symbol, intervalo, ini, fim)
+    if dados is None or not len(dados[0]): return None
+    ot, high, low = dados
+    if lado == "buy": toca_stop = low <= stop; toca_alvo = high >= alvo
+    else: toca_stop = high >= stop; toca_alvo = low <= alvo
+    j_stop = int(np.argmax(toca_stop)) if toca_stop.any() else None
+    j_alvo = int(np.argmax(toca_alvo)) if toca_alvo.any() else None
+    if j_stop is None and j_alvo is None: return None # Dados finos não batem com a vela base
+    if j_alvo is None or (j_stop is not None and j_stop < j_alvo): return "stop"
+    if j_stop is None or j_alvo < j_stop: return "alvo"
+    # Os dois na mesma vela fina: desce mais um nível dentro dela
+    if nivel + 1 >= len(res["finos"]): return None
+    t = int(ot[j_stop])
+    return _primeiro(res, symbol, nivel + 1, t, t + kline_cache.INTERVALO_MS[intervalo], lado, stop, alvo)
+
+def primeiro_toque(res, symbol, t_barra_ms, lado, stop, alvo):
+    # Qual nível a vela base [t, t+período) tocou primeiro: "stop", "alvo" ou None (sem como saber).
+    # lado="buy": stop abaixo (low <= stop) e alvo acima (high >= alvo); "sell" ao contrário.
+    res["consultas"] += 1
+    try:
+        ordem = _primeiro(res, symbol, 0, int(t_barra_ms), int(t_barra_ms) + res["base_ms"], lado, stop, alvo)
+    except Exception as e:
+        print(f"⚠️ Intrabar {symbol}: {e}")
+        ordem = None
+    if ordem is None: res["sem_dados"] += 1
+    else: res["resolvidos"] += 1
+    return ordem
+
+def tempos_ms(tempos):
+    # Linha do tempo do painel em ms (abertura das velas base)
+    return rs.ts_ms(tempos).tolist()
+
+def resumo(res):
+    return (f"🔬 Intrabar ({'/'.join(res['finos'])}): {res['consultas']} velas ambíguas | "
+            f"{res['resolvidos']} resolvidas | {res['sem_dados']} sem dados finos | {res['blocos_baixados']} blocos baixados")
@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import numpy as np
+import pandas as pd
+
+# --- CACHE LOCAL DE KLINES (COLUNAR, POR SÍMBOLO/INTERVALO) ---
+# Cada par símbolo/intervalo vira uma pasta com um arquivo .npy por coluna
+# (tipos em TIPOS) e um meta.json com a faixa já coberta.
+# O fetch_binance_data de cada backtest consulta o cache primeiro e só baixa
+# as faixas que ainda não existem no disco (normalmente apenas a cauda).
+CACHE_DIR = os.environ.get("ROBODERIK_CACHE_DIR", "cache_klines")
+
+INTERVALO_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000
+}
+
+COLUNAS_PRECO = ["open", "high", "low", "close", "volume"]
+
+# Tipo de cada coluna guardada (as outras 6 posições da kline nem são lidas).
+# Preços em float64: EMAs/ATR e stops comparam níveis muito próximos e o float32
+# (7 dígitos) mudaria trades. Volume só entra em médias/z-scores e vai em float32.
+# Uma vela custa 8 + 4*8 + 4 = 44 bytes, contra ~340 do DataFrame de 12 colunas com strings.
+TIPOS = {
+    "open_time": np.int64,
+    "open": np.float64, "high": np.float64, "low": np.float64, "close": np.float64,
+    "volume": np.float32
+}
+ORCAMENTO_MB = float(os.environ.get("ROBODERIK_ORCAMENTO_MB", "0")) # 0 = sem limite (só relata)
+
+def _pasta(symbol, interval):
+    return os.path.join(CACHE_DIR, f"{symbol}_{interval}")
+
+def ler_cache(symbol, interval):
+    pasta = _pasta(symbol, interval)
+    meta_path = os.path.join(pasta, "meta.json")
+    if not os.path.exists(meta_path): return None
+    try:
+        with open(meta_path, "r") as f: meta = json.load(f)
+        # astype sem cópia quando o tipo já bate (caches antigos tinham volume float64)
+        dados = {c: np.load(os.path.join(pasta, f"{c}.npy")).astype(TIPOS[c], copy=False)
+                 for c in ["open_time"] + COLUNAS_PRECO}
+    except Exception as e:
+        print(f"⚠️ Cache corrompido em {pasta}: {e}")
+        return None
+    return dados, meta
+
+def gravar_cache(symbol, interval, dados, inicio, fim):
+    pasta = _pasta(symbol, interval)
+    os.makedirs(pasta, exist_ok=True)
+    # Escreve em arquivo temporário e troca no final (nunca deixa coluna pela metade)
+    for c in ["open_time"] + COLUNAS_PRECO:
+        tmp = os.path.join(pasta, f"{c}.tmp.npy")
+        np.save(tmp, dados[c])
+        os.replace(tmp, os.path.join(pasta, f"{c}.npy"))
+    tmp = os.path.join(pasta, "meta.json.tmp")
+    with open(tmp, "w") as f: json.dump({"inicio": int(inicio), "fim": int(fim), "linhas": int(len(dados["open_time"]))}, f)
+    os.replace(tmp, os.path.join(pasta, "meta.json"))
+
+def klines_para_arrays(klines):
+    # Kline crua da Binance: [open_time, open, high, low, close, volume, close_time, ...]
+    # Cada coluna vai direto das strings da API para o array tipado (sem DataFrame object,
+    # sem pd.to_numeric); close_time, quote volume, trades, taker e ignore são descartados
+    n = len(klines)
+    return {c: np.fromiter((k[pos] for k in klines), dtype=TIPOS[c], count=n)
+            for pos, c in enumerate(["open_time"] + COLUNAS_PRECO)}
+
+def _juntar(*partes):
+    partes = [p for p in partes if p is not None and len(p["open_time"])]
+    if not partes: return klines_para_arrays([])
+    tudo = {c: np.concatenate([p[c] for p in partes]) for c in ["open_time"] + COLUNAS_PRECO}
+    # Em caso de vela repetida vale a versão mais recente (última parte)
+    ot_rev = tudo["open_time"][::-1]
+    _, idx_rev = np.unique(ot_rev, return_index=True)
+    idx = len(ot_rev) - 1 - idx_rev
+    return {c: v[idx] for c, v in tudo.items()}
+
+def arrays_para_df(dados, col_volume="volume", index_name="date"):
+    # open_time fica só no índice (coluna repetida seriam mais 8 bytes por vela)
+    indice = pd.DatetimeIndex(pd.to_datetime(dados["open_time"], unit="ms"), name=index_name)
+    return pd.DataFrame({col_volume if c == "volume" else c: dados[c] for c in COLUNAS_PRECO}, index=indice)
+
+def memoria_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def relatorio_memoria(dfs, orcamento_mb=ORCAMENTO_MB):
+    # Bytes que cada símbolo ocupa (velas + features já calculadas) e o total contra o orçamento
+    total = 0
+    print("🧮 Memória por símbolo:")
+    for symbol, df in dfs.items():
+        b = memoria_bytes(df); total += b
+        print(f"   {symbol:<12} | {len(df):>8} velas x {df.shape[1]:>2} colunas | {b / 1024 ** 2:8.2f} MB | {b / max(len(df), 1):5.0f} B/vela")
+    limite = f" de {orcamento_mb:.0f} MB" if orcamento_mb else ""
+    print(f"   {'TOTAL':<12} | {total / 1024 ** 2:.2f} MB{limite}")
+    if orcamento_mb and total > orcamento_mb * 1024 ** 2:
+        print(f"⚠️ Acima do orçamento de memória ({total / 1024 ** 2:.0f} MB > {orcamento_mb:.0f} MB)")
+    return total
+
+def _faixas(meta, start_ts, end_ts):
+    if meta is None: return [("cauda", start_ts, end_ts)]
+    faixas = []
+    if start_ts < meta["inicio"]: faixas.append(("cabeca", start_ts, meta["inicio"] - 1))
+    if end_ts > meta["fim"]: faixas.append(("cauda", meta["fim"] + 1, end_ts))
+    return faixas
+
+def faixas_faltando(symbol, interval, start_ts, end_ts):
+    # [(tipo, inicio_ms, fim_ms)] que carregar_klines pediria ao baixar() (só lê o meta.json)
+    try:
+        with open(os.path.join(_pasta(symbol, interval), "meta.json"), "r") as f: meta = json.load(f)
+    except (OSError, ValueError):
+        meta = None
+    return _faixas(meta, start_ts, end_ts)
+
+def carregar_klines(symbol, interval, start_ts, end_ts, baixar, col_volume="volume", index_name="date"):
+    # baixar(inicio_ms, fim_ms) -> lista de klines crus ([] = nada na faixa, None = falha de rede)
+    ms = INTERVALO_MS[interval]
+    ultimo_fechado = int(time.time() * 1000) - ms
+    cache = ler_cache(symbol, interval)
+    faixas = _faixas(cache[1] if cache else None, start_ts, end_ts)
+
+    if cache is None:
+        base = None; inicio = start_ts; fim = start_ts - 1
+    else:
+        base, meta = cache; inicio = meta["inicio"]; fim = meta["fim"]
+
+    novos = []
+    for tipo, ini, fim_faixa in faixas:
+        klines = baixar(ini, fim_faixa)
+        if klines is None: continue
+        parte = klines_para_arrays(klines)
+        novos.append(parte)
+        if tipo == "cabeca":
+            # Só marca a cabeça como coberta se a faixa baixada encostou no que já existia
+            if not len(parte["open_time"]) or parte["open_time"][-1] + ms >= inicio: inicio = ini
+        else:
+            # Cobertura vai até o fim da última vela FECHADA recebida (nada existe antes da próxima abertura)
+            fechadas = parte["open_time"][parte["open_time"] <= ultimo_fechado]
+            if len(fechadas): fim = max(fim, int(fechadas[-1]) + ms - 1)
+            elif fim_faixa <= ultimo_fechado: fim = max(fim, fim_faixa)
+            if cache is None: inicio = ini
+
+    dados = _juntar(base, *novos)
+    if novos:
+        # Vela ainda aberta nunca vai para o disco (seria congelada incompleta)
+        fechadas = dados["open_time"] <= ultimo_fechado
+        if fechadas.any():
+            gravar_cache(symbol, interval, {c: v[fechadas] for c, v in dados.items()}, inicio, fim)
+
+    ot = dados["open_time"]
+    a = np.searchsorted(ot, start_ts, side="left"); b = np.searchsorted(ot, end_ts, side="right")
+    if b <= a: return None
+    return arrays_para_df({c: v[a:b] for c, v in dados.items()}, col_volume=col_volume, index_name=index_name)
@@ -0,0 +1,212 @@
+import time
+import asyncio
+from datetime import datetime
+from urllib.parse import urlparse
+import requests
+import kline_cache
+
+try:
+    import aiohttp # Opcional: sem aiohttp as páginas são baixadas em sequência com requests
+except ImportError:
+    aiohttp = None
+
+# --- DOWNLOAD DE KLINES EM MASSA (ASYNCIO) ---
+# A faixa de cada símbolo é cortada em janelas independentes de LIMITE velas
+# (startTime/endTime fixos), e todas as janelas de todos os símbolos são baixadas ao
+# mesmo tempo numa única sessão HTTP com pool de conexões. Um token bucket por host
+# segura o ritmo dentro do peso por minuto da Binance:
+#   429/418 -> respeita o Retry-After e pausa o host inteiro (não só a requisição)
+#   451     -> região bloqueada: a URL sai da lista para todas as janelas seguintes
+# A URL de cada símbolo é escolhida uma vez, na primeira janela que responder, e vale
+# para todas as janelas dele: uma série nunca mistura velas de futuros (fapi) e spot.
+# No fim as janelas são montadas em ordem, sem velas repetidas; se uma janela falhar
+# em todas as URLs, só o trecho contínuo anterior a ela é devolvido (o cache não marca
+# como coberto o que não chegou).
+URLS = [
+    "https://fapi.binance.com/fapi/v1/klines",
+    "https://api.binance.com/api/v3/klines",
+    "https://data-api.binance.vision/api/v3/klines"
+]
+LIMITE = 1000
+CONEXOES = 16
+TENTATIVAS = 4
+TIMEOUT = 15
+
+# host -> (peso por minuto permitido, peso de uma página de 1000 velas); 80% do limite oficial
+PESOS = {
+    "fapi.binance.com": (2400 * 0.8, 5),
+    "api.binance.com": (6000 * 0.8, 2),
+    "data-api.binance.vision": (6000 * 0.8, 2),
+}
+PESO_PADRAO = (6000 * 0.8, 2)
+
+class TokenBucket:
+    def __init__(self, por_minuto, rajada_seg=5.0):
+        self.taxa = por_minuto / 60.0
+        self.capacidade = self.taxa * rajada_seg
+        self.tokens = self.capacidade
+        self.t = time.monotonic()
+        self.pausa_ate = 0.0
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.t) * self.taxa)
+        self.t = agora
+        return agora
+
+    def espera(self, peso):
+        # Segundos até poder gastar 'peso' (0 = já gastou)
+        agora = self._repor()
+        if agora < self.pausa_ate: return self.pausa_ate - agora
+        if self.tokens >= peso:
+            self.tokens -= peso
+            return 0.0
+        return (peso - self.tokens) / self.taxa
+
+    async def pegar(self, peso):
+        while True:
+            t = self.espera(peso)
+            if t == 0.0: return
+            await asyncio.sleep(t)
+
+    def pausar(self, segundos):
+        self.pausa_ate = max(self.pausa_ate, time.monotonic() + segundos)
+        self.tokens = 0.0
+
+def _host(url):
+    return urlparse(url).netloc
+
+def _retry_after(headers, tentativa):
+    try: return float(headers.get("Retry-After"))
+    except (TypeError, ValueError): return 2.0 ** tentativa
+
+def janelas(ini, fim, interval):
+    # Janelas [a, b] de no máximo LIMITE velas cobrindo [ini, fim]
+    passo = LIMITE * kline_cache.INTERVALO_MS[interval]
+    return [(a, min(a + passo - 1, fim)) for a in range(ini, fim + 1, passo)]
+
+def montar(paginas):
+    # Páginas em ordem -> lista única ordenada e sem velas repetidas (None = janela falhou)
+    klines = []; ultimo = None
+    for pagina in paginas:
+        if pagina is None: return klines if klines else None
+        for k in sorted(pagina, key=lambda x: x[0]):
+            if ultimo is not None and k[0] <= ultimo: continue
+            klines.append(k); ultimo = k[0]
+    return klines
+
+async def _pedir(sessao, baldes, sondas, bloqueadas, url, params, ini, fim):
+    # Uma janela numa URL, com as tentativas (None = falhou nessa URL)
+    # A 1ª requisição de cada URL vai sozinha: se vier 451, as outras janelas nem tentam
+    sonda = url not in sondas
+    if sonda: sondas[url] = asyncio.Event()
+    else: await sondas[url].wait()
+    if url in bloqueadas: return None
+    host = _host(url)
+    balde = baldes.setdefault(host, TokenBucket(PESOS.get(host, PESO_PADRAO)[0]))
+    peso = PESOS.get(host, PESO_PADRAO)[1]
+    for tentativa in range(TENTATIVAS):
+        await balde.pegar(peso)
+        try:
+            async with sessao.get(url, params=params) as r:
+                if r.status == 451:
+                    bloqueadas.add(url); break
+                if r.status in (418, 429):
+                    balde.pausar(_retry_after(r.headers, tentativa)); continue
+                if r.status != 200: break
+                dados = await r.json()
+                return [k for k in dados if ini <= k[0] <= fim]
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+            await asyncio.sleep(0.5 * 2 ** tentativa)
+        finally:
+            if sonda: sondas[url].set(); sonda = False
+    return None
+
+async def _pagina(sessao, baldes, sondas, bloqueadas, fontes, urls, symbol, interval, ini, fim):
+    params = {"symbol": symbol, "interval": interval, "startTime": ini, "endTime": fim, "limit": LIMITE}
+    fonte = fontes.get(symbol)
+    if fonte is None:
+        # 1ª janela do símbolo: percorre as URLs e fixa a que responder
+        fonte = fontes[symbol] = {"url": None, "pronta": asyncio.Event()}
+        try:
+            for url in urls:
+                pagina = await _pedir(sessao, baldes, sondas, bloqueadas, url, params, ini, fim)
+                if pagina is not None:
+                    fonte["url"] = url
+                    return pagina
+            return None
+        finally:
+            fonte["pronta"].set()
+    # Demais janelas: só a URL escolhida (sem ela, o símbolo falha em vez de emendar fontes)
+    await fonte["pronta"].wait()
+    if fonte["url"] is None: return None
+    return await _pedir(sessao, baldes, sondas, bloqueadas, fonte["url"], params, ini, fim)
+
+async def _baixar_async(pedidos, interval, urls):
+    baldes = {}; sondas = {}; bloqueadas = set(); fontes = {}
+    conector = aiohttp.TCPConnector(limit=CONEXOES)
+    async with aiohttp.ClientSession(connector=conector, timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+                                     headers={"User-Agent": "Mozilla/5.0"}) as sessao:
+        tarefas = {chave: [asyncio.ensure_future(_pagina(sessao, baldes, sondas, bloqueadas, fontes, urls, symbol, interval, a, b))
+                           for a, b in janelas(ini, fim, interval)]
+                   for chave, (symbol, ini, fim) in pedidos.items()}
+        return {chave: montar(await asyncio.gather(*paginas)) for chave, paginas in tarefas.items()}
+
+def _baixar_sequencial(pedidos, interval, urls):
+    # Mesmo protocolo de _pagina, uma janela por vez (sem aiohttp instalado)
+    baldes = {}; bloqueadas = set(); fontes = {}; sessao = requests.Session(); resultado = {}
+    for chave, (symbol, ini, fim) in pedidos.items():
+        paginas = []
+        for a, b in janelas(ini, fim, interval):
+            params = {"symbol": symbol, "interval": interval, "startTime": a, "endTime": b, "limit": LIMITE}
+            pagina = None
+            for url in ([fontes[symbol]] if symbol in fontes else urls):
+                if url is None: break # 1ª janela do símbolo falhou em todas as URLs
+                if url in bloqueadas or pagina is not None: continue
+                host = _host(url)
+                balde = baldes.setdefault(host, TokenBucket(PESOS.get(host, PESO_PADRAO)[0]))
+                for tentativa in range(TENTATIVAS):
+                    while (t := balde.espera(PESOS.get(host, PESO_PADRAO)[1])) > 0: time.sleep(t)
+                    try:
+                        r = sessao.get(url, params=params, timeout=TIMEOUT)
+                    except requests.RequestException:
+                        time.sleep(0.5 * 2 ** tentativa); continue
+                    if r.status_code == 451: bloqueadas.add(url); break
+                    if r.status_code in (418, 429):
+                        balde.pausar(_retry_after(r.headers, tentativa)); continue
+                    if r.status_code == 200: pagina = [k for k in r.json() if a <= k[0] <= b]
+                    break
+                if symbol not in fontes and pagina is not None: fontes[symbol] = url
+            fontes.setdefault(symbol, None)
+            paginas.append(pagina)
+            if pagina is None: break
+        resultado[chave] = montar(paginas)
+    return resultado
+
+def baixar(pedidos, interval, urls=None):
+    # pedidos: {chave: (symbol, inicio_ms, fim_ms)} -> {chave: klines crus | None}
+    urls = urls or URLS
+    if not pedidos: return {}
+    if aiohttp is None: return _baixar_sequencial(pedidos, interval, urls)
+    return asyncio.run(_baixar_async(pedidos, interval, urls))
+
+def baixar_faixa(symbol, interval, ini, fim, urls=None):
+    # Assinatura do callback baixar(ini, fim) do kline_cache, para um símbolo
+    return baixar({symbol: (symbol, ini, fim)}, interval, urls)[symbol]
+
+def aquecer_cache(symbols, interval, inicio_str, fim_str=None, urls=None):
+    # Baixa de uma vez as faixas que faltam no cache para todos os símbolos; depois disso
+    # o fetch_binance_data de cada um só lê o disco. Datas como nos scripts (hora local).
+    start_ts = int(datetime.strptime(inicio_str, "%Y-%m-%d").timestamp() * 1000)
+    end_ts = int((datetime.strptime(fim_str, "%Y-%m-%d") if fim_str else datetime.now()).timestamp() * 1000)
+    pedidos = {(s, ini, fim): (s, ini, fim) for s in symbols
+               for _, ini, fim in kline_cache.faixas_faltando(s, interval, start_ts, end_ts)}
+    if not pedidos: return 0
+    t0 = time.perf_counter()
+    print(f"📡 Baixando {len(pedidos)} faixas de {len(symbols)} símbolos em paralelo...")
+    resultado = baixar(pedidos, interval, urls)
+    for s in symbols:
+        kline_cache.carregar_klines(s, interval, start_ts, end_ts, lambda ini, fim: resultado.get((s, ini, fim)))
+    velas = sum(len(k) for k in resultado.values() if k)
+    print(f"✅ {velas} velas em {time.perf_counter() - t0:.1f}s")
+    return velas
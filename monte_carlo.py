@@ -0,0 +1,87 @@
+import numpy as np
+
+# --- MONTE CARLO BLOCK BOOTSTRAP (VETORIZADO) ---
+# Mesmo experimento dos scripts (reamostragem dos trades em blocos, choque raro de cauda,
+# composição trade a trade e truncamento na ruína), mas feito em lotes de simulações
+# como matrizes NumPy: os inícios dos blocos e os choques são sorteados de uma vez, a
+# curva de capital sai de um cumprod e o drawdown de um maximum.accumulate.
+# Usa um np.random.Generator próprio (seed reprodutível, não mexe no np.random global).
+CELULAS_LOTE = 20_000_000 # Teto de simulações x trades por lote (~160 MB por matriz float64)
+
+def _indices_blocos(rng, lote, n, tamanhos):
+    # Índices (lote, n) dos trades sorteados. Cada linha concatena blocos
+    # trades_pct[ini:ini+tam] até completar n (a fatia é cortada no fim da série, como antes)
+    tamanhos = np.asarray(tamanhos)
+    k = -(-n // int(tamanhos.min())) # Blocos suficientes mesmo se todos forem do menor tamanho
+    if len(tamanhos) > 1: tam = tamanhos[rng.integers(0, len(tamanhos), (lote, k))]
+    else: tam = np.full((lote, k), tamanhos[0])
+    ini = rng.integers(0, np.maximum(1, n - tam + 1))
+    comp = np.minimum(tam, n - ini)
+    comeco = np.cumsum(comp, axis=1) - comp # Posição de cada bloco na série sorteada
+    marca = np.zeros((lote, n), dtype=np.int32)
+    linhas, cols = np.nonzero(comeco < n)
+    marca[linhas, comeco[linhas, cols]] = 1
+    bloco = np.cumsum(marca, axis=1) - 1 # Bloco que cobre cada posição
+    return np.take_along_axis(ini, bloco, 1) + np.arange(n) - np.take_along_axis(comeco, bloco, 1)
+
+def _chocar(rng, pnl, prob):
+    # Choque de cauda: perda multiplicada por U(3, 6) ou ganho cortado para 10%
+    choque = rng.random(pnl.shape) < prob
+    if choque.any():
+        p = pnl[choque]
+        pnl[choque] = np.where(p < 0, p * rng.uniform(3.0, 6.0, len(p)), p * 0.1)
+    return pnl
+
+def simular_caminhos(pnl, initial_capital, ruin_level=0.05):
+    # pnl (sims, n) -> (capital final, drawdown máximo, curvas (sims, n+1)) com a mesma
+    # aritmética do laço antigo: equity *= (1 + pnl) em sequência e parada na ruína
+    sims, n = pnl.shape
+    caminho = np.empty((sims, n + 1))
+    caminho[:, 0] = initial_capital; caminho[:, 1:] = 1 + pnl
+    np.cumprod(caminho, axis=1, out=caminho)
+
+    abaixo = caminho[:, 1:] <= initial_capital * ruin_level
+    arruinado = abaixo.any(axis=1)
+    passo_ruina = np.where(arruinado, abaixo.argmax(axis=1) + 1, n)
+    depois = np.arange(n + 1) > passo_ruina[:, None] # Trades que o laço nem chegaria a ver
+
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        pico = np.maximum.accumulate(caminho, axis=1)
+        dd = (pico - caminho) / pico
+    dd[depois] = 0.0
+    max_dd = dd.max(axis=1)
+
+    caminho[depois] = 0.0
+    caminho[arruinado, passo_ruina[arruinado]] = 0.0
+    return caminho[:, n].copy(), max_dd, caminho
+
+def block_bootstrap(trades_pct, initial_capital, sims=2000, block_sizes=(5,), min_trades=None,
+                    shock_prob=0.005, ruin_level=0.05, ruin_threshold=0.10, seed=None, rng=None,
+                    batch=1024, percentiles=(5, 25, 50, 75, 95), band_points=101):
+    trades_pct = np.asarray(trades_pct, dtype=np.float64)
+    n = len(trades_pct)
+    if min_trades is None: min_trades = max(block_sizes)
+    if n < min_trades:
+        return {"median_final": initial_capital, "worst_final": initial_capital, "ruin_prob": 0,
+                "median_dd": 0, "worst_dd": 0, "final_percentiles": {}, "bands": None}
+    if rng is None: rng = np.random.default_rng(seed)
+    batch = max(1, min(batch, CELULAS_LOTE // max(1, n))) # Históricos longos: lotes menores, mesma memória
+
+    # Bandas de percentil da curva em até band_points trades (grade fixa para caber 100k+ sims)
+    passos = np.unique(np.linspace(0, n, min(band_points, n + 1)).round().astype(int))
+    finais = np.empty(sims); dds = np.empty(sims); grade = np.empty((sims, len(passos)))
+    for s in range(0, sims, batch):
+        lote = min(batch, sims - s)
+        pnl = _chocar(rng, trades_pct[_indices_blocos(rng, lote, n, block_sizes)], shock_prob)
+        finais[s:s + lote], dds[s:s + lote], caminho = simular_caminhos(pnl, initial_capital, ruin_level)
+        grade[s:s + lote] = caminho[:, passos]
+
+    return {
+        "median_final": np.median(finais),
+        "worst_final": np.min(finais),
+        "ruin_prob": np.mean(finais <= initial_capital * ruin_threshold),
+        "median_dd": np.median(dds),
+        "worst_dd": np.max(dds),
+        "final_percentiles": {p: float(v) for p, v in zip(percentiles, np.percentile(finais, percentiles))},
+        "bands": {"trade": passos, **{p: b for p, b in zip(percentiles, np.percentile(grade, percentiles, axis=0))}}
+    }
@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import numpy as np
+import indicadores as ind
+import reamostragem as rs
+
+# --- MOTOR INCREMENTAL DE DADOS AO VIVO (V164) ---
+# Em vez de baixar 60 dias e recalcular tudo a cada execução, cada símbolo guarda
+# em disco um buffer das últimas velas fechadas + o estado dos indicadores
+# (EMAs, acumuladores Wilder do ATR/ADX e janela das Bollinger).
+# A cada rodada só as velas que fecharam desde a última execução são processadas.
+#
+# As fórmulas seguem o pandas_ta usado antes no bot.py:
+#   ema  -> semente SMA nas primeiras N velas e depois ewm(adjust=False)
+#   atr/adx -> rma = ewm(alpha=1/N, adjust=True, min_periods=N)
+#   bbands -> SMA 20 +/- 2 desvios (ddof=0)
+BUFFER_DIR = os.environ.get("ROBODERIK_BUFFER_DIR", "buffers_v164")
+
+EMAS = [20, 50, 200, 800]
+ATR_LEN = 14
+BB_LEN = 20
+BB_STD = 2.0
+MIN_VELAS = 804 # Mesmo mínimo do download antigo (805 linhas com a vela aberta)
+
+# Contexto macro de 4H agregado em streaming a partir das próprias velas de 15m
+HTF_MS = 4 * 3_600_000
+BASE_MS = 15 * 60_000
+CAMPOS_4H = ["ema200_4h", "adx_4h"]
+
+# Janelas aceitas pelo yfinance para 15m, da menor para a maior. Sem "1d": para o yfinance
+# é o dia corrente desde 00:00 UTC (não as últimas 24h), e logo depois da meia-noite vem
+# quase vazio ou com buraco contra o buffer, forçando a reconstrução de 60 dias
+PERIODOS = [("5d", 5), ("1mo", 28), ("60d", 60)]
+
+def novo_estado():
+    return {
+        "ultimo_ts": None,
+        "n": 0,
+        "ema": {str(l): None for l in EMAS},
+        "ema_soma": {str(l): 0.0 for l in EMAS},
+        # ewm(adjust=True) em forma recursiva: [numerador, denominador]
+        "rma": {"tr": [0.0, 0.0], "pos": [0.0, 0.0], "neg": [0.0, 0.0], "dx": [0.0, 0.0]},
+        "n_tr": 0,
+        "n_dx": 0,
+        # Buffer de velas fechadas [ts_ms, open, high, low, close] (também é a janela das BB)
+        "velas": [],
+        "htf": rs.novo_agregador(HTF_MS, BASE_MS, CAMPOS_4H)
+    }
+
+def macro_4h(st, barra):
+    _, o, h, l, c, v = barra
+    return {"ema200_4h": rs.ema(st, "ema200", c, 200), "adx_4h": rs.adx(st, "adx", h, l, c, ATR_LEN)}
+
+def _arquivo(symbol):
+    return os.path.join(BUFFER_DIR, f"{symbol}.json")
+
+def carregar_buffer(symbol):
+    path = _arquivo(symbol)
+    if not os.path.exists(path): return novo_estado()
+    try:
+        with open(path, "r") as f: estado = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Buffer de {symbol} ilegível ({e}), reconstruindo...")
+        return novo_estado()
+    # Buffer de antes do contexto de 4H: recomeça para o agregador ver o histórico inteiro
+    return estado if "htf" in estado else novo_estado()
+
+def salvar_buffer(symbol, estado):
+    os.makedirs(BUFFER_DIR, exist_ok=True)
+    tmp = _arquivo(symbol) + ".tmp"
+    with open(tmp, "w") as f: json.dump(estado, f)
+    os.replace(tmp, _arquivo(symbol))
+
+def periodo_download(estado, intervalo_ms):
+    # Menor janela do yfinance que ainda cobre as velas que faltam (com folga de 1 vela)
+    if estado["ultimo_ts"] is None: return "60d"
+    atraso_dias = (time.time() * 1000 - estado["ultimo_ts"] + 2 * intervalo_ms) / 86_400_000
+    for periodo, dias in PERIODOS:
+        if atraso_dias < dias: return periodo
+    return None # Buffer velho demais: recomeça do zero
+
+def _rma(par, x, alpha):
+    w = 1.0 - alpha
+    par[0] = x + w * par[0]
+    par[1] = 1.0 + w * par[1]
+    return par[0] / par[1]
+
+def atualizar_vela(estado, ts, o, h, l, c):
+    velas = estado["velas"]
+    prev = velas[-1] if velas else None
+    estado["n"] += 1
+    n = estado["n"]
+
+    for length in EMAS:
+        k = str(length)
+        if estado["ema"][k] is None:
+            estado["ema_soma"][k] += c
+            if n == length: estado["ema"][k] = estado["ema_soma"][k] / length
+        else:
+            alpha = 2.0 / (length + 1)
+            estado["ema"][k] = (1 - alpha) * estado["ema"][k] + alpha * c
+
+    if prev is not None:
+        _, _, ph, pl, pc = prev
+        rma = estado["rma"]; alpha = 1.0 / ATR_LEN
+        tr = max(h - l, abs(h - pc), abs(l - pc))
+        up = h - ph; dn = pl - l
+        pos = up if (up > dn and up > 0) else 0.0
+        neg = dn if (dn > up and dn > 0) else 0.0
+        atr = _rma(rma["tr"], tr, alpha)
+        pos_s = _rma(rma["pos"], pos, alpha)
+        neg_s = _rma(rma["neg"], neg, alpha)
+        estado["n_tr"] += 1
+        if estado["n_tr"] >= ATR_LEN and atr > 0:
+            dmp = 100 / atr * pos_s; dmn = 100 / atr * neg_s
+            if dmp + dmn > 0:
+                _rma(rma["dx"], 100 * abs(dmp - dmn) / (dmp + dmn), alpha)
+                estado["n_dx"] += 1
+
+    velas.append([int(ts), float(o), float(h), float(l), float(c)])
+    if len(velas) > BB_LEN: del velas[0]
+    rs.adicionar(estado["htf"], ts, o, h, l, c, 0.0, macro_4h)
+    estado["ultimo_ts"] = int(ts)
+
+def _par_rma(x, alpha):
+    # Reconstrói o [numerador, denominador] do ewm(adjust=True) a partir da série inteira
+    if not len(x): return [0.0, 0.0]
+    den = -np.expm1(len(x) * np.log1p(-alpha)) / alpha
+    return [float(ind.rma(x, round(1 / alpha))[-1] * den), float(den)]
+
+def aquecer(estado, ts, o, h, l, c):
+    # Partida a frio: calcula o estado inteiro de uma vez com os kernels vetorizados
+    # (mesmo resultado do laço de atualizar_vela, sem percorrer 5 mil velas em Python)
+    ts = np.asarray(ts, dtype=np.int64); h = ind._f64(h); l = ind._f64(l); c = ind._f64(c)
+    m = len(c); alpha = 1.0 / ATR_LEN
+    estado["n"] = m
+    for length in EMAS:
+        k = str(length)
+        estado["ema_soma"][k] = float(c[:length].sum())
+        estado["ema"][k] = float(ind.ema(c, length, sma_seed=True)[-1]) if m >= length else None
+
+    tr = ind.true_range(h, l, c)[1:]
+    pos, neg = (x[1:] for x in ind._directional_movement(h, l))
+    rma = estado["rma"]
+    rma["tr"] = _par_rma(tr, alpha); rma["pos"] = _par_rma(pos, alpha); rma["neg"] = _par_rma(neg, alpha)
+    estado["n_tr"] = m - 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        atr = ind.rma(tr, ATR_LEN)
+        dmp = 100 / atr * ind.rma(pos, ATR_LEN); dmn = 100 / atr * ind.rma(neg, ATR_LEN)
+        validos = (np.arange(1, m) >= ATR_LEN) & (atr > 0) & (dmp + dmn > 0)
+        dx = 100 * np.abs(dmp - dmn)[validos] / (dmp + dmn)[validos]
+    rma["dx"] = _par_rma(dx, alpha)
+    estado["n_dx"] = int(len(dx))
+
+    rs.processar(estado["htf"], ts, o, h, l, c, np.zeros(m), macro_4h)
+
+    ini = max(0, m - BB_LEN)
+    estado["velas"] = [[int(ts[i]), float(o[i]), float(h[i]), float(l[i]), float(c[i])] for i in range(ini, m)]
+    estado["ultimo_ts"] = int(ts[-1])
+
+def atualizar(estado, ts_ms, opens, highs, lows, closes):
+    # Consome apenas as velas FECHADAS mais novas que o buffer: custo O(velas novas)
+    if estado["n"] == 0 and len(ts_ms) > BB_LEN:
+        aquecer(estado, ts_ms, opens, highs, lows, closes)
+        return len(ts_ms)
+    novas = 0
+    for ts, o, h, l, c in zip(ts_ms, opens, highs, lows, closes):
+        if estado["ultimo_ts"] is not None and ts <= estado["ultimo_ts"]: continue
+        atualizar_vela(estado, ts, o, h, l, c)
+        novas += 1
+    return novas
+
+def pronto(estado):
+    return (estado["n"] >= MIN_VELAS and estado["n_dx"] >= ATR_LEN
+            and len(estado["velas"]) >= BB_LEN and estado["ema"]["800"] is not None)
+
+def snapshot(estado, current_price):
+    rma = estado["rma"]
+    closes = np.array([v[4] for v in estado["velas"]])
+    bb_mid = closes.mean(); bb_dev = closes.std()
+    _, o, h, l, c = estado["velas"][-1]
+    macro = rs.ultima_fechada(estado["htf"]) or dict.fromkeys(CAMPOS_4H, float("nan"))
+    return {
+        "current_price": float(current_price),
+        "ema20": estado["ema"]["20"],
+        "ema50": estado["ema"]["50"],
+        "ema200": estado["ema"]["200"],
+        "ema800": estado["ema"]["800"],
+        "atr": rma["tr"][0] / rma["tr"][1],
+        "adx": rma["dx"][0] / rma["dx"][1],
+        "bb_l": float(bb_mid - BB_STD * bb_dev),
+        "bb_u": float(bb_mid + BB_STD * bb_dev),
+        "closed_open": o,
+        "closed_close": c,
+        "closed_high": h,
+        "closed_low": l,
+        "ema200_4h": macro["ema200_4h"],
+        "adx_4h": macro["adx_4h"]
+    }
@@ -0,0 +1,79 @@
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+# --- PAINEL ALINHADO (TEMPO x MOEDA x CAMPO) ---
+# Substitui o df.to_dict('index') dos simuladores: em vez de um dict por vela por moeda,
+# um único array float64 (T, S, F) com todas as moedas alinhadas na mesma linha do tempo
+# e uma máscara (T, S) dizendo quais moedas têm vela naquele instante.
+# O laço principal anda por posição inteira e só converte para float Python a fatia
+# da vela atual (S x F valores), então a memória fica ~8 bytes por campo usado.
+# Campos booleanos viram 1.0/0.0 e mantêm o mesmo valor-verdade.
+
+def montar_painel(dfs, campos):
+    # dfs: {moeda: DataFrame indexado por tempo}; campos: colunas que o laço realmente lê
+    moedas = list(dfs)
+    if moedas:
+        tempos = pd.DatetimeIndex(np.unique(np.concatenate([dfs[m].index.values for m in moedas])))
+    else:
+        tempos = pd.DatetimeIndex([])
+    valores = np.full((len(tempos), len(moedas), len(campos)), np.nan)
+    valido = np.zeros((len(tempos), len(moedas)), dtype=bool)
+    for s, moeda in enumerate(moedas):
+        df = dfs[moeda]
+        pos = tempos.get_indexer(df.index)
+        valores[pos, s, :] = df[campos].to_numpy(dtype=np.float64)
+        valido[pos, s] = True
+    return {
+        "tempos": tempos,
+        "anos": tempos.year.tolist(),
+        "moedas": moedas,
+        "campos": list(campos),
+        "valores": valores,
+        "valido": valido
+    }
+
+def linha(painel, i):
+    # Fatia da vela i: (valores[s][campo] em float Python, valido[s] em bool Python)
+    return painel["valores"][i].tolist(), painel["valido"][i].tolist()
+
+def alinhar_serie(serie, painel, padrao):
+    # Equivalente vetorial de serie.get(ts, padrao) para cada ts da linha do tempo
+    return serie.reindex(painel["tempos"], fill_value=padrao).tolist()
+
+def tamanho_mb(painel):
+    return (painel["valores"].nbytes + painel["valido"].nbytes) / 1024 ** 2
+
+# --- PRÉ-TRIAGEM VETORIAL (O LAÇO SÓ VISITA VELAS COM EVENTO) ---
+# A maioria das velas não abre nem fecha nada: sem posição aberta e sem sinal em nenhuma
+# moeda, a iteração só recalcula escalares que não mudaram. Cada simulador monta, com
+# operações vetoriais sobre o painel, a máscara (T,) das velas com candidato a entrada
+# (sinal na vela fechada de alguma moeda) e, para cada posição aberta, acha a próxima vela
+# em que ela pode sair ou mexer no stop. O laço pula direto entre essas velas; nas demais
+# o laço denso não alteraria nenhum estado, então o resultado é idêntico bit a bit.
+
+def viradas_de_ano(painel):
+    # Primeira vela de cada ano (o laço fecha o ano anterior e abre o novo nela)
+    anos = np.asarray(painel["anos"])
+    return np.r_[False, anos[1:] != anos[:-1]]
+
+def proximo_verdadeiro(condicao, ini, fim, bloco=64):
+    # Primeiro k em [ini, fim) com condicao(a, b)[k - a] verdadeiro (fim se nenhum). Varre em
+    # blocos que dobram de tamanho: barato quando o evento está perto e poucas chamadas quando longe
+    a = ini
+    while a < fim:
+        b = min(fim, a + bloco)
+        k = np.flatnonzero(condicao(a, b))
+        if len(k): return a + int(k[0])
+        a = b; bloco *= 2
+    return fim
+
+def saltos(eventos, ini, fim, proxima_saida):
+    # Velas que o laço visita: ini, as marcadas em eventos (bool por vela) e a próxima saída
+    # possível das posições abertas (proxima_saida() é lida depois de cada vela processada)
+    marcadas = np.flatnonzero(eventos).tolist()
+    j = 0; i = ini
+    while i < fim:
+        yield i
+        j = bisect_left(marcadas, i + 1, j)
+        i = min(marcadas[j] if j < len(marcadas) else fim, proxima_saida())
@@ -0,0 +1,173 @@
+import io
+import sys
+import time
+import types
+import random
+import shutil
+import tempfile
+import hashlib
+import functools
+import contextlib
+import tracemalloc
+import importlib.util
+import importlib.machinery
+import numpy as np
+import pandas as pd
+import feature_store
+import resultado
+
+# --- PARIDADE DOS SIMULADORES EM DADOS FIXOS ---
+# Roda cada backtest numa base sintética determinística (sem rede: fetch_binance_data
+# é trocado por um gerador com regimes de volatilidade/tendência, início desalinhado
+# entre moedas e velas faltando) e compara a impressão digital da lista de trades com
+# a registrada antes da troca do to_dict('index') pelo painel alinhado.
+# Qualquer mudança no motor que altere um único trade (ou um bit de PnL) aparece aqui.
+# --denso: confere a pré-triagem de velas (painel.saltos) contra o laço que visita todas
+# as velas, com os parâmetros padrão e com um conjunto alternativo por script.
+# Uso: python paridade_backtests.py [pasta_dos_scripts] [--denso]
+
+# script -> (função chamada, função cujas variáveis locais são capturadas no retorno,
+#            timeframe pandas, velas por moeda, variáveis capturadas)
+CENARIOS = {
+    "Backtest25112026.py": ("run_backtest", "run_backtest", "1h", 40000, ["historico_global", "banca"]),
+    "Backtest_28022026": ("run_backtest", "simular", "15min", 60000, ["historico_global", "banca", "diagnostics"]),
+    "Backtest_V164_Validado": ("run_backtest_v164", "simular_v164", "4h", 13000, ["historico", "banca", "max_dd"]),
+}
+
+# Impressões digitais do motor antigo (dicts por vela) nos mesmos dados
+ESPERADO = {
+    "Backtest25112026.py": "4f2a8305b1d7360d",
+    "Backtest_28022026": "2d249a85aef7917a",
+    "Backtest_V164_Validado": "8117c73e10ad1461",
+}
+
+# Parâmetros fora do padrão para o modo --denso (constantes do topo de cada script,
+# lidas pelo simulador em tempo de execução ou pelo parametros_padrao())
+ALTERNATIVOS = {
+    "Backtest25112026.py": {"ALAVANCAGEM": 5.0, "MAX_POSICOES": 5, "MAX_ACCOUNT_MARGIN": 0.6},
+    "Backtest_28022026": {"MAX_POSICOES": 5, "ALVO_FADE_ATR": 1.5, "TRAIL_GATILHO_ATR": 3.0, "TRAIL_ATR": 2.0},
+    "Backtest_V164_Validado": {"MAX_POSICOES": 5, "BUFFER_PCT": 0.002, "RISK_AGRESSIVE": 0.05},
+}
+
+def dados_sinteticos(freq, n):
+    def fetch(symbol, *args, **kwargs):
+        seed = sum(map(ord, symbol))
+        rng = np.random.default_rng(seed)
+        # Volatilidade com memória (compressão -> expansão) e deriva por blocos de 300 velas
+        logvol = np.cumsum(rng.normal(0, 0.08, n)); logvol -= np.convolve(logvol, np.ones(500) / 500, "same")
+        vol = 0.006 * np.exp(np.clip(logvol, -1.5, 1.5))
+        drift = np.repeat(rng.normal(0, 0.0015, n // 300 + 1), 300)[:n]
+        close = 100 * np.exp(np.cumsum(drift + rng.normal(0, 1, n) * vol))
+        open_ = np.r_[close[0], close[:-1]] * (1 + rng.normal(0, 0.0005, n))
+        high = np.maximum(open_, close) * (1 + rng.random(n) * vol * 1.5)
+        low = np.minimum(open_, close) * (1 - rng.random(n) * vol * 1.5)
+        df = pd.DataFrame({"open": open_, "high": high, "low": low, "close": close},
+                          index=pd.date_range("2020-01-01", periods=n, freq=freq, name="date"))
+        df = df.iloc[rng.integers(0, 50):] # Cada moeda começa numa vela diferente
+        df = df.drop(df.index[rng.choice(len(df), 30, replace=False)]) # Buracos na série
+        df['v'] = rng.lognormal(10, 1, len(df))
+        return df
+    return fetch
+
+def carregar_script(path):
+    # Os scripts sem extensão não são importáveis por nome, carrega direto do arquivo
+    loader = importlib.machinery.SourceFileLoader("bt_" + hashlib.md5(path.encode()).hexdigest()[:8], path)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    mod = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()): loader.exec_module(mod)
+    return mod
+
+# Campos de trade que existiam quando as impressões digitais foram registradas (os que
+# entraram depois para o resultado.py, como symbol/side/motivo, ficam fora da conta)
+CAMPOS_TRADE = {
+    "Backtest25112026.py": {"data", "strat", "lucro", "pnl_pct"},
+    "Backtest_28022026": {"data", "strat", "lucro", "pnl_pct"},
+    "Backtest_V164_Validado": {"lucro", "strat", "lev"},
+}
+
+def _trades_antigos(trades, campos):
+    return [{k: v for k, v in t.items() if k in campos} for t in trades]
+
+def _canonico(v):
+    if isinstance(v, (float, np.floating)): return float(v).hex()
+    if isinstance(v, dict): return [(k, _canonico(v[k])) for k in sorted(v)]
+    if isinstance(v, (list, tuple)): return [_canonico(x) for x in v]
+    if isinstance(v, pd.Timestamp): return v.isoformat()
+    return repr(v)
+
+def impressao_digital(resultado):
+    return hashlib.sha256(repr(_canonico(resultado)).encode()).hexdigest()[:16]
+
+def rodar(path, funcao, captura_em, freq, n, captura, ajustes=None, denso=False):
+    mod = carregar_script(path)
+    mod.fetch_binance_data = dados_sinteticos(freq, n)
+    mod.klines_async = types.SimpleNamespace(aquecer_cache=lambda *args, **kwargs: 0) # Sem pré-download
+    for nome, valor in (ajustes or {}).items(): setattr(mod, nome, valor)
+    if denso: setattr(mod, captura_em, functools.partial(getattr(mod, captura_em), denso=True))
+    capturado = {}
+    def no_retorno(frame, evento, arg):
+        # O simulador não devolve nada: captura as variáveis locais quando ele retorna
+        if evento == "return" and frame.f_code.co_name == captura_em:
+            capturado.update({k: frame.f_locals.get(k) for k in captura})
+    random.seed(7); np.random.seed(7)
+    tracemalloc.start()
+    t0 = time.perf_counter(); sys.setprofile(no_retorno)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()): getattr(mod, funcao)()
+    finally:
+        sys.setprofile(None)
+    tempo = time.perf_counter() - t0
+    pico = tracemalloc.get_traced_memory()[1]; tracemalloc.stop()
+    return capturado, tempo, pico
+
+def confere_pacote(pasta, trades):
+    # O pacote gravado pelo script tem de devolver os mesmos trades lidos do disco
+    if pasta is None: return False
+    t = resultado.carregar(pasta)["trades"]
+    return len(t) == len(trades) and np.array_equal(t["lucro"].to_numpy(), np.array([x["lucro"] for x in trades], dtype=float))
+
+def main_denso(pasta="."):
+    # Mesmos trades e mesma banca visitando só os eventos ou todas as velas
+    falhas = 0
+    feature_store.FEATURE_DIR = tempfile.mkdtemp(prefix="paridade_features_")
+    resultado.ATIVO = False
+    print("🧪 Pré-triagem x laço denso (dados sintéticos fixos)")
+    print("-" * 65)
+    for script, (funcao, captura_em, freq, n, captura) in CENARIOS.items():
+        for rotulo, ajustes in (("padrão", None), ("alternativo", ALTERNATIVOS[script])):
+            digitais, tempos = [], []
+            for denso in (False, True):
+                capturado, tempo, _ = rodar(f"{pasta}/{script}", funcao, captura_em, freq, n, captura, ajustes, denso)
+                digitais.append(impressao_digital({k: capturado.get(k) for k in captura[:2]})); tempos.append(tempo)
+            ok = digitais[0] == digitais[1]
+            if not ok: falhas += 1
+            print(f"{'✅' if ok else '❌'} {script:<24} | {rotulo:<11} | {digitais[0]} x {digitais[1]} | {tempos[0]:5.1f}s x {tempos[1]:5.1f}s")
+    print("-" * 65)
+    resultado.ATIVO = True
+    shutil.rmtree(feature_store.FEATURE_DIR, ignore_errors=True)
+    return falhas
+
+def main(pasta="."):
+    falhas = 0
+    # Feature store vazio: cada cenário calcula, grava e segue com as features lidas de volta mapeadas
+    feature_store.FEATURE_DIR = tempfile.mkdtemp(prefix="paridade_features_")
+    raiz_resultados = tempfile.mkdtemp(prefix="paridade_resultados_")
+    print("🧪 Paridade dos simuladores (dados sintéticos fixos)")
+    print("-" * 65)
+    for script, (funcao, captura_em, freq, n, captura) in CENARIOS.items():
+        resultado.RESULT_DIR = f"{raiz_resultados}/{script}"
+        capturado, tempo, pico = rodar(f"{pasta}/{script}", funcao, captura_em, freq, n, captura)
+        trades = capturado[captura[0]] or []
+        digital = impressao_digital({**capturado, captura[0]: _trades_antigos(trades, CAMPOS_TRADE[script])})
+        pacote = confere_pacote(resultado.ultimo(), trades)
+        ok = digital == ESPERADO[script] and pacote
+        if not ok: falhas += 1
+        print(f"{'✅' if ok else '❌'} {script:<24} | {len(trades):5d} trades | {digital} | pacote {'ok' if pacote else 'ERRADO'} | {tempo:6.1f}s | pico {pico / 1024 ** 2:6.1f} MB")
+    print("-" * 65)
+    shutil.rmtree(feature_store.FEATURE_DIR, ignore_errors=True)
+    shutil.rmtree(raiz_resultados, ignore_errors=True)
+    return falhas
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--denso"]
+    sys.exit(1 if (main_denso if "--denso" in sys.argv else main)(args[0] if args else ".") else 0)
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import contextlib
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+# --- INSTRUMENTAÇÃO DOS BACKTESTS (TEMPO POR ETAPA + CONTADORES) ---
+# Cronômetros em volta de cada etapa (download, features, matriz macro, painel, laço
+# principal, Monte Carlo...), contadores do simulador (velas processadas, posições
+# abertas, fills) e, se pedido, um dump do cProfile/pyinstrument da rodada inteira.
+# No fim sai um perfil.json ao lado do pacote do resultado.py (ou na pasta atual).
+# Desligado (padrão), etapa() devolve sempre o mesmo nullcontext e o resto retorna na
+# primeira linha: nada é medido nem gravado.
+# Ligar: ROBODERIK_PERFIL=1            -> só cronômetros e contadores
+#        ROBODERIK_PERFIL=cprofile     -> + perfil.prof / perfil_top.txt
+#        ROBODERIK_PERFIL=pyinstrument -> + perfil.html (cai no cProfile sem o pyinstrument)
+MODO = os.environ.get("ROBODERIK_PERFIL", "0")
+ATIVO = MODO not in ("", "0")
+ARQUIVO = "perfil.json"
+TOP = 40 # Funções no perfil_top.txt (ordenadas pelo tempo acumulado)
+
+_NADA = contextlib.nullcontext()
+_estado = {"motor": None, "inicio": None, "cpu": None, "etapas": {}, "abertas": {}, "contadores": {}, "perfilador": None}
+
+def pico_rss_mb():
+    # Pico de memória residente do processo (ru_maxrss: KB no Linux, bytes no macOS)
+    if resource is None: return float("nan")
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 ** 2 if sys.platform == "darwin" else pico / 1024
+
+def _novo_perfilador():
+    if MODO == "pyinstrument":
+        try:
+            import pyinstrument
+            p = pyinstrument.Profiler()
+            p.start()
+            return ("pyinstrument", p)
+        except ImportError:
+            print("⚠️ pyinstrument não instalado, usando o cProfile.")
+    if MODO in ("cprofile", "pyinstrument"):
+        import cProfile
+        p = cProfile.Profile()
+        p.enable()
+        return ("cprofile", p)
+    return None
+
+def iniciar(motor):
+    if not ATIVO: return
+    _estado.update({"motor": motor, "inicio": time.perf_counter(), "cpu": time.process_time(),
+                    "etapas": {}, "abertas": {}, "contadores": {}, "perfilador": _novo_perfilador()})
+
+def comecar(nome):
+    # Para etapas que não cabem num with (o laço inteiro do Backtest25112026, com returns no meio)
+    if ATIVO: _estado["abertas"][nome] = (time.perf_counter(), time.process_time())
+
+def terminar(nome):
+    if not ATIVO or nome not in _estado["abertas"]: return
+    t0, c0 = _estado["abertas"].pop(nome)
+    e = _estado["etapas"].setdefault(nome, {"s": 0.0, "cpu_s": 0.0, "chamadas": 0})
+    e["s"] += time.perf_counter() - t0; e["cpu_s"] += time.process_time() - c0; e["chamadas"] += 1
+
+@contextlib.contextmanager
+def _medir(nome):
+    comecar(nome)
+    try:
+        yield
+    finally:
+        terminar(nome)
+
+def etapa(nome):
+    # with perfil.etapa("features"): ...  (etapas com o mesmo nome acumulam)
+    return _medir(nome) if ATIVO else _NADA
+
+def contar(**contadores):
+    # Soma contadores inteiros (uma chamada no fim do simulador, nunca por vela)
+    if not ATIVO: return
+    for nome, n in contadores.items(): _estado["contadores"][nome] = _estado["contadores"].get(nome, 0) + int(n)
+
+def resumo():
+    total = time.perf_counter() - _estado["inicio"]
+    etapas = {nome: {**e, "pct": e["s"] / total * 100 if total else 0.0} for nome, e in _estado["etapas"].items()}
+    contadores = dict(_estado["contadores"])
+    taxas = {}
+    laco = etapas.get("simulacao", {}).get("s")
+    if laco:
+        for nome in ("barras", "barras_moeda", "visitadas"):
+            if nome in contadores: taxas[f"{nome}_por_s"] = contadores[nome] / laco
+    return {"motor": _estado["motor"], "criado": time.strftime("%Y-%m-%dT%H:%M:%S"), "modo": MODO,
+            "total_s": total, "cpu_s": time.process_time() - _estado["cpu"],
+            "fora_das_etapas_s": total - sum(e["s"] for e in etapas.values()),
+            "etapas": etapas, "contadores": contadores, "taxas": taxas, "pico_rss_mb": pico_rss_mb()}
+
+def _gravar_perfilador(pasta):
+    tipo, p = _estado["perfilador"]
+    if tipo == "pyinstrument":
+        p.stop()
+        caminho = os.path.join(pasta, "perfil.html")
+        with open(caminho, "w") as f: f.write(p.output_html())
+        return caminho
+    import io
+    import pstats
+    p.disable()
+    caminho = os.path.join(pasta, "perfil.prof")
+    p.dump_stats(caminho)
+    texto = io.StringIO()
+    pstats.Stats(p, stream=texto).sort_stats("cumulative").print_stats(TOP)
+    with open(os.path.join(pasta, "perfil_top.txt"), "w") as f: f.write(texto.getvalue())
+    return caminho
+
+def finalizar(pasta=None):
+    # Grava o perfil.json (e o dump do perfilador) em `pasta`; devolve o resumo
+    if not ATIVO or _estado["inicio"] is None: return None
+    pasta = pasta or "."
+    os.makedirs(pasta, exist_ok=True)
+    r = resumo()
+    if _estado["perfilador"] is not None: r["dump"] = _gravar_perfilador(pasta)
+    with open(os.path.join(pasta, ARQUIVO), "w") as f: json.dump(r, f, indent=1)
+    _estado["inicio"] = None; _estado["perfilador"] = None
+
+    print("\n⏱️ PERFIL DA RODADA")
+    print("-" * 65)
+    for nome, e in sorted(r["etapas"].items(), key=lambda x: -x[1]["s"]):
+        print(f"   {nome:<18} {e['s']:9.2f}s  {e['pct']:5.1f}%  (cpu {e['cpu_s']:.2f}s, {e['chamadas']}x)")
+    print(f"   {'(fora das etapas)':<18} {r['fora_das_etapas_s']:9.2f}s")
+    print(f"   {'TOTAL':<18} {r['total_s']:9.2f}s  | pico RSS {r['pico_rss_mb']:.0f} MB")
+    if r["contadores"]: print("   " + " | ".join(f"{k}: {v:,}".replace(",", ".") for k, v in r["contadores"].items()))
+    for k, v in r["taxas"].items(): print(f"   {k}: {v:,.0f}".replace(",", "."))
+    print(f"💾 Perfil salvo em {os.path.join(pasta, ARQUIVO)}")
+    return r
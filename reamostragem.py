@@ -0,0 +1,175 @@
+import numpy as np
+
+# --- REAMOSTRAGEM MULTI-TIMEFRAME EM STREAMING ---
+# Agrega velas do timeframe base (15m/1h) em velas maiores (4h) conforme elas chegam,
+# uma a uma (bot) ou em lotes (backtests), e calcula os indicadores da vela maior só
+# quando ela FECHA. O timeframe base lê os valores da última vela maior disponível sem
+# nenhum resample/shift/join do histórico inteiro.
+#
+# Regra de disponibilidade (a mesma dos dois backtests): a vela maior de rótulo R só é
+# vista a partir da vela base que abre em R + período.
+#   rotulo="esquerda" -> balde [R, R+P) (resample('4h') + shift(1) do Backtest25112026)
+#   rotulo="direita"  -> balde (R-P, R] (label/closed='right' + index+4h do Backtest_28022026)
+#
+# Todo o estado é um dict de listas/números (vai direto para JSON, como o buffer do
+# motor_live) e tem tamanho fixo: vela parcial, velas fechadas ainda não visíveis e as
+# janelas dos indicadores. Os indicadores são funções calcular(st, barra) -> dict que
+# usam as primitivas incrementais abaixo sobre o dict st.
+NAN = float("nan")
+
+def novo_agregador(periodo_ms, base_ms, campos, rotulo="esquerda"):
+    return {
+        "periodo": int(periodo_ms),
+        "base": int(base_ms),
+        "rotulo": rotulo,
+        "campos": list(campos),
+        "ultimo_ts": None,
+        "barra": None,      # Vela maior em formação [rotulo, open, high, low, close, volume]
+        "pendentes": [],    # Velas fechadas que ainda não podem ser vistas [disponível_em, valores]
+        "visivel": None,    # Valores da última vela maior disponível
+        "n": 0,             # Velas maiores fechadas
+        "ind": {}           # Estado dos indicadores
+    }
+
+def _rotulos(ag, ts):
+    p = ag["periodo"]
+    if ag["rotulo"] == "esquerda": return ts // p * p
+    return -(-ts // p) * p
+
+def _completa(ag, rotulo, ts_ultima):
+    # A vela base que fecha o balde já entrou?
+    if ag["rotulo"] == "esquerda": return ts_ultima + ag["base"] >= rotulo + ag["periodo"]
+    return ts_ultima >= rotulo
+
+def _fechar(ag, barra, calcular):
+    valores = calcular(ag["ind"], barra)
+    ag["pendentes"].append([barra[0] + ag["periodo"], [float(valores[c]) for c in ag["campos"]]])
+    ag["n"] += 1
+
+def processar(ag, ts, o, h, l, c, v, calcular):
+    # Consome um lote de velas base FECHADAS em ordem (as já vistas são ignoradas) e
+    # devolve {campo: array} com o valor visível da vela maior em cada vela consumida
+    ts = np.asarray(ts, dtype=np.int64)
+    o, h, l, c, v = (np.asarray(x, dtype=np.float64) for x in (o, h, l, c, v))
+    if ag["ultimo_ts"] is not None:
+        novas = ts > ag["ultimo_ts"]
+        ts, o, h, l, c, v = ts[novas], o[novas], h[novas], l[novas], c[novas], v[novas]
+    n = len(ts)
+    if n == 0: return {campo: np.empty(0) for campo in ag["campos"]}
+
+    # OHLCV de cada balde do lote de uma vez
+    rot = _rotulos(ag, ts)
+    quebra = np.flatnonzero(np.diff(rot)) + 1
+    ini = np.r_[0, quebra]; fim = np.r_[quebra - 1, n - 1]
+    barras = np.column_stack([rot[ini], o[ini], np.maximum.reduceat(h, ini), np.minimum.reduceat(l, ini),
+                              c[fim], np.add.reduceat(v, ini)]).tolist()
+
+    parcial = ag["barra"]
+    if parcial is not None:
+        if parcial[0] == barras[0][0]:
+            b = barras[0]
+            barras[0] = [b[0], parcial[1], max(parcial[2], b[2]), min(parcial[3], b[3]), b[4], parcial[5] + b[5]]
+        else:
+            _fechar(ag, parcial, calcular) # Buraco nos dados: o balde anterior não recebe mais velas
+    for b in barras[:-1]: _fechar(ag, b, calcular)
+    ultima = barras[-1]
+    if _completa(ag, ultima[0], int(ts[-1])):
+        _fechar(ag, ultima, calcular); ag["barra"] = None
+    else:
+        ag["barra"] = ultima
+
+    # Valor visível em cada vela base: última vela maior com disponível_em <= ts
+    pend = ag["pendentes"]
+    disponivel = np.array([p[0] for p in pend], dtype=np.int64)
+    anterior = ag["visivel"] if ag["visivel"] is not None else [NAN] * len(ag["campos"])
+    tabela = np.array([anterior] + [p[1] for p in pend], dtype=np.float64)
+    pos = np.searchsorted(disponivel, ts, side="right")
+    saida = tabela[pos]
+
+    k = int(pos[-1])
+    if k: ag["visivel"] = pend[k - 1][1]
+    ag["pendentes"] = pend[k:]
+    ag["ultimo_ts"] = int(ts[-1])
+    return {campo: saida[:, j] for j, campo in enumerate(ag["campos"])}
+
+def adicionar(ag, ts, o, h, l, c, v, calcular):
+    # Uma vela base por vez (modo ao vivo): devolve os valores visíveis nela
+    saida = processar(ag, [ts], [o], [h], [l], [c], [v], calcular)
+    return {campo: float(x[0]) for campo, x in saida.items()} if len(saida[ag["campos"][0]]) else None
+
+def ultima_fechada(ag):
+    # Valores da vela maior fechada mais recente (mesmo que ainda não "visível" pela regra
+    # do backtest); é o que o bot usa logo depois de a vela de 4H fechar
+    if ag["pendentes"]: valores = ag["pendentes"][-1][1]
+    else: valores = ag["visivel"]
+    return None if valores is None else dict(zip(ag["campos"], valores))
+
+def ts_ms(index):
+    # DatetimeIndex (com ou sem fuso) -> abertura das velas em ms desde a epoch
+    if index.tz is not None: index = index.tz_convert(None)
+    return np.asarray((index - np.datetime64(0, "ms")) // np.timedelta64(1, "ms"), dtype=np.int64)
+
+# --- PRIMITIVAS INCREMENTAIS (mesmas fórmulas do indicadores.py, uma barra por vez) ---
+def janela(st, nome, x, n):
+    j = st.setdefault(nome, [])
+    j.append(x)
+    if len(j) > n: del j[0]
+    return j
+
+def ema(st, nome, x, length):
+    # Semente SMA nas primeiras length barras e depois ewm(adjust=False) (pandas_ta)
+    e = st.setdefault(nome, {"n": 0, "soma": 0.0, "valor": None})
+    e["n"] += 1
+    if e["valor"] is None:
+        e["soma"] += x
+        if e["n"] == length: e["valor"] = e["soma"] / length
+    else:
+        alpha = 2.0 / (length + 1)
+        e["valor"] = (1 - alpha) * e["valor"] + alpha * x
+    return NAN if e["valor"] is None else e["valor"]
+
+def rma(st, nome, x, length, min_periods=0):
+    # ewm(alpha=1/length, adjust=True) em forma recursiva [numerador, denominador, observações];
+    # NaN no meio só decai os pesos (ignore_na=False do pandas)
+    r = st.setdefault(nome, [0.0, 0.0, 0])
+    w = 1.0 - 1.0 / length
+    if x != x:
+        r[0] *= w; r[1] *= w
+    else:
+        r[0] = x + w * r[0]; r[1] = 1.0 + w * r[1]; r[2] += 1
+    return r[0] / r[1] if r[2] >= max(min_periods, 1) else NAN
+
+def adx(st, nome, high, low, close, length=14):
+    # ADX do pandas_ta (ind.adx(..., pandas_ta=True)): TR/DM da 1ª barra são NaN e todas
+    # as médias são rma(adjust=True, min_periods=length)
+    prev = st.get(nome)
+    st[nome] = [high, low, close]
+    if prev is None:
+        tr = pos = neg = NAN
+    else:
+        ph, pl, pc = prev
+        tr = max(high - low, abs(high - pc), abs(low - pc))
+        up = high - ph; dn = pl - low
+        pos = up if (up > dn and up > 0) else 0.0
+        neg = dn if (dn > up and dn > 0) else 0.0
+    atr = rma(st, nome + ".tr", tr, length, length)
+    pos_s = rma(st, nome + ".pos", pos, length, length)
+    neg_s = rma(st, nome + ".neg", neg, length, length)
+    dx = NAN
+    if atr > 0:
+        dmp = 100.0 / atr * pos_s; dmn = 100.0 / atr * neg_s
+        if dmp + dmn > 0: dx = 100.0 * abs(dmp - dmn) / (dmp + dmn)
+    return rma(st, nome + ".dx", dx, length, length)
+
+def desvio(valores):
+    # Desvio padrão populacional (ddof=0) de uma janela curta, sem o custo fixo do np.std
+    media = sum(valores) / len(valores)
+    return (sum((x - media) ** 2 for x in valores) / len(valores)) ** 0.5
+
+def quantil(valores, q):
+    # rolling(n).quantile(q) do pandas (interpolação linear; NaN na janela -> NaN)
+    if any(x != x for x in valores): return NAN
+    ordenados = sorted(valores)
+    pos = q * (len(ordenados) - 1); i = int(pos)
+    if i + 1 >= len(ordenados): return ordenados[i]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (pos - i)
@@ -1,116 +1,327 @@
+import sys
 import json
-import pandas as pd
 import os
-import sys
-import subprocess
-import pytz
+import diario
 
-# Auto-install dependencies
-def install(package):
-    try: __import__(package)
-    except: subprocess.check_call([sys.executable, "-m", "pip", "install", "-q", package])
-for lib in ["pandas", "openpyxl", "xlsxwriter", "pytz"]: install(lib)
+# Dependências (xlsxwriter): python dependencias.py. O xlsxwriter só é importado
+# dentro de escrever_planilha, quando há de fato um relatório para montar.
 
 # CONFIGURAÇÃO
 JSON_FILE = "estado_v164.json"
+JOURNAL_FILE = "trades_v164.jsonl"
 EXCEL_FILE = "Relatorio_Oficial.xlsx"
+ANALITICO_FILE = "Relatorio_Analitico.xlsx"
+CHECKPOINT_FILE = "Relatorio_Oficial.ckpt.json" # Até onde o diário já foi exportado (modo incremental)
+SALDO_INICIAL = 60.0
 
-def gerar_relatorio():
-    print("💎 Gerando Relatório V164 (Asymmetric Compounder)...")
-    
-    if not os.path.exists(JSON_FILE):
-        print(f"❌ Arquivo {JSON_FILE} não encontrado. Rode o bot.py primeiro.")
-        return
+# --- RELATÓRIO EM STREAMING ---
+# Os trades vêm de um gerador (diário JSONL lido linha a linha, ou a lista de qualquer
+# backtest) e cada um vira uma linha escrita direto no xlsx com o constant_memory do
+# xlsxwriter: só a linha atual fica em memória, então 500 mil trades cabem no mesmo
+# pico de memória de 50. Formatação condicional e gráfico cobrem o número real de linhas.
+# Acima de LINHAS_POR_ABA trades a planilha continua numa aba nova (o Excel para em 1.048.576).
+# Uso: python reporter.py                -> relatório completo (EXCEL_FILE)
+#      python reporter.py --incremental  -> só os trades novos do diário desde a última
+#                                           rodada, num arquivo de parte numerado
+#      python reporter.py --resultado [pasta] -> relatório analítico de uma rodada de
+#                                           backtest gravada pelo resultado.py (padrão: a última)
+LINHAS_POR_ABA = 1_000_000
+ABA = "Trades_V164"
+
+# (cabeçalho, largura, formato)
+COLUNAS = [("Data", 20, "centro"), ("Par", 12, "centro"), ("Estratégia", 12, "centro"), ("Lado", 12, "centro"),
+           ("Macro", 10, "centro"), ("Adds", 10, "centro"), ("Motivo", 30, None),
+           ("Lucro ($)", 15, "dinheiro"), ("Saldo ($)", 15, "dinheiro")]
+COL_LUCRO = 7
+COL_SALDO = 8
+
+def _texto(v):
+    # Datas dos backtests (Timestamp) e qualquer outro tipo viram texto na coluna Data
+    return v if v is None or isinstance(v, str) else str(v)
+
+def linha_trade(t, saldo):
+    return [
+        _texto(t.get("data")),
+        t.get("symbol"),
+        t.get("strat", "N/A"),                  # TREND ou TRAP
+        (t.get("side") or "N/A").upper(),       # BUY ou SELL
+        t.get("macro", "-"),                    # SUMMER ou WINTER (Se disponível no histórico)
+        t.get("adds", 0),                       # Quantas vezes piramidou
+        t.get("motivo", ""),                    # TP Deep Trend, TP Fast, SL, etc.
+        float(t.get("lucro", 0.0)),
+        float(saldo)
+    ]
+
+def _nova_aba(workbook, formatos, k):
+    ws = workbook.add_worksheet(ABA if k == 0 else f"{ABA}_{k + 1}")
+    for c, (nome, largura, fmt) in enumerate(COLUNAS):
+        ws.set_column(c, c, largura, formatos.get(fmt))
+        ws.write(0, c, nome, formatos["cabecalho"])
+    return ws
+
+def _fechar_aba(ws, formatos, linhas):
+    # Condicional no Lucro (Coluna H) até a última linha escrita
+    if linhas == 0: return
+    for criterio, fmt in ((">", "verde"), ("<", "vermelho")):
+        ws.conditional_format(1, COL_LUCRO, linhas, COL_LUCRO,
+                              {'type': 'cell', 'criteria': criterio, 'value': 0, 'format': formatos[fmt]})
 
+def escrever_planilha(trades, caminho, saldo_inicial=SALDO_INICIAL, linha_deposito=True):
+    # trades: qualquer iterável de dicts no formato do diário. Devolve (trades escritos, saldo final)
+    import xlsxwriter
+    workbook = xlsxwriter.Workbook(caminho, {'constant_memory': True})
+    formatos = {
+        "dinheiro": workbook.add_format({'num_format': '$ #,##0.00'}),
+        "centro": workbook.add_format({'align': 'center'}),
+        "cabecalho": workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#D7E4BC'}),
+        # Cores Condicionais (Verde/Vermelho)
+        "verde": workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'}),
+        "vermelho": workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
+    }
+
+    abas = [_nova_aba(workbook, formatos, 0)]
+    linhas = [0] # Linhas de dados em cada aba
+    saldo = saldo_inicial
+    if linha_deposito:
+        # Saldo Inicial (Linha 0)
+        abas[0].write_row(1, 0, ["INICIO", "-", "Depósito", "-", "-", 0, "Saldo Inicial", 0.0, saldo])
+        linhas[0] = 1
+
+    n = 0
+    for t in trades:
+        if linhas[-1] >= LINHAS_POR_ABA:
+            _fechar_aba(abas[-1], formatos, linhas[-1])
+            abas.append(_nova_aba(workbook, formatos, len(abas))); linhas.append(0)
+        saldo += float(t.get("lucro", 0.0))
+        linhas[-1] += 1
+        abas[-1].write_row(linhas[-1], 0, linha_trade(t, saldo))
+        n += 1
+    _fechar_aba(abas[-1], formatos, linhas[-1])
+
+    # GRÁFICO DE EVOLUÇÃO (uma série por aba)
+    if sum(linhas):
+        chart = workbook.add_chart({'type': 'line'})
+        for ws, m in zip(abas, linhas):
+            if not m: continue
+            chart.add_series({
+                'name':       'Evolução da Banca',
+                'categories': [ws.name, 1, 0, m, 0],                 # Datas
+                'values':     [ws.name, 1, COL_SALDO, m, COL_SALDO], # Saldo (Coluna I)
+                'line':       {'color': '#2980B9', 'width': 2.5}
+            })
+        chart.set_title({'name': 'Performance V164 - Asymmetric Compounder'})
+        chart.set_size({'width': 800, 'height': 400})
+        abas[0].insert_chart('K2', chart)
+
+    workbook.close()
+    return n, saldo
+
+def _historico():
+    if os.path.exists(JOURNAL_FILE):
+        # Diário append-only: lido em streaming, um trade por vez
+        return diario.ler_trades(JOURNAL_FILE)
+    if os.path.exists(JSON_FILE):
+        # Estado do formato antigo (histórico dentro do snapshot), antes do bot migrar
+        try:
+            with open(JSON_FILE, 'r') as f: data = json.load(f)
+        except Exception as e:
+            print(f"❌ Erro ao ler JSON: {e}")
+            return None
+        if "historico_trades" in data: return data["historico_trades"]
+        # Snapshot já migrado pelo bot.py: o histórico só existe no diário. Sem ele, exportar
+        # 0 trades esconderia o problema (ex.: deploy que versiona só o snapshot)
+        print(f"❌ {JSON_FILE} não tem mais o histórico e o diário {JOURNAL_FILE} não foi encontrado. "
+              f"Versione o diário junto com o snapshot (git add {JOURNAL_FILE}).")
+        return None
+    print(f"❌ Arquivos {JOURNAL_FILE} / {JSON_FILE} não encontrados. Rode o bot.py primeiro.")
+    return None
+
+def _ler_checkpoint():
     try:
-        with open(JSON_FILE, 'r') as f: data = json.load(f)
-    except Exception as e:
-        print(f"❌ Erro ao ler JSON: {e}")
-        return
-
-    raw_trades = data.get("historico_trades", [])
-    trades_processados = []
-
-    # Saldo Inicial (Linha 0)
-    banca_atual = data.get("banca_atual", 60.0)
-    # Tenta estimar o saldo inicial subtraindo os lucros, ou usa 60.0 fixo
-    saldo_acumulado = 60.0 
-    
-    trades_processados.append({
-        "Data": "INICIO", 
-        "Par": "-", 
-        "Estratégia": "Depósito", 
-        "Lado": "-",
-        "Macro": "-", 
-        "Adds": 0, 
-        "Motivo": "Saldo Inicial", 
-        "Lucro ($)": 0.0,
-        "Saldo ($)": saldo_acumulado
-    })
-
-    # Processa cada trade
-    for t in raw_trades:
-        lucro = t.get("lucro", 0.0)
-        saldo_acumulado += lucro
-        
-        item = {
-            "Data": t.get("data"),
-            "Par": t.get("symbol"),
-            "Estratégia": t.get("strat", "N/A"),  # TREND ou TRAP
-            "Lado": t.get("side", "N/A").upper(), # BUY ou SELL
-            "Macro": t.get("macro", "-"),         # SUMMER ou WINTER (Se disponível no histórico)
-            "Adds": t.get("adds", 0),             # Quantas vezes piramidou
-            "Motivo": t.get("motivo", ""),        # TP Deep Trend, TP Fast, SL, etc.
-            "Lucro ($)": float(lucro),
-            "Saldo ($)": float(saldo_acumulado)
-        }
-        trades_processados.append(item)
-
-    # Cria DataFrame
-    df = pd.DataFrame(trades_processados)
-    
-    # GERAR EXCEL COM FORMATAÇÃO
-    writer = pd.ExcelWriter(EXCEL_FILE, engine='xlsxwriter')
-    df.to_excel(writer, sheet_name='Trades_V164', index=False)
-    
-    workbook = writer.book
-    worksheet = writer.sheets['Trades_V164']
-    
-    # Formatos
-    fmt_money = workbook.add_format({'num_format': '$ #,##0.00'})
-    fmt_center = workbook.add_format({'align': 'center'})
-    fmt_header = workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#D7E4BC'})
-    
-    # Cores Condicionais (Verde/Vermelho)
-    fmt_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-    fmt_red = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-
-    # Aplicar Formatação
-    worksheet.set_column('A:A', 20, fmt_center) # Data
-    worksheet.set_column('B:D', 12, fmt_center) # Par/Estrat/Lado
-    worksheet.set_column('E:F', 10, fmt_center) # Macro/Adds
-    worksheet.set_column('G:G', 30)             # Motivo
-    worksheet.set_column('H:I', 15, fmt_money)  # Lucro e Saldo
-
-    # Condicional no Lucro (Coluna H)
-    worksheet.conditional_format('H2:H1000', {'type': 'cell', 'criteria': '>', 'value': 0, 'format': fmt_green})
-    worksheet.conditional_format('H2:H1000', {'type': 'cell', 'criteria': '<', 'value': 0, 'format': fmt_red})
-
-    # GRÁFICO DE EVOLUÇÃO
-    chart = workbook.add_chart({'type': 'line'})
-    chart.add_series({
-        'name':       'Evolução da Banca',
-        'categories': ['Trades_V164', 1, 0, len(df), 0], # Datas
-        'values':     ['Trades_V164', 1, 8, len(df), 8], # Saldo (Coluna I = índice 8)
-        'line':       {'color': '#2980B9', 'width': 2.5}
-    })
-    chart.set_title({'name': 'Performance V164 - Asymmetric Compounder'})
-    chart.set_size({'width': 800, 'height': 400})
-    worksheet.insert_chart('K2', chart)
-    
-    writer.close()
-    print(f"✅ Relatório Oficial Gerado: {EXCEL_FILE}")
+        with open(CHECKPOINT_FILE, "r") as f: return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def gerar_relatorio_incremental():
+    # Só os trades anexados ao diário desde a última exportação: xlsx não aceita append,
+    # então eles vão para um arquivo de parte novo e o checkpoint guarda o byte do
+    # diário, o saldo e a numeração onde a próxima parte continua
+    if not os.path.exists(JOURNAL_FILE):
+        print(f"❌ Modo incremental precisa do diário {JOURNAL_FILE}.")
+        return None
+    ckpt = _ler_checkpoint()
+    if ckpt is None or ckpt["offset"] > os.path.getsize(JOURNAL_FILE):
+        ckpt = {"offset": 0, "trades": 0, "saldo": SALDO_INICIAL, "parte": 0} # Sem checkpoint ou diário recriado
+
+    posicao = {"offset": ckpt["offset"]}
+    def novos():
+        for trade, offset in diario.ler_trades_desde(JOURNAL_FILE, ckpt["offset"]):
+            posicao["offset"] = offset
+            yield trade
+
+    base, ext = os.path.splitext(EXCEL_FILE)
+    parte = ckpt["parte"] + 1
+    caminho = f"{base}_parte{parte:03d}{ext}"
+    n, saldo = escrever_planilha(novos(), caminho, ckpt["saldo"], linha_deposito=ckpt["parte"] == 0)
+    if n == 0:
+        os.remove(caminho)
+        print("✅ Nenhum trade novo desde o último relatório.")
+        return ckpt
+
+    novo = {"offset": posicao["offset"], "trades": ckpt["trades"] + n, "saldo": saldo, "parte": parte}
+    diario.salvar_snapshot(CHECKPOINT_FILE, novo)
+    print(f"✅ Parte {parte} gerada: {caminho} ({n} trades novos, {novo['trades']} no total, saldo ${saldo:.2f})")
+    return novo
+
+# --- RELATÓRIO ANALÍTICO (VÁRIAS ABAS) ---
+# Resumo, agregados por ano/símbolo/estratégia/motivo de saída, curva de drawdown, win
+# rate móvel e bandas de percentil do Monte Carlo, calculados pelo analitico.py em
+# operações de coluna (groupby/cumsum/rolling). Só as tabelas agregadas e as curvas
+# reduzidas vão para o xlsx, então o arquivo tem o mesmo tamanho com 500 trades ou 500 mil.
+ROTULOS = {
+    "ano": "Ano", "symbol": "Par", "strat": "Estratégia", "motivo": "Motivo", "trade": "Trade", "data": "Data",
+    "inicio": "Início ($)", "fim": "Fim ($)", "roi": "ROI (%)", "trades": "Trades", "wins": "Wins",
+    "win_rate": "Win Rate (%)", "lucro": "Lucro ($)", "lucro_medio": "Lucro Médio ($)",
+    "maior_ganho": "Maior Ganho ($)", "maior_perda": "Maior Perda ($)", "profit_factor": "Profit Factor",
+    "saldo": "Saldo ($)", "pico": "Pico ($)", "drawdown": "Drawdown (%)"
+}
+AGREGADOS = [("Por_Ano", "ano"), ("Por_Simbolo", "symbol"), ("Por_Estrategia", "strat"), ("Por_Motivo", "motivo")]
+
+def _valores(df):
+    # Colunas em tipos que o xlsxwriter conhece (NaN/NaT viram célula vazia)
+    import pandas as pd
+    colunas = []
+    for c in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[c]):
+            colunas.append([None if pd.isna(x) else x.to_pydatetime() for x in df[c]])
+        else:
+            colunas.append(df[c].astype(object).where(df[c].notna(), None).tolist())
+    return list(zip(*colunas))
+
+def _escrever_tabela(ws, linha, df, formatos):
+    # Cabeçalho + linhas a partir de `linha`; devolve a última linha escrita
+    ws.write_row(linha, 0, [ROTULOS.get(c, c) for c in df.columns], formatos["cabecalho"])
+    for k, valores in enumerate(_valores(df), start=1):
+        ws.write_row(linha + k, 0, valores)
+    ws.set_column(0, len(df.columns) - 1, 16)
+    for c, nome in enumerate(df.columns):
+        if nome == "data": ws.set_column(c, c, 20, formatos["data"])
+        elif "($)" in ROTULOS.get(nome, nome): ws.set_column(c, c, 16, formatos["dinheiro"])
+        elif "(%)" in ROTULOS.get(nome, nome) or nome == "profit_factor": ws.set_column(c, c, 16, formatos["decimal"])
+    return linha + len(df)
+
+def _grafico(workbook, aba, titulo, series, linhas, col_x=0, tipo='line'):
+    chart = workbook.add_chart({'type': tipo})
+    for nome, col, cor in series:
+        chart.add_series({'name': nome, 'categories': [aba, 1, col_x, linhas, col_x],
+                          'values': [aba, 1, col, linhas, col], 'line': {'color': cor, 'width': 1.5}})
+    chart.set_title({'name': titulo})
+    chart.set_size({'width': 900, 'height': 420})
+    return chart
+
+def gerar_analitico(trades, caminho=ANALITICO_FILE, saldo_inicial=SALDO_INICIAL, mc_sims=None, seed=None):
+    # trades: diário, historico_global de um backtest ou DataFrame já montado
+    import xlsxwriter
+    import analitico
+    df = analitico.tabela(trades, saldo_inicial)
+    if not len(df):
+        print("⚠️ Nenhum trade para o relatório analítico.")
+        return None
+
+    workbook = xlsxwriter.Workbook(caminho)
+    formatos = {
+        "cabecalho": workbook.add_format({'bold': True, 'align': 'center', 'bg_color': '#D7E4BC'}),
+        "dinheiro": workbook.add_format({'num_format': '$ #,##0.00'}),
+        "decimal": workbook.add_format({'num_format': '0.00'}),
+        "data": workbook.add_format({'num_format': 'dd/mm/yyyy hh:mm'}),
+        "verde": workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'}),
+        "vermelho": workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
+    }
+
+    # RESUMO
+    ws = workbook.add_worksheet("Resumo")
+    ws.set_column(0, 0, 22); ws.set_column(1, 1, 20)
+    for k, (nome, valor) in enumerate(analitico.resumo(df, saldo_inicial).items()):
+        ws.write(k, 0, nome, formatos["cabecalho"])
+        if valor is None or valor != valor: continue # NaN / NaT
+        if hasattr(valor, "to_pydatetime"): ws.write_datetime(k, 1, valor.to_pydatetime(), formatos["data"])
+        else: ws.write_number(k, 1, float(valor), formatos["dinheiro"] if "($)" in nome else formatos["decimal"])
+
+    # AGREGADOS (um groupby por aba)
+    for aba, chave in AGREGADOS:
+        g = analitico.agregar(df, chave)
+        ws = workbook.add_worksheet(aba)
+        fim = _escrever_tabela(ws, 0, g, formatos)
+        col = list(g.columns).index("lucro")
+        for criterio, fmt in ((">", "verde"), ("<", "vermelho")):
+            ws.conditional_format(1, col, fim, col, {'type': 'cell', 'criteria': criterio, 'value': 0, 'format': formatos[fmt]})
+
+    # CURVAS
+    dd = analitico.curva_drawdown(df)
+    ws = workbook.add_worksheet("Drawdown")
+    n = _escrever_tabela(ws, 0, dd, formatos)
+    ws.insert_chart('G2', _grafico(workbook, "Drawdown", "Banca e Pico", [("Saldo", 2, '#2980B9'), ("Pico", 3, '#7F8C8D')], n))
+    ws.insert_chart('G24', _grafico(workbook, "Drawdown", "Drawdown (%)", [("Drawdown", 4, '#C0392B')], n, tipo='area'))
+
+    wr = analitico.win_rate_movel(df)
+    ws = workbook.add_worksheet("WinRate_Movel")
+    n = _escrever_tabela(ws, 0, wr, formatos)
+    ws.insert_chart('E2', _grafico(workbook, "WinRate_Movel", f"Win Rate Móvel ({analitico.JANELA_WR} trades)",
+                                   [("Win Rate", 2, '#27AE60')], n))
+
+    # MONTE CARLO
+    mc = analitico.bandas_monte_carlo(df, saldo_inicial, sims=mc_sims or analitico.MC_SIMS, seed=seed)
+    ws = workbook.add_worksheet("Monte_Carlo")
+    ws.set_column(0, 0, 24); ws.set_column(1, 6, 16)
+    linhas = [("Simulações", mc["sims"]), ("Equity Mediana Final ($)", mc["median_final"]),
+              ("Pior Cenário ($)", mc["worst_final"]), ("Drawdown Mediano (%)", mc["median_dd"] * 100),
+              ("Pior Drawdown (%)", mc["worst_dd"] * 100), ("Probabilidade de Ruína (%)", mc["ruin_prob"] * 100)]
+    linhas += [(f"P{p} Final ($)", v) for p, v in mc["final_percentiles"].items()]
+    for k, (nome, valor) in enumerate(linhas):
+        ws.write(k, 0, nome, formatos["cabecalho"])
+        ws.write_number(k, 1, float(valor), formatos["dinheiro"] if "($)" in nome else formatos["decimal"])
+    if mc["bands"] is not None:
+        import pandas as pd
+        bandas = pd.DataFrame({("trade" if p == "trade" else f"P{p} ($)"): v for p, v in mc["bands"].items()})
+        topo = len(linhas) + 1
+        fim = _escrever_tabela(ws, topo, bandas, formatos)
+        chart = workbook.add_chart({'type': 'line'})
+        cores = ['#C0392B', '#E67E22', '#2980B9', '#E67E22', '#C0392B']
+        for c, (nome, cor) in enumerate(zip(bandas.columns[1:], cores), start=1):
+            chart.add_series({'name': nome, 'categories': ["Monte_Carlo", topo + 1, 0, fim, 0],
+                              'values': ["Monte_Carlo", topo + 1, c, fim, c], 'line': {'color': cor, 'width': 1.5}})
+        chart.set_title({'name': 'Bandas de Percentil da Equity (Block Bootstrap)'})
+        chart.set_size({'width': 900, 'height': 420})
+        ws.insert_chart('H2', chart)
+
+    workbook.close()
+    return caminho
+
+def gerar_analitico_resultado(pasta=None):
+    # Rodada de backtest já gravada (resultado.py): lê os trades mapeados do disco, sem simular de novo
+    import resultado
+    pasta = pasta or resultado.ultimo()
+    if pasta is None or not os.path.isdir(pasta):
+        print(f"❌ Nenhuma rodada gravada em {pasta or resultado.RESULT_DIR}. Rode um backtest primeiro.")
+        return None
+    pacote = resultado.carregar(pasta)
+    caminho = gerar_analitico(pacote["trades"], os.path.join(pasta, ANALITICO_FILE), pacote["meta"]["banca_inicial"])
+    if caminho: print(f"✅ Relatório Analítico Gerado: {caminho} ({pacote['meta']['motor']}, {pacote['meta']['trades']} trades)")
+    return caminho
+
+def gerar_relatorio():
+    print("💎 Gerando Relatório V164 (Asymmetric Compounder)...")
+    raw_trades = _historico()
+    if raw_trades is None: return None
+    n, saldo = escrever_planilha(raw_trades, EXCEL_FILE)
+    print(f"✅ Relatório Oficial Gerado: {EXCEL_FILE} ({n} trades, saldo ${saldo:.2f})")
+    if n and gerar_analitico(_historico(), ANALITICO_FILE):
+        print(f"✅ Relatório Analítico Gerado: {ANALITICO_FILE}")
+    return EXCEL_FILE
 
 if __name__ == "__main__":
-    gerar_relatorio()
-    
+    args = sys.argv[1:]
+    if "--resultado" in args: gerar_analitico_resultado(args[args.index("--resultado") + 1] if args[-1] != "--resultado" else None)
+    elif "--incremental" in args:
+        if gerar_relatorio_incremental() is None: sys.exit(1)
+    elif gerar_relatorio() is None: sys.exit(1) # Falha visível no CI em vez de um relatório vazio
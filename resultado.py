@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+import feature_store
+
+# --- PACOTE DE RESULTADO PADRÃO DOS BACKTESTS ---
+# Cada simulador termina gravando a mesma estrutura, para comparar V164, V1800 e V3700
+# (ou a rodada de ontem com a de hoje) sem simular de novo:
+#   RESULT_DIR/<motor>_<aaaammdd-hhmmss>_<config_hash>/
+#     trades/<k>.npy   uma coluna por arquivo (data, symbol, side, strat, motivo, lucro, pnl_pct, lev)
+#     equity/<k>.npy   curva de patrimônio (tempo, patrimonio)
+#     meta.json        motor, config, config_hash, hash do código, banca, diagnostics, annual_stats
+# Os históricos de cada script têm chaves diferentes: o que faltar vira NaN/NaT/"N/A".
+# Mesmo formato do feature_store (sem pyarrow no requirements): tudo é gravado numa
+# pasta temporária e trocado de uma vez, e carregar() devolve DataFrames montados sobre
+# np.load(mmap_mode="r"). Colunas numéricas/datas ficam mapeadas; as de texto são
+# categóricas (códigos int32 no disco + categorias no meta.json).
+# Desligar: ROBODERIK_RESULTADOS=0
+# Uso: python resultado.py [pasta_raiz]  (lista as rodadas gravadas)
+RESULT_DIR = os.environ.get("ROBODERIK_RESULT_DIR", "resultados")
+ATIVO = os.environ.get("ROBODERIK_RESULTADOS", "1") != "0"
+TEXTO = ["symbol", "side", "strat", "motivo"]
+NUMEROS = ["lucro", "pnl_pct", "lev"]
+
+def _json(v):
+    if isinstance(v, np.generic): return v.item()
+    if isinstance(v, (pd.Timestamp, np.datetime64)): return pd.Timestamp(v).isoformat()
+    return repr(v)
+
+def hash_config(config):
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=_json).encode()).hexdigest()[:16]
+
+def colunas_trades(historico):
+    # Lista de dicts (historico_global/historico) -> colunas fixas
+    datas = pd.to_datetime([t.get("data") for t in historico]).as_unit("ns").to_numpy()
+    colunas = {"data": datas}
+    categorias = {}
+    for c in TEXTO:
+        valores, codigos = np.unique(np.array([str(t.get(c) or "N/A") for t in historico], dtype=object), return_inverse=True)
+        colunas[c] = codigos.astype(np.int32); categorias[c] = valores.tolist()
+    for c in NUMEROS:
+        colunas[c] = np.array([t.get(c, np.nan) for t in historico], dtype=np.float64)
+    return colunas, categorias
+
+def curva(historico, banca_inicial):
+    # Patrimônio realizado a cada trade fechado (quando o simulador não guarda o dele)
+    if not historico: return []
+    lucros = np.cumsum([t["lucro"] for t in historico]) + banca_inicial
+    return [(historico[0].get("data"), banca_inicial)] + [(t.get("data"), v) for t, v in zip(historico, lucros)]
+
+def _gravar_colunas(pasta, colunas):
+    os.makedirs(pasta)
+    for k, v in enumerate(colunas.values()): np.save(os.path.join(pasta, f"{k}.npy"), v)
+    return list(colunas)
+
+def gravar(motor, historico, banca_inicial, banca_final, config, funcao=None, diagnostics=None,
+           annual_stats=None, patrimonio=None, raiz=None):
+    # Uma gravação no fim da rodada; devolve a pasta (None se desligado)
+    if not ATIVO: return None
+    raiz = raiz or RESULT_DIR
+    chave = hash_config(config)
+    pasta = os.path.join(raiz, f"{motor}_{time.strftime('%Y%m%d-%H%M%S')}_{chave}")
+    tmp = f"{pasta}.tmp{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    trades, categorias = colunas_trades(historico)
+    if patrimonio is None: patrimonio = curva(historico, banca_inicial)
+    equity = {"tempo": pd.to_datetime([t for t, _ in patrimonio]).as_unit("ns").to_numpy(),
+              "patrimonio": np.array([v for _, v in patrimonio], dtype=np.float64)}
+    meta = {
+        "motor": motor, "criado": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": config, "config_hash": chave,
+        "codigo": feature_store.hash_codigo(funcao) if funcao is not None else None,
+        "banca_inicial": banca_inicial, "banca_final": banca_final, "trades": len(historico),
+        "diagnostics": diagnostics or {}, "annual_stats": annual_stats or {},
+        "categorias": categorias,
+        "colunas": {"trades": _gravar_colunas(os.path.join(tmp, "trades"), trades),
+                    "equity": _gravar_colunas(os.path.join(tmp, "equity"), equity)}
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f: json.dump(meta, f, indent=1, default=_json)
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.replace(tmp, pasta)
+    return pasta
+
+def _mapear(pasta, colunas):
+    return {c: np.load(os.path.join(pasta, f"{k}.npy"), mmap_mode="r") for k, c in enumerate(colunas)}
+
+def ler_meta(pasta):
+    with open(os.path.join(pasta, "meta.json"), "r") as f: meta = json.load(f)
+    meta["annual_stats"] = {int(a): s for a, s in meta["annual_stats"].items()}
+    return meta
+
+def carregar(pasta):
+    # {"meta", "trades", "equity"}: DataFrames sobre os arquivos mapeados (somente leitura)
+    meta = ler_meta(pasta)
+    dados = _mapear(os.path.join(pasta, "trades"), meta["colunas"]["trades"])
+    for c, cats in meta["categorias"].items():
+        dados[c] = pd.Categorical.from_codes(dados[c], cats, validate=False)
+    trades = pd.DataFrame(dados, copy=False)
+    equity = pd.DataFrame(_mapear(os.path.join(pasta, "equity"), meta["colunas"]["equity"]), copy=False)
+    return {"meta": meta, "trades": trades, "equity": equity}
+
+def listar(raiz=None, motor=None):
+    # Uma linha por rodada gravada (mais antiga primeiro)
+    raiz = raiz or RESULT_DIR
+    linhas = []
+    for nome in sorted(os.listdir(raiz)) if os.path.isdir(raiz) else []:
+        pasta = os.path.join(raiz, nome)
+        if ".tmp" in nome or not os.path.exists(os.path.join(pasta, "meta.json")): continue
+        try:
+            meta = ler_meta(pasta)
+        except (OSError, ValueError, KeyError):
+            continue
+        if motor is not None and meta["motor"] != motor: continue
+        ini = meta["banca_inicial"]
+        linhas.append({"pasta": pasta, "motor": meta["motor"], "criado": meta["criado"], "config_hash": meta["config_hash"],
+                       "trades": meta["trades"], "banca_inicial": ini, "banca_final": meta["banca_final"],
+                       "roi_pct": (meta["banca_final"] - ini) / ini * 100 if ini else float("nan")})
+    rodadas = pd.DataFrame(linhas, columns=["pasta", "motor", "criado", "config_hash", "trades", "banca_inicial", "banca_final", "roi_pct"])
+    return rodadas.sort_values(["criado", "pasta"], kind="stable", ignore_index=True)
+
+def ultimo(motor=None, raiz=None):
+    rodadas = listar(raiz, motor)
+    return rodadas["pasta"].iloc[-1] if len(rodadas) else None
+
+if __name__ == "__main__":
+    rodadas = listar(sys.argv[1] if len(sys.argv) > 1 else None)
+    if not len(rodadas): print(f"⚠️ Nenhuma rodada em {sys.argv[1] if len(sys.argv) > 1 else RESULT_DIR}.")
+    else: print(rodadas.drop(columns="pasta").to_string(index=False))
@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+import itertools
+import importlib.util
+import importlib.machinery
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+# --- VARREDURA DE PARÂMETROS DO V164 (PARALELA) ---
+# Em vez de editar as constantes do Backtest_V164_Validado e rodar o script de novo,
+# descreva a grade abaixo. O download e as features são feitos UMA vez (as EMAs de
+# todos os comprimentos da grade entram no mesmo painel) e o painel é entregue aos
+# processos só na inicialização de cada um (no Linux, via fork, nem é copiado).
+# Cada combinação roda simular_v164 num processo livre e vira uma linha da tabela.
+# Uso: python varredura_v164.py [workers]
+
+GRADE = {
+    "RISK_AGRESSIVE": [0.05, 0.10, 0.15],
+    "RISK_CONSERVATIVE": [0.01, 0.015, 0.02],
+    "MAX_POSICOES": [2, 3, 4],
+    "EMA_EXIT": [50, 100],
+    "EMA_MACRO": [600, 800],
+    "BUFFER_PCT": [0.0, 0.002],
+}
+WORKERS = os.cpu_count() or 1
+ARQUIVO_SAIDA = "varredura_v164.csv"
+SCRIPT_V164 = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Backtest_V164_Validado")
+
+def carregar_v164():
+    # O script não tem extensão .py, então é carregado direto do arquivo
+    loader = importlib.machinery.SourceFileLoader("backtest_v164", SCRIPT_V164)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    mod = importlib.util.module_from_spec(spec)
+    loader.exec_module(mod)
+    return mod
+
+def combinacoes(grade):
+    chaves = list(grade)
+    return [dict(zip(chaves, valores)) for valores in itertools.product(*(grade[k] for k in chaves))]
+
+def resumo(v164, params, res):
+    historico = res["historico"]
+    wins = sum(1 for t in historico if t['lucro'] > 0)
+    linha = dict(params)
+    linha["banca_final"] = res["banca"]
+    linha["roi_pct"] = (res["banca"] - v164.BANCA_INICIAL) / v164.BANCA_INICIAL * 100
+    linha["max_dd_pct"] = res["max_dd"] * 100
+    linha["trades"] = len(historico)
+    linha["winrate_pct"] = wins / len(historico) * 100 if historico else 0.0
+    for ano, s in res["annual_stats"].items():
+        if s['start'] == 0: continue
+        linha[f"roi_{ano}"] = (s['end'] - s['start']) / s['start'] * 100 if s['start'] > 0 else 0.0
+        linha[f"trades_{ano}"] = s['trades']
+    return linha
+
+# Estado de cada processo do pool (preenchido uma vez pelo initializer)
+_V164 = None
+_PAINEL = None
+
+def _iniciar_worker(painel):
+    global _V164, _PAINEL
+    _V164 = carregar_v164()
+    _PAINEL = painel
+
+def _rodar(params):
+    return resumo(_V164, params, _V164.simular_v164(_PAINEL, params, verbose=False))
+
+def varrer(grade=None, workers=WORKERS, painel=None, v164=None):
+    v164 = v164 or carregar_v164()
+    combos = combinacoes(grade or GRADE)
+    if painel is None:
+        # Features que não dependem da grade são calculadas uma vez; EMAs, uma por comprimento
+        emas = sorted(set().union(*(v164.emas_usadas({**v164.parametros_padrao(), **c}) for c in combos)))
+        painel = v164.carregar_painel(emas)
+
+    if workers <= 1:
+        linhas = [resumo(v164, c, v164.simular_v164(painel, c, verbose=False)) for c in combos]
+    else:
+        lote = max(1, len(combos) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(painel,)) as ex:
+            linhas = list(ex.map(_rodar, combos, chunksize=lote))
+    return pd.DataFrame(linhas).sort_values("banca_final", ascending=False).reset_index(drop=True)
+
+def main(workers=WORKERS):
+    n = len(combinacoes(GRADE))
+    print(f"🧪 Varredura V164: {n} combinações em {workers} processos")
+    t0 = time.perf_counter()
+    tabela = varrer(workers=workers)
+    dt = time.perf_counter() - t0
+    tabela.to_csv(ARQUIVO_SAIDA, index=False)
+    print(f"\n✅ {n} backtests em {dt:.1f}s ({n / dt:.1f}/s) -> {ARQUIVO_SAIDA}")
+    print("=" * 65)
+    colunas = list(GRADE) + ["banca_final", "max_dd_pct", "trades", "winrate_pct"]
+    print(tabela[colunas].head(10).to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+    print("=" * 65)
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else WORKERS)
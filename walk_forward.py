@@ -0,0 +1,201 @@
+import os
+import sys
+import time
+import itertools
+import importlib.util
+import importlib.machinery
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# --- WALK-FORWARD DO BACKTEST_28022026 ---
+# Divide a linha do tempo em janelas dentro da amostra (IS) / fora da amostra (OOS):
+#   anchored -> IS sempre começa no início dos dados e cresce a cada fold
+#   rolling  -> IS de tamanho fixo que anda junto com o OOS
+# Em cada IS a grade de parâmetros é testada e a melhor combinação (pela pontuação abaixo)
+# roda no OOS seguinte. As curvas OOS são costuradas por composição num único histórico.
+# Download e features são feitos uma vez (cache de klines + painel alinhado) e o painel
+# vai para os processos na inicialização; todas as janelas de todos os folds rodam em paralelo.
+# Uso: python walk_forward.py [anchored|rolling] [workers]
+
+MODO = "anchored"
+MESES_IS = 24
+MESES_OOS = 6
+MIN_TRADES_IS = 30 # Menos trades que isso no IS = combinação descartada
+DD_PISO = 5.0      # Drawdown mínimo (%) no denominador da pontuação
+SEMENTE = 7        # Semente do Toxic Fill por fold (todas as combinações veem o mesmo sorteio)
+GRADE = {
+    "RISCO_FADE": [0.01, 0.02, 0.03],
+    "RISCO_TREND": [0.01, 0.015, 0.02],
+    "STOP_TREND_ATR": [2.0, 2.5, 3.0],
+    "TRAIL_ATR": [2.5, 3.5],
+}
+WORKERS = os.cpu_count() or 1
+ARQUIVO_FOLDS = "walk_forward_folds.csv"
+ARQUIVO_CURVA = "walk_forward_curva.csv"
+SCRIPT_MOTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Backtest_28022026")
+
+def carregar_motor():
+    # O script não tem extensão .py, então é carregado direto do arquivo
+    loader = importlib.machinery.SourceFileLoader("backtest_28022026", SCRIPT_MOTOR)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    mod = importlib.util.module_from_spec(spec)
+    loader.exec_module(mod)
+    return mod
+
+def combinacoes(grade):
+    chaves = list(grade)
+    return [dict(zip(chaves, valores)) for valores in itertools.product(*(grade[k] for k in chaves))]
+
+def montar_folds(tempos, modo=MODO, meses_is=MESES_IS, meses_oos=MESES_OOS):
+    # Janelas em posições do painel: IS = [is_ini, is_fim), OOS = [is_fim, oos_fim)
+    ultimo = len(tempos) - 1 # O simulador nunca processa a última vela
+    folds = []
+    k = 0
+    while True:
+        passo = pd.DateOffset(months=k * meses_oos)
+        t_ini = tempos[0] if modo == "anchored" else tempos[0] + passo
+        t_corte = tempos[0] + pd.DateOffset(months=meses_is) + passo
+        t_fim = t_corte + pd.DateOffset(months=meses_oos)
+        is_ini, is_fim, oos_fim = tempos.searchsorted([t_ini, t_corte, t_fim])
+        oos_fim = min(oos_fim, ultimo)
+        if is_fim >= oos_fim: break
+        folds.append({"fold": k + 1, "is": (max(is_ini, 2), is_fim), "oos": (is_fim, oos_fim)})
+        k += 1
+    return folds
+
+def max_drawdown(patrimonio):
+    valores = np.array([v for _, v in patrimonio])
+    pico = np.maximum.accumulate(valores)
+    return float(np.max((pico - valores) / pico))
+
+def metricas(res, banca_inicial, ini, fim, tempos):
+    historico = res["historico"]
+    dias = max((tempos[fim - 1] - tempos[ini]).total_seconds() / 86400, 1.0)
+    retorno = res["banca"] / banca_inicial
+    return {
+        "banca_final": res["banca"],
+        "roi_pct": (retorno - 1) * 100,
+        "roi_anual_pct": (retorno ** (365 / dias) - 1) * 100 if retorno > 0 else -100.0,
+        "max_dd_pct": max_drawdown(res["patrimonio"]) * 100,
+        "trades": len(historico),
+        "winrate_pct": sum(1 for t in historico if t['lucro'] > 0) / len(historico) * 100 if historico else 0.0,
+    }
+
+def pontuar(m):
+    # Retorno por unidade de drawdown; poucas amostras não competem
+    if m["trades"] < MIN_TRADES_IS: return -np.inf
+    return m["roi_pct"] / max(m["max_dd_pct"], DD_PISO)
+
+# Estado de cada processo do pool (preenchido uma vez pelo initializer)
+_MOTOR = None
+_PAINEL = None
+_ENERGIA = None
+
+def _iniciar_worker(painel, energia):
+    global _MOTOR, _PAINEL, _ENERGIA
+    _MOTOR = carregar_motor()
+    _PAINEL = painel; _ENERGIA = energia
+
+def _rodar_janela(motor, painel, energia, tarefa):
+    fold, params, ini, fim, oos = tarefa
+    res = motor.simular(painel, energia, params, inicio=ini, fim=fim, banca_inicial=motor.BANCA_INICIAL,
+                        seed=SEMENTE + fold, fechar_no_fim=oos)
+    m = metricas(res, motor.BANCA_INICIAL, ini, fim, painel["tempos"])
+    if oos: m["patrimonio"] = res["patrimonio"]
+    return fold, params, m
+
+def _rodar(tarefa):
+    return _rodar_janela(_MOTOR, _PAINEL, _ENERGIA, tarefa)
+
+def costurar(oos, banca_inicial):
+    # Cada OOS começa com banca_inicial; a curva costurada compõe os retornos em sequência
+    capital = banca_inicial
+    pontos = [oos[0]["patrimonio"][0]] if oos else []
+    for m in oos:
+        fator = capital / banca_inicial
+        pontos.extend((t, v * fator) for t, v in m["patrimonio"][1:])
+        capital = m["banca_final"] * fator
+    return pontos
+
+def _escolher(resultados_is):
+    # Melhor combinação do IS de cada fold (empate: a primeira da grade)
+    melhores = {}
+    for fold, params, m in resultados_is:
+        if fold not in melhores or pontuar(m) > pontuar(melhores[fold][1]): melhores[fold] = (params, m)
+    return melhores
+
+def walk_forward(modo=MODO, grade=None, workers=WORKERS, meses_is=MESES_IS, meses_oos=MESES_OOS,
+                 painel=None, energia=None, motor=None):
+    motor = motor or carregar_motor()
+    if painel is None: painel, energia = motor.carregar_painel()
+    if painel is None: return None
+    tempos = painel["tempos"]
+    folds = montar_folds(tempos, modo, meses_is, meses_oos)
+    combos = combinacoes(grade or GRADE)
+    print(f"🧭 Walk-forward {modo}: {len(folds)} folds x {len(combos)} combinações em {workers} processos")
+
+    tarefas_is = [(f["fold"], c, *f["is"], False) for f in folds for c in combos]
+    if workers <= 1:
+        rodar = lambda tarefas: [_rodar_janela(motor, painel, energia, t) for t in tarefas]
+        resultados_is = rodar(tarefas_is)
+        melhores = _escolher(resultados_is)
+        resultados_oos = rodar([(f["fold"], melhores[f["fold"]][0], *f["oos"], True) for f in folds])
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_iniciar_worker, initargs=(painel, energia)) as ex:
+            lote = max(1, len(tarefas_is) // (workers * 4))
+            resultados_is = list(ex.map(_rodar, tarefas_is, chunksize=lote))
+            melhores = _escolher(resultados_is)
+            resultados_oos = list(ex.map(_rodar, [(f["fold"], melhores[f["fold"]][0], *f["oos"], True) for f in folds]))
+
+    linhas = []; oos = []
+    for f, (_, params, m) in zip(folds, resultados_oos):
+        params_is, m_is = melhores[f["fold"]]
+        linha = {"fold": f["fold"],
+                 "is_inicio": tempos[f["is"][0]], "is_fim": tempos[f["is"][1] - 1],
+                 "oos_inicio": tempos[f["oos"][0]], "oos_fim": tempos[f["oos"][1] - 1],
+                 **params,
+                 "is_score": pontuar(m_is), "is_roi_anual_pct": m_is["roi_anual_pct"], "is_max_dd_pct": m_is["max_dd_pct"],
+                 "is_trades": m_is["trades"]}
+        linha.update({f"oos_{k}": v for k, v in m.items() if k != "patrimonio"})
+        # Eficiência walk-forward: quanto do retorno anualizado do IS sobreviveu no OOS
+        linha["wfe"] = m["roi_anual_pct"] / m_is["roi_anual_pct"] if m_is["roi_anual_pct"] > 0 else np.nan
+        linhas.append(linha); oos.append(m)
+
+    curva = costurar(oos, motor.BANCA_INICIAL)
+    return {"folds": pd.DataFrame(linhas), "curva": curva, "banca_inicial": motor.BANCA_INICIAL}
+
+def imprimir_relatorio(res, modo=MODO):
+    tabela = res["folds"]; curva = res["curva"]; banca_inicial = res["banca_inicial"]
+    print("\n" + "=" * 65)
+    print(f"🧭 WALK-FORWARD ({modo.upper()}) | OOS por fold")
+    print("=" * 65)
+    print(f"{'FOLD':<5} | {'OOS':<23} | {'ROI':>8} | {'DD':>6} | {'TRADES':>6} | {'WR':>5} | {'WFE':>5}")
+    print("-" * 65)
+    for _, f in tabela.iterrows():
+        periodo = f"{f['oos_inicio']:%Y-%m-%d} - {f['oos_fim']:%Y-%m-%d}"
+        print(f"{f['fold']:<5} | {periodo:<23} | {f['oos_roi_pct']:7.1f}% | {f['oos_max_dd_pct']:5.1f}% | "
+              f"{f['oos_trades']:>6} | {f['oos_winrate_pct']:4.1f}% | {f['wfe']:5.2f}")
+    print("-" * 65)
+    final = curva[-1][1] if curva else banca_inicial
+    trades = int(tabela["oos_trades"].sum()) if len(tabela) else 0
+    ganhos = (tabela["oos_winrate_pct"] * tabela["oos_trades"]).sum() / 100 if trades else 0
+    print(f"OOS costurado : ${banca_inicial:.2f} -> ${final:.2f} ({(final / banca_inicial - 1) * 100:.1f}% ROI)")
+    print(f"Max DD OOS    : {max_drawdown(curva) * 100 if curva else 0:.1f}%")
+    print(f"Trades OOS    : {trades} | Winrate {ganhos / trades * 100 if trades else 0:.1f}%")
+    print(f"Folds no lucro: {(tabela['oos_roi_pct'] > 0).sum()}/{len(tabela)} | WFE médio {tabela['wfe'].mean():.2f}")
+    print("=" * 65)
+
+def main(modo=MODO, workers=WORKERS):
+    t0 = time.perf_counter()
+    res = walk_forward(modo, workers=workers)
+    if res is None:
+        print("\n❌ FALHA CRÍTICA: Dados não encontrados.")
+        return
+    imprimir_relatorio(res, modo)
+    res["folds"].to_csv(ARQUIVO_FOLDS, index=False)
+    pd.DataFrame(res["curva"], columns=["data", "patrimonio"]).to_csv(ARQUIVO_CURVA, index=False)
+    print(f"✅ {time.perf_counter() - t0:.1f}s -> {ARQUIVO_FOLDS}, {ARQUIVO_CURVA}")
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else MODO, int(sys.argv[2]) if len(sys.argv) > 2 else WORKERS)